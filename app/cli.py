@@ -0,0 +1,58 @@
+"""Maintenance commands.
+
+Usage:
+    python -m app.cli backfill-rollups --start 2024-01-01 --end 2024-01-31 [--city Delhi]
+    python -m app.cli import-cities stations.csv [--format csv|json]
+"""
+import argparse
+import logging
+from datetime import date
+
+from .database import SessionLocal, init_db
+from .services.rollup_service import RollupService
+from .services.city_registry import city_registry, read_city_file
+
+def backfill_rollups(args):
+    db = SessionLocal()
+    try:
+        result = RollupService(db).backfill(args.start, args.end, args.city or None)
+    finally:
+        db.close()
+    if result.start != args.start:
+        print(f"Raw observations before {result.start} have expired; started there instead of {args.start}")
+    print(f"Rebuilt {result.daily} daily rollup(s) from {result.start} to {result.end}")
+
+def import_cities(args):
+    cities = read_city_file(args.path, args.format)
+    db = SessionLocal()
+    try:
+        imported = city_registry.import_cities(db, cities)
+    finally:
+        db.close()
+    print(f"Imported {imported} city(ies); registry now holds {len(city_registry)}")
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Weather monitoring maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser("backfill-rollups", help="Rebuild DailySummary rows from raw observations")
+    backfill.add_argument("--start", type=date.fromisoformat, required=True, help="First day (YYYY-MM-DD, UTC)")
+    backfill.add_argument("--end", type=date.fromisoformat, required=True, help="Last day, inclusive")
+    backfill.add_argument("--city", action="append", help="Limit to a city; may be repeated")
+    backfill.set_defaults(handler=backfill_rollups)
+
+    cities = commands.add_parser("import-cities", help="Bulk insert or update cities from a CSV or JSON file")
+    cities.add_argument("path", help="CSV with a name,lat,lon[,country,owm_id] header, or a JSON array of objects")
+    cities.add_argument("--format", choices=["csv", "json"], help="Defaults to the file extension")
+    cities.set_defaults(handler=import_cities)
+
+    return parser
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO)
+    args = build_parser().parse_args(argv)
+    init_db()
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
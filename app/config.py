@@ -17,10 +17,114 @@ class Settings:
     DATABASE_USER: str = os.getenv("POSTGRES_USER", "user")
     DATABASE_PASSWORD: str = os.getenv("POSTGRES_PASSWORD", "password")
     DATABASE_NAME: str = os.getenv("POSTGRES_DB", "weather_db")
+    # Full SQLAlchemy URL; overrides the fields above when set
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    
+    # Connection pool configuration
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    
+    # Upstream API configuration
+    OPENWEATHER_BASE_URL: str = os.getenv("OPENWEATHER_BASE_URL", "https://api.openweathermap.org/data/2.5")
+    FETCH_CONCURRENCY: int = int(os.getenv("FETCH_CONCURRENCY", "10"))
+    FETCH_TIMEOUT: float = float(os.getenv("FETCH_TIMEOUT", "10"))
+    # Upstream response cache TTLs (seconds); OpenWeatherMap refreshes current
+    # weather about every 10 minutes and forecasts every 3 hours
+    CURRENT_WEATHER_CACHE_TTL: int = int(os.getenv("CURRENT_WEATHER_CACHE_TTL", "600"))
+    FORECAST_CACHE_TTL: int = int(os.getenv("FORECAST_CACHE_TTL", "10800"))
+    UPSTREAM_CACHE_MAX_ENTRIES: int = int(os.getenv("UPSTREAM_CACHE_MAX_ENTRIES", "10000"))
+    # "grouped" fetches cities with an OpenWeatherMap id 20 at a time from
+    # /group (and, if UPSTREAM_BOX_QUERIES is on, dense cells of other cities
+    # from /box/city); everything else, or "single", is one request per city
+    UPSTREAM_FETCH_MODE: str = os.getenv("UPSTREAM_FETCH_MODE", "grouped")
+    UPSTREAM_GROUP_SIZE: int = int(os.getenv("UPSTREAM_GROUP_SIZE", "20"))
+    UPSTREAM_BOX_QUERIES: bool = os.getenv("UPSTREAM_BOX_QUERIES", "false").lower() == "true"
+    UPSTREAM_BOX_CELL_SIZE: float = float(os.getenv("UPSTREAM_BOX_CELL_SIZE", "1.0"))
+    UPSTREAM_BOX_MIN_GROUP: int = int(os.getenv("UPSTREAM_BOX_MIN_GROUP", "3"))
+    UPSTREAM_BOX_MATCH_KM: float = float(os.getenv("UPSTREAM_BOX_MATCH_KM", "10"))
     
     # Rest of your settings...
     TEMPERATURE_THRESHOLD: float = 35.0
-    UPDATE_INTERVAL: int = 300
+    # Alert rules as a JSON list of objects (see services/alert_rules.py), e.g.
+    # [{"id": "heat", "field": "temperature", "op": ">", "value": 40, "count": 3, "clear": 38}];
+    # when empty, a single rule alerts above TEMPERATURE_THRESHOLD
+    ALERT_RULES: str = os.getenv("ALERT_RULES", "")
+    # Adaptive polling: each city is polled every POLL_MIN_INTERVAL to
+    # POLL_MAX_INTERVAL seconds depending on how fast its temperature moves
+    # (POLL_VOLATILITY_REF degC/hour counts as fully volatile) and how close it
+    # is to TEMPERATURE_THRESHOLD (within POLL_THRESHOLD_BAND degC), with at
+    # most POLL_BUDGET_PER_MINUTE upstream requests per minute in total
+    POLL_TICK_INTERVAL: float = float(os.getenv("POLL_TICK_INTERVAL", "10"))
+    POLL_MIN_INTERVAL: float = float(os.getenv("POLL_MIN_INTERVAL", "60"))
+    POLL_MAX_INTERVAL: float = float(os.getenv("POLL_MAX_INTERVAL", "600"))
+    POLL_BUDGET_PER_MINUTE: float = float(os.getenv("POLL_BUDGET_PER_MINUTE", "60"))
+    POLL_VOLATILITY_REF: float = float(os.getenv("POLL_VOLATILITY_REF", "2.0"))
+    POLL_THRESHOLD_BAND: float = float(os.getenv("POLL_THRESHOLD_BAND", "3.0"))
+    # Sharded polling: with POLL_SHARDING on, cities are hashed into
+    # POLL_PARTITIONS partitions spread over the live workers; a worker polls a
+    # partition only while it holds that partition's lease in the database
+    POLL_SHARDING: bool = os.getenv("POLL_SHARDING", "false").lower() == "true"
+    POLL_PARTITIONS: int = int(os.getenv("POLL_PARTITIONS", "256"))
+    POLL_LEASE_TTL: float = float(os.getenv("POLL_LEASE_TTL", "30"))
+    WORKER_ID: str = os.getenv("WORKER_ID", "")
+    # WebSocket broadcasts: "memory" only reaches this process's clients,
+    # "postgres" uses LISTEN/NOTIFY so every worker's clients get every update.
+    # Each client has a queue of BROADCAST_QUEUE_SIZE messages; the oldest is
+    # dropped when a slow client falls behind
+    BROADCAST_BACKPLANE: str = os.getenv("BROADCAST_BACKPLANE", "memory")
+    BROADCAST_CHANNEL: str = os.getenv("BROADCAST_CHANNEL", "weather_updates")
+    BROADCAST_QUEUE_SIZE: int = int(os.getenv("BROADCAST_QUEUE_SIZE", "4"))
+    BROADCAST_SEND_TIMEOUT: float = float(os.getenv("BROADCAST_SEND_TIMEOUT", "10"))
+    # Clients get only changed fields, with a full keyframe of their
+    # subscribed cities every BROADCAST_KEYFRAME_INTERVAL frames; frames are
+    # compressed with permessage-deflate when the client offers it
+    BROADCAST_KEYFRAME_INTERVAL: int = int(os.getenv("BROADCAST_KEYFRAME_INTERVAL", "30"))
+    WS_PER_MESSAGE_DEFLATE: bool = os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() == "true"
+    # Scheduler job intervals (seconds), random start-time jitter and the
+    # size of the thread pool used for blocking database work
+    FORECAST_UPDATE_INTERVAL: int = int(os.getenv("FORECAST_UPDATE_INTERVAL", "3600"))
+    ROLLUP_RECONCILE_INTERVAL: int = int(os.getenv("ROLLUP_RECONCILE_INTERVAL", "3600"))
+    SCHEDULER_JITTER: float = float(os.getenv("SCHEDULER_JITTER", "5"))
+    SCHEDULER_WORKERS: int = int(os.getenv("SCHEDULER_WORKERS", "4"))
+    # Encoded read responses are cached until new data is written;
+    # RESPONSE_CACHE_TTL (seconds) bounds staleness from other workers' writes
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+    RESPONSE_CACHE_TTL: float = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+    # History exports read HISTORY_BATCH_SIZE rows at a time; a paged request
+    # may ask for at most HISTORY_PAGE_MAX rows
+    HISTORY_BATCH_SIZE: int = int(os.getenv("HISTORY_BATCH_SIZE", "5000"))
+    HISTORY_PAGE_MAX: int = int(os.getenv("HISTORY_PAGE_MAX", "50000"))
+    # Observations and forecasts are stored in monthly partitions, with
+    # PARTITION_MONTHS_AHEAD future months created in advance. Raw readings
+    # are kept RAW_RETENTION_DAYS days, hourly rollups HOURLY_RETENTION_MONTHS
+    # months (0 keeps them forever) and daily rollups forever; expired months
+    # are dropped by a job that runs every RETENTION_INTERVAL seconds
+    PARTITION_MONTHS_AHEAD: int = int(os.getenv("PARTITION_MONTHS_AHEAD", "2"))
+    RAW_RETENTION_DAYS: int = int(os.getenv("RAW_RETENTION_DAYS", "30"))
+    HOURLY_RETENTION_MONTHS: int = int(os.getenv("HOURLY_RETENTION_MONTHS", "12"))
+    FORECAST_RETENTION_DAYS: int = int(os.getenv("FORECAST_RETENTION_DAYS", "30"))
+    RETENTION_INTERVAL: int = int(os.getenv("RETENTION_INTERVAL", "3600"))
+    # Recent readings are kept in memory, OBSERVATION_BUFFER_CAPACITY per city,
+    # loaded at startup for the last OBSERVATION_BUFFER_HOURS hours; windows
+    # the buffer fully holds are aggregated without querying the database
+    # (never with POLL_SHARDING on the memory backplane, which does not see
+    # other workers' readings)
+    OBSERVATION_BUFFER_CAPACITY: int = int(os.getenv("OBSERVATION_BUFFER_CAPACITY", "2016"))
+    OBSERVATION_BUFFER_HOURS: float = float(os.getenv("OBSERVATION_BUFFER_HOURS", "168"))
+    # Cached observations older than this (seconds) trigger a background
+    # refresh; keep it above POLL_MAX_INTERVAL plus one POLL_TICK_INTERVAL so
+    # cities on their slowest schedule do not read as stale between polls
+    OBSERVATION_MAX_AGE: int = int(os.getenv("OBSERVATION_MAX_AGE", "900"))
+    # Forecast runs kept per city, including the latest
+    FORECAST_RUN_RETENTION: int = int(os.getenv("FORECAST_RUN_RETENTION", "3"))
+    # Prometheus text metrics at /metrics. With METRICS_ENABLED off the
+    # endpoint returns 404 and database queries are not timed; event loop lag
+    # is sampled every METRICS_LOOP_LAG_INTERVAL seconds
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_LOOP_LAG_INTERVAL: float = float(os.getenv("METRICS_LOOP_LAG_INTERVAL", "0.5"))
 
     CITIES: List[Dict[str, Any]] = field(default_factory=lambda: [
         {"name": "Delhi", "lat": 28.6139, "lon": 77.2090},
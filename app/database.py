@@ -1,12 +1,207 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Dict, Optional, Union
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, URL, make_url
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
 from .config import settings
+from .metrics import MetricFamily, metrics as metrics_registry, time_queries
+
+class PoolMetrics:
+    """Checkout counts and wait times for one engine's connection pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self.checkouts = 0
+        self.connects = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def observe_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> Dict:
+        pool = self.pool
+        in_use = pool.checkedout() if hasattr(pool, "checkedout") else None
+        size = pool.size() if hasattr(pool, "size") else None
+        return {
+            "pool": self.name,
+            "size": size,
+            "in_use": in_use,
+            "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+            "checkouts": self.checkouts,
+            "connects": self.connects,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+            "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0
+        }
+
+class _TimedCheckout:
+    """Pool mixin that reports how long each checkout waited for a connection"""
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except Exception:
+            timed_out = True
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe_wait(time.perf_counter() - start, timed_out)
+
+    def recreate(self):
+        # dispose() swaps in a fresh pool; keep reporting to the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        if self.metrics is not None:
+            self.metrics.pool = pool
+        return pool
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+def build_database_url() -> URL:
+    """DATABASE_URL if set, otherwise a PostgreSQL URL from the DATABASE_* fields"""
+    if settings.DATABASE_URL:
+        return make_url(settings.DATABASE_URL)
+    return URL.create(
+        "postgresql",
+        username=settings.DATABASE_USER,
+        password=settings.DATABASE_PASSWORD,
+        host=settings.DATABASE_HOST,
+        port=settings.DATABASE_PORT,
+        database=settings.DATABASE_NAME
+    )
+
+def async_database_url(url: Union[str, URL]) -> URL:
+    """Swap a sync URL's driver for its asyncio counterpart"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "postgresql":
+        return url.set(drivername="postgresql+asyncpg")
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+def _engine_options(url: URL, pool_class) -> Dict:
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if url.database in (None, "", ":memory:"):
+            # Every connection to an in-memory database is a separate database
+            options["poolclass"] = StaticPool
+            return options
+    options.update(
+        poolclass=pool_class,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE
+    )
+    return options
+
+def _instrument(engine: Engine, name: str) -> Engine:
+    metrics = PoolMetrics(name)
+    metrics.pool = engine.pool
+    engine.pool.metrics = metrics
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.checkouts += 1
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        metrics.connects += 1
 
-engine = create_engine(settings.DATABASE_URL)
+    pool_metrics[name] = metrics
+    if settings.METRICS_ENABLED:
+        time_queries(engine)
+    return engine
+
+def create_db_engine(url: Union[str, URL, None] = None, name: str = "sync", **overrides) -> Engine:
+    """Build a sync engine with the configured pool settings and instrumentation"""
+    url = make_url(url) if url is not None else build_database_url()
+    options = _engine_options(url, InstrumentedQueuePool)
+    options.update(overrides)
+    return _instrument(create_engine(url, **options), name)
+
+def create_async_db_engine(url: Union[str, URL, None] = None, name: str = "async", **overrides):
+    """Build an asyncpg/aiosqlite engine mirroring the sync engine's configuration"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = async_database_url(url if url is not None else build_database_url())
+    options = _engine_options(url, InstrumentedAsyncQueuePool)
+    options.update(overrides)
+    engine = create_async_engine(url, **options)
+    _instrument(engine.sync_engine, name)
+    return engine
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+_async_engine = None
+_async_sessionmaker = None
+
+def get_async_engine():
+    """Process-wide async engine, created on first use so the driver stays optional"""
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_db_engine()
+    return _async_engine
+
+def get_async_sessionmaker():
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        _async_sessionmaker = async_sessionmaker(get_async_engine(), expire_on_commit=False)
+    return _async_sessionmaker
+
+async def dispose_async_engine():
+    """Close the async engine's connections, e.g. on shutdown"""
+    global _async_engine, _async_sessionmaker
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = _async_sessionmaker = None
+
+def get_pool_stats():
+    """Pool metrics for every engine created by this module"""
+    return [metrics.snapshot() for metrics in pool_metrics.values()]
+
+def _collect_pool_metrics():
+    in_use = MetricFamily("weather_db_pool_connections_in_use", "gauge", "Connections checked out of each pool")
+    checkouts = MetricFamily("weather_db_pool_checkouts_total", "counter", "Connection checkouts per pool")
+    timeouts = MetricFamily("weather_db_pool_timeouts_total", "counter", "Checkouts that gave up waiting for a connection")
+    waited = MetricFamily("weather_db_pool_wait_seconds_total", "counter", "Time spent waiting for a pooled connection")
+    for snapshot in get_pool_stats():
+        if snapshot["in_use"] is not None:
+            in_use.add(snapshot["in_use"], pool=snapshot["pool"])
+        checkouts.add(snapshot["checkouts"], pool=snapshot["pool"])
+        timeouts.add(snapshot["timeouts"], pool=snapshot["pool"])
+        waited.add(snapshot["wait_seconds_total"], pool=snapshot["pool"])
+    return [in_use, checkouts, timeouts, waited]
+
+metrics_registry.register_collector("db_pool", _collect_pool_metrics)
+
 # Dependency for FastAPI
 def get_db():
     db = SessionLocal()
@@ -15,6 +210,21 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """AsyncSession dependency; queries await the driver instead of blocking the event loop"""
+    async with get_async_sessionmaker()() as db:
+        yield db
+
 def init_db():
     from .models.weather import Base
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    from .migrations import run_migrations
+    from .services.partitioning import partition_manager
+    # Partitioned tables have to exist before create_all would make plain ones
+    partition_manager.create_tables(engine)
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    db = SessionLocal()
+    try:
+        partition_manager.ensure_partitions(db)
+    finally:
+        db.close()
@@ -1,58 +1,67 @@
-from fastapi import FastAPI, Depends, HTTPException, WebSocket
+from fastapi import FastAPI, Depends, HTTPException, Request, WebSocket
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
-from typing import List
-import json
-import asyncio
-from datetime import datetime, timedelta
+from fastapi.responses import FileResponse, PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from contextlib import asynccontextmanager
 import uvicorn
 import webbrowser
 import threading
 import time
 
-from .database import get_db, init_db
-from .models.weather import WeatherData, DailySummary, WeatherAlert
+from .database import SessionLocal, init_db, get_async_db, dispose_async_engine, get_pool_stats
 from .config import settings
-from .services.weather_service import WeatherService
+from .metrics import LoopLagMonitor, metrics
+from .services.weather_service import AsyncWeatherService
+from .services.weather_fetcher import close_fetcher
+from .services.observation_store import observation_store
+from .services.observation_buffer import observation_buffer
+from .services.scheduler import Scheduler
+from .services.poll_planner import PollPlanner
+from .services.city_registry import city_registry
+from .services.sharding import ShardCoordinator
+from .services.broadcast import encoding_available
+from .services.observation_feed import ObservationFeed
+from .services.response_cache import response_cache
+from .services.alert_rules import alert_engine
+from .services.background_service import BackgroundService
+from .routes.forecast import router as forecast_router
+from .routes.cities import router as cities_router
+from .routes.history import router as history_router
 
-app = FastAPI(title="Weather Monitoring System")
+scheduler = Scheduler()
+poll_planner = PollPlanner()
+# Set POLL_SHARDING when running several workers so each city is polled once
+shard = ShardCoordinator() if settings.POLL_SHARDING else None
+def on_batch(observations: List[dict]):
+    """Keep the recent-readings buffer current; the batch also means another worker may have written new rows"""
+    observation_buffer.extend(observations)
+    response_cache.invalidate("alerts", "summaries")
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# Every worker merges every published batch and streams deltas to its clients
+feed = ObservationFeed(store=observation_store, on_batch=on_batch)
+metrics.register_collector("broadcast", feed.broadcaster.metric_families)
+loop_lag = LoopLagMonitor(settings.METRICS_LOOP_LAG_INTERVAL)
 
-# Store active WebSocket connections
-active_connections: List[WebSocket] = []
+def refresh_observations(cities: List[str]):
+    """Make the stale cities due, then run the current-weather job (or join the run in flight).
 
-def open_browser():
-    """Open browser after a short delay"""
-    time.sleep(2)  # Wait for server to start
-    webbrowser.open('http://localhost:8000')
+    The run only polls what the planner's token bucket allows, so reads
+    cannot push upstream requests past POLL_BUDGET_PER_MINUTE.
+    """
+    poll_planner.force(cities)
+    return scheduler.run_now("current_weather")
 
-@app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    active_connections.append(websocket)
-    try:
-        while True:
-            await websocket.receive_text()
-    except Exception as e:
-        if websocket in active_connections:
-            active_connections.remove(websocket)
-
-async def broadcast_weather(weather_data: dict):
-    """Broadcast weather data to all connected clients"""
-    for connection in active_connections:
-        try:
-            await connection.send_json(weather_data)
-        except:
-            if connection in active_connections:
-                active_connections.remove(connection)
-
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database and start background services"""
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize database, run the scheduled jobs and release resources on exit"""
     init_db()
+    db = SessionLocal()
+    try:
+        city_registry.load(db)
+        observation_buffer.warm_start(db)
+    finally:
+        db.close()
     print("\n")
     print("="*50)
     print("Weather Monitoring System is running!")
@@ -61,11 +70,56 @@ async def startup_event():
     print("="*50)
     print("\n")
     
-    # Start periodic updates
-    asyncio.create_task(periodic_weather_update())
+    # All periodic work runs on the scheduler; stale reads trigger the
+    # current-weather job early (joining it if it is already running)
+    background = BackgroundService(scheduler, on_weather=feed.publish, planner=poll_planner, shard=shard)
+    background.register()
+    observation_store.set_refresher(refresh_observations)
+    await feed.start()
+    await scheduler.start()
+    if settings.METRICS_ENABLED:
+        await loop_lag.start()
     
     # Open browser automatically
     threading.Thread(target=open_browser).start()
+    
+    yield
+    
+    await loop_lag.stop()
+    await scheduler.stop()
+    await background.stop()
+    await feed.stop()
+    scheduler.jobs.clear()
+    observation_store.set_refresher(None)
+    await close_fetcher()
+    await dispose_async_engine()
+
+app = FastAPI(title="Weather Monitoring System", lifespan=lifespan)
+
+# Mount static files
+app.mount("/static", StaticFiles(directory="app/static"), name="static")
+app.include_router(forecast_router)
+app.include_router(cities_router)
+app.include_router(history_router)
+
+def open_browser():
+    """Open browser after a short delay"""
+    time.sleep(2)  # Wait for server to start
+    webbrowser.open('http://localhost:8000')
+
+@app.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket, cities: Optional[str] = None, encoding: str = "json"):
+    """Stream keyframes and deltas for the cities in `cities` (comma separated, default all).
+
+    `encoding=msgpack` switches to binary MessagePack frames. Clients can
+    send {"subscribe": [...]}, {"unsubscribe": [...]} or {"resync": true}.
+    """
+    if not encoding_available(encoding):
+        await websocket.close(code=1003)
+        return
+    await websocket.accept()
+    subscription = [name.strip() for name in cities.split(",") if name.strip()] if cities else None
+    await feed.serve(websocket, subscription, encoding)
 
 @app.get("/")
 async def root():
@@ -73,47 +127,96 @@ async def root():
     return FileResponse("app/static/index.html")
 
 @app.get("/api/current-weather")
-async def get_current_weather(db: Session = Depends(get_db)):
-    """Get current weather for all cities"""
-    service = WeatherService(db)
-    data = service.get_current_weather_all_cities()
-    await broadcast_weather(data)
-    return data
+async def get_current_weather():
+    """Get the latest cached weather for all cities"""
+    observation_store.refresh_if_stale()
+    return observation_store.get_all()
 
 @app.get("/api/daily-summaries")
-async def get_daily_summaries(db: Session = Depends(get_db)):
+async def get_daily_summaries(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Get daily summaries for all cities"""
-    service = WeatherService(db)
-    summaries = []
-    for city in settings.CITIES:
-        try:
-            data = service.get_daily_summary(city["name"])
-            if data:
-                summaries.append(data)
-        except Exception as e:
-            print(f"Error getting summary for {city['name']}: {str(e)}")
-    return summaries
+    service = AsyncWeatherService(db)
+    names = [city["name"] for city in city_registry.all()]
+    return await response_cache.respond_async(request, ["summaries"], lambda: service.get_daily_summaries(names))
+
+@app.get("/api/daily-summaries/{city}")
+async def get_daily_summary_history(request: Request, city: str, days: int = 7, db: AsyncSession = Depends(get_async_db)):
+    """Get daily rollups for a city over the last N days"""
+    if city not in city_registry:
+        raise HTTPException(status_code=404, detail="City not found")
+    service = AsyncWeatherService(db)
+    return await response_cache.respond_async(request, ["summaries"], lambda: service.get_summary_history(city, days))
 
 @app.get("/api/alerts")
-async def get_alerts(db: Session = Depends(get_db)):
+async def get_alerts(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Get active weather alerts"""
-    service = WeatherService(db)
-    return service.get_active_alerts()
-
-async def periodic_weather_update():
-    """Update weather data every UPDATE_INTERVAL seconds"""
-    while True:
-        try:
-            db = next(get_db())
-            service = WeatherService(db)
-            data = service.get_current_weather_all_cities()
-            await broadcast_weather(data)
-        except Exception as e:
-            print(f"Error in periodic update: {str(e)}")
-        finally:
-            if db:
-                db.close()
-        await asyncio.sleep(settings.UPDATE_INTERVAL)
+    service = AsyncWeatherService(db)
+    return await response_cache.respond_async(request, ["alerts"], service.get_active_alerts)
+
+@app.get("/api/statistics/{city}/recent")
+async def get_recent_statistics(city: str, hours: float = 1, db: AsyncSession = Depends(get_async_db)):
+    """Get statistics over a city's readings in the last N hours (at most a week)"""
+    if city not in city_registry:
+        raise HTTPException(status_code=404, detail="City not found")
+    if not 0 < hours <= 168:
+        raise HTTPException(status_code=400, detail="hours must be between 0 and 168")
+    stats = await AsyncWeatherService(db).get_recent_statistics(city, hours)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="No readings in that window")
+    return stats
+
+@app.get("/api/stats/db-pool")
+async def get_db_pool_stats():
+    """Get connection pool usage and checkout wait times"""
+    return get_pool_stats()
+
+@app.get("/api/stats/scheduler")
+async def get_scheduler_stats():
+    """Get run counts, durations and next run times of the scheduled jobs"""
+    return scheduler.status()
+
+@app.get("/api/stats/sharding")
+async def get_sharding_stats():
+    """Get this worker's partition leases, or null when polling is not sharded"""
+    return shard.status() if shard is not None else None
+
+@app.get("/api/stats/broadcast")
+async def get_broadcast_stats():
+    """Get WebSocket connection counts, bytes sent, keyframes/deltas and dropped messages"""
+    return feed.stats()
+
+@app.get("/api/stats/response-cache")
+async def get_response_cache_stats():
+    """Get cached response counts, hits, 304s and invalidations"""
+    return response_cache.status()
+
+@app.get("/api/stats/alerts")
+async def get_alert_stats():
+    """Get alert rule counts, open and pending alerts, and rule evaluations per reading"""
+    return alert_engine.stats()
+
+@app.get("/api/stats/observation-buffer")
+async def get_observation_buffer_stats():
+    """Get buffered cities and readings, memory per reading, and buffer hits vs database fallbacks"""
+    return observation_buffer.stats()
+
+@app.get("/api/stats/polling")
+async def get_polling_stats():
+    """Get each city's urgency and current adaptive poll interval"""
+    return poll_planner.status()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics: upstream and query latency, poll sweeps, caches, WebSockets and event loop lag"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=True,
+        ws_per_message_deflate=settings.WS_PER_MESSAGE_DEFLATE
+    )
\ No newline at end of file
@@ -0,0 +1,324 @@
+"""In-process metrics rendered in the Prometheus text format.
+
+Hot paths update counters, gauges and histograms directly (a dict lookup
+and a few additions under a lock). Values that other components already
+keep, such as cache and pool statistics, are read by collectors only when
+/metrics is scraped.
+"""
+import asyncio
+import contextvars
+import functools
+import inspect
+import logging
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+@dataclass
+class MetricFamily:
+    """One metric's samples, as (suffix, labels, value) triples, ready to render"""
+    name: str
+    type: str
+    documentation: str
+    samples: List[Tuple[str, Dict[str, str], float]] = field(default_factory=list)
+
+    def add(self, value: float, suffix: str = "", **labels):
+        self.samples.append((suffix, labels, value))
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(
+            f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}"
+            for suffix, labels, value in self.samples
+        )
+        return lines
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+class _GaugeChild(_CounterChild):
+    def set(self, value: float):
+        self.value = value
+
+class _HistogramChild:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+class Metric(ABC):
+    """A named metric with optional labels; each combination of label values is a child"""
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _new_child(self):
+        """A child holding the values for one combination of labels"""
+
+    @abstractmethod
+    def collect(self) -> MetricFamily:
+        """Every child's samples"""
+
+    def labels(self, *values):
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _items(self):
+        with self._lock:
+            return [(dict(zip(self.labelnames, values)), child) for values, child in self._children.items()]
+
+    def clear(self):
+        with self._lock:
+            self._children.clear()
+
+class Counter(Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, self.type, self.documentation)
+        for labels, child in self._items():
+            family.add(child.value, **labels)
+        return family
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, self.type, self.documentation)
+        for labels, child in self._items():
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                family.add(cumulative, "_bucket", **labels, le=_format_value(float(bound)))
+            family.add(total, "_sum", **labels)
+            family.add(cumulative, "_count", **labels)
+        return family
+
+class MetricsRegistry:
+    """Metrics and scrape-time collectors, rendered together by `render()`"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[MetricFamily]]] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, name: str, collect: Callable[[], Iterable[MetricFamily]]):
+        """Add (or replace) a callable returning metric families when scraped"""
+        with self._lock:
+            self._collectors[name] = collect
+
+    def collect(self) -> List[MetricFamily]:
+        with self._lock:
+            metrics, collectors = list(self._metrics.values()), list(self._collectors.items())
+        families = [metric.collect() for metric in metrics]
+        for name, collect in collectors:
+            try:
+                families.extend(collect())
+            except Exception as e:
+                logger.error(f"Metrics collector {name} failed: {str(e)}")
+        return families
+
+    def render(self) -> str:
+        lines = []
+        for family in self.collect():
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+def cache_families(prefix: str, description: str, counts: Dict[str, int], served: int) -> List[MetricFamily]:
+    """`{prefix}_requests_total` by result plus `{prefix}_hit_ratio`, `served` of the lookups counting as hits"""
+    requests = MetricFamily(f"{prefix}_requests_total", "counter", f"{description} lookups by result")
+    for result, count in counts.items():
+        requests.add(count, result=result)
+    total = sum(counts.values())
+    ratio = MetricFamily(f"{prefix}_hit_ratio", "gauge", f"Share of {description.lower()} lookups that hit")
+    ratio.add(served / total if total else 0.0)
+    return [requests, ratio]
+
+db_query_seconds = metrics.histogram(
+    "weather_db_query_seconds", "Database statement execution time by the service method that issued it", ["method"]
+)
+event_loop_lag_seconds = metrics.histogram(
+    "weather_event_loop_lag_seconds", "How late the event loop woke a sleeping task",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+_query_scope: contextvars.ContextVar = contextvars.ContextVar("query_scope", default="unscoped")
+
+def current_query_scope() -> str:
+    return _query_scope.get()
+
+def instrument_queries(cls):
+    """Class decorator: label queries run inside the class's public methods with "Class.method".
+
+    Generators are left alone, since their body runs after the call returns.
+    """
+    for name, member in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.isfunction(member) or inspect.isgeneratorfunction(member):
+            continue
+        setattr(cls, name, _scoped(member, f"{cls.__name__}.{name}"))
+    return cls
+
+def _scoped(func, scope: str):
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            token = _query_scope.set(scope)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _query_scope.reset(token)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _query_scope.set(scope)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _query_scope.reset(token)
+    return wrapper
+
+def time_queries(engine):
+    """Observe every statement `engine` executes in db_query_seconds"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is not None:
+            db_query_seconds.labels(_query_scope.get()).observe(time.perf_counter() - started)
+
+class LoopLagMonitor:
+    """Samples event loop lag: how much later than requested a short sleep returns"""
+
+    def __init__(self, interval: float = 0.5, histogram: Histogram = event_loop_lag_seconds):
+        self.interval = interval
+        self.histogram = histogram
+        self.last_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.last_lag = max(loop.time() - started - self.interval, 0.0)
+            self.histogram.observe(self.last_lag)
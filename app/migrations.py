@@ -0,0 +1,72 @@
+"""Additive schema migrations for databases created by older versions.
+
+`Base.metadata.create_all` only creates missing tables, so columns and
+indexes added to existing tables have to be created here. Every step is
+idempotent and runs on startup from `init_db`; it can also be run by hand:
+
+    python -m app.migrations
+"""
+import logging
+from typing import List
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from .models.weather import Base
+
+logger = logging.getLogger(__name__)
+
+def ensure_columns(engine: Engine) -> List[str]:
+    """Add any model-defined column missing from an existing table.
+
+    Columns are added as plain nullable columns; server defaults are not
+    back-filled, so new columns must tolerate NULL in old rows.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            logger.info(f"Adding column {table.name}.{column.name}")
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            created.append(f"{table.name}.{column.name}")
+
+    return created
+
+def ensure_indexes(engine: Engine) -> List[str]:
+    """Create any model-defined index missing from an existing table"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            logger.info(f"Creating index {index.name} on {table.name}")
+            index.create(bind=engine)
+            created.append(index.name)
+
+    return created
+
+def run_migrations(engine: Engine) -> List[str]:
+    """Apply every additive migration, returning what was changed"""
+    return ensure_columns(engine) + ensure_indexes(engine)
+
+if __name__ == "__main__":
+    from .database import engine
+
+    logging.basicConfig(level=logging.INFO)
+    changes = run_migrations(engine)
+    print(f"Applied {len(changes)} migration step(s)")
@@ -1,15 +1,27 @@
 from .weather import (
     Base,
+    City,
+    PollerWorker,
+    PollLease,
     WeatherData,
     DailySummary,
+    HourlySummary,
     WeatherAlert,
-    WeatherForecast  # Added new model
+    WeatherForecast,  # Added new model
+    ForecastRun,
+    LatestForecastRun
 )
 
 __all__ = [
     'Base',
+    'City',
+    'PollerWorker',
+    'PollLease',
     'WeatherData',
     'DailySummary',
+    'HourlySummary',
     'WeatherAlert',
-    'WeatherForecast'
+    'WeatherForecast',
+    'ForecastRun',
+    'LatestForecastRun'
 ]
\ No newline at end of file
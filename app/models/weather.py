@@ -1,9 +1,54 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime, create_engine, JSON
+from sqlalchemy import Column, Integer, Float, String, DateTime, Boolean, create_engine, JSON, Index, ForeignKey, DDL, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 
 Base = declarative_base()
 
+class City(Base):
+    """A monitored location; the registry loads these at startup"""
+    __tablename__ = "cities"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    country = Column(String)
+    # OpenWeatherMap city id; lets the poller fetch this city through /group
+    owm_id = Column(Integer)
+    lat = Column(Float, nullable=False)
+    lon = Column(Float, nullable=False)
+    active = Column(Boolean, default=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Import upsert key; names are what every other table refers to
+        Index("uq_cities_name", "name", unique=True),
+    )
+
+class PollerWorker(Base):
+    """A polling process; it is alive while its heartbeat is within the lease TTL"""
+    __tablename__ = "poller_workers"
+
+    id = Column(Integer, primary_key=True)
+    worker_id = Column(String, nullable=False)
+    heartbeat_at = Column(DateTime(timezone=True))
+    started_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("uq_poller_workers_worker_id", "worker_id", unique=True),
+    )
+
+class PollLease(Base):
+    """Exclusive right of one worker to poll a partition of the cities until expires_at"""
+    __tablename__ = "poll_leases"
+
+    id = Column(Integer, primary_key=True)
+    partition = Column(Integer, nullable=False)
+    worker_id = Column(String)
+    expires_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("uq_poll_leases_partition", "partition", unique=True),
+    )
+
 class WeatherData(Base):
     __tablename__ = "weather_data"
 
@@ -18,6 +63,22 @@ class WeatherData(Base):
     weather_condition = Column(String)
     recorded_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # Statistics and daily summaries filter by city and a time range
+        Index("ix_weather_data_city_recorded_at", "city", "recorded_at"),
+    )
+
+# SQLite has no partitioning, so completed months of weather_data are moved
+# to their own tables (see services/partitioning.py) and reads go through a
+# UNION ALL view of them; it starts out covering weather_data alone
+OBSERVATION_VIEW = "weather_observations"
+event.listen(WeatherData.__table__, "after_create", DDL(
+    f"CREATE VIEW IF NOT EXISTS {OBSERVATION_VIEW} AS SELECT * FROM weather_data"
+).execute_if(dialect="sqlite"))
+event.listen(WeatherData.__table__, "before_drop", DDL(
+    f"DROP VIEW IF EXISTS {OBSERVATION_VIEW}"
+).execute_if(dialect="sqlite"))
+
 class DailySummary(Base):
     __tablename__ = "daily_summaries"
 
@@ -30,7 +91,48 @@ class DailySummary(Base):
     avg_humidity = Column(Float)  # Added
     avg_wind_speed = Column(Float)  # Added
     dominant_condition = Column(String)
+    # Running totals so new observations can be folded in without a rescan
+    readings_count = Column(Integer)
+    temperature_sum = Column(Float)
+    humidity_sum = Column(Float)
+    humidity_count = Column(Integer)
+    wind_speed_sum = Column(Float)
+    wind_speed_count = Column(Integer)
+    condition_counts = Column(JSON)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_daily_summaries_city_date", "city", "date"),
+    )
+
+class HourlySummary(Base):
+    """Hourly rollup of a city's observations; kept longer than the raw rows"""
+    __tablename__ = "hourly_summaries"
+
+    id = Column(Integer, primary_key=True)
+    city = Column(String)
+    hour = Column(DateTime(timezone=True))
+    avg_temperature = Column(Float)
+    max_temperature = Column(Float)
+    min_temperature = Column(Float)
+    avg_humidity = Column(Float)
+    avg_wind_speed = Column(Float)
+    dominant_condition = Column(String)
+    readings_count = Column(Integer)
+    temperature_sum = Column(Float)
+    humidity_sum = Column(Float)
+    humidity_count = Column(Integer)
+    wind_speed_sum = Column(Float)
+    wind_speed_count = Column(Integer)
+    condition_counts = Column(JSON)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("uq_hourly_summaries_city_hour", "city", "hour", unique=True),
+        # Retention deletes by hour across all cities
+        Index("ix_hourly_summaries_hour", "hour"),
+    )
 
 class WeatherAlert(Base):
     __tablename__ = "weather_alerts"
@@ -39,13 +141,54 @@ class WeatherAlert(Base):
     city = Column(String)
     alert_type = Column(String)
     message = Column(String)
+    # Rule that opened the alert, the metric value at the time, and when it
+    # cleared; alerts from before the rule engine have no rule_id
+    rule_id = Column(String)
+    value = Column(Float)
+    closed_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # Active alerts are read across all cities by recency, or per city
+        Index("ix_weather_alerts_created_at", "created_at"),
+        Index("ix_weather_alerts_city_created_at", "city", "created_at"),
+        # Open alerts are looked up per city and rule
+        Index("ix_weather_alerts_city_rule_id", "city", "rule_id"),
+    )
+
+class ForecastRun(Base):
+    """One distinct forecast fetched for a city; identical refetches reuse it"""
+    __tablename__ = "forecast_runs"
+
+    id = Column(Integer, primary_key=True)
+    city = Column(String)
+    payload_hash = Column(String)
+    row_count = Column(Integer)
+    fetched_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_forecast_runs_city_id", "city", "id"),
+    )
+
+class LatestForecastRun(Base):
+    """Pointer to the run that forecast reads should use for each city"""
+    __tablename__ = "latest_forecast_runs"
+
+    id = Column(Integer, primary_key=True)
+    city = Column(String)
+    run_id = Column(Integer, ForeignKey("forecast_runs.id"))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("uq_latest_forecast_runs_city", "city", unique=True),
+    )
+
 class WeatherForecast(Base):  # New model for forecasts
     __tablename__ = "weather_forecasts"
 
     id = Column(Integer, primary_key=True)
     city = Column(String)
+    run_id = Column(Integer, ForeignKey("forecast_runs.id"))
     forecast_time = Column(DateTime(timezone=True))
     temperature = Column(Float)
     feels_like = Column(Float)
@@ -53,4 +196,10 @@ class WeatherForecast(Base):  # New model for forecasts
     wind_speed = Column(Float)
     weather_condition = Column(String)
     probability_precipitation = Column(Float)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_weather_forecasts_city_forecast_time", "city", "forecast_time"),
+        # Upsert key: re-writing a run replaces its rows instead of duplicating them
+        Index("uq_weather_forecasts_city_time_run", "city", "forecast_time", "run_id", unique=True),
+    )
\ No newline at end of file
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import List
+
+from ..services.city_registry import city_registry
+from ..schemas.weather import CityResponse
+
+router = APIRouter(prefix="/api/cities", tags=["cities"])
+
+@router.get("", response_model=List[CityResponse])
+def list_cities(offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    """List monitored cities in registry order"""
+    return city_registry.all()[offset:offset + limit]
+
+@router.get("/nearest", response_model=List[CityResponse])
+def get_nearest_cities(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    limit: int = Query(1, ge=1, le=100)
+):
+    """Get the cities closest to a point, nearest first"""
+    return city_registry.nearest(lat, lon, limit)
+
+@router.get("/within", response_model=List[CityResponse])
+def get_cities_within(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180)
+):
+    """Get the cities inside a bounding box (min_lon > max_lon crosses the antimeridian)"""
+    if min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="min_lat must not exceed max_lat")
+    return city_registry.within(min_lat, min_lon, max_lat, max_lon)
+
+@router.get("/{name}", response_model=CityResponse)
+def get_city(name: str):
+    """Get one city by name"""
+    city = city_registry.get(name)
+    if city is None:
+        raise HTTPException(status_code=404, detail="City not found")
+    return city
@@ -1,45 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List
 from datetime import datetime, timedelta
 
-from ..database import get_db
-from ..services.forecast_service import ForecastService
+from ..database import get_async_db
+from ..services.forecast_service import AsyncForecastService
 from ..schemas.weather import ForecastResponse, DailyForecastSummary
-from ..config import settings  # Add this import
+from ..services.city_registry import city_registry
+from ..services.response_cache import response_cache
 
 router = APIRouter(prefix="/api/forecast", tags=["forecast"])
 
+@router.get("/summary", response_model=Dict[str, List[DailyForecastSummary]])
+async def get_forecast_summaries(request: Request, days: int = 5, db: AsyncSession = Depends(get_async_db)):
+    """Get daily forecast summaries for every configured city"""
+    forecast_service = AsyncForecastService(db)
+    try:
+        return await response_cache.respond_async(request, ["forecasts"], lambda: forecast_service.get_daily_forecast_summaries(days=days))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/{city}", response_model=List[ForecastResponse])
-def get_city_forecast(city: str, db: Session = Depends(get_db)):
+async def get_city_forecast(city: str, db: AsyncSession = Depends(get_async_db)):
     """Get 5-day forecast for a city"""
-    forecast_service = ForecastService(db)
+    forecast_service = AsyncForecastService(db)
     
     # Find city configuration
-    city_config = next((c for c in settings.CITIES if c["name"] == city), None)
+    city_config = city_registry.get(city)
     
     if not city_config:
         raise HTTPException(status_code=404, detail="City not found")
     
     try:
-        forecasts = forecast_service.fetch_forecast(city_config)
+        forecasts = await forecast_service.refresh_forecast(city_config)
         return forecasts
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/summary/{city}", response_model=List[DailyForecastSummary])
-def get_forecast_summary(
+async def get_forecast_summary(
+    request: Request,
     city: str, 
     days: int = 5, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get daily summary of forecasts"""
     # Verify city exists
-    if not any(c["name"] == city for c in settings.CITIES):
+    if city not in city_registry:
         raise HTTPException(status_code=404, detail="City not found")
         
-    forecast_service = ForecastService(db)
+    forecast_service = AsyncForecastService(db)
     try:
-        return forecast_service.get_daily_forecast_summary(city, days)
+        return await response_cache.respond_async(request, ["forecasts"], lambda: forecast_service.get_daily_forecast_summary(city, days))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
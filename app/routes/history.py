@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from datetime import datetime
+from urllib.parse import quote
+
+from ..config import settings
+from ..services.city_registry import city_registry
+from ..services.history_export import (
+    ENCODERS,
+    MEDIA_TYPES,
+    HistoryExporter,
+    decode_cursor,
+    pyarrow_available
+)
+
+router = APIRouter(prefix="/api/history", tags=["history"])
+
+def get_history_exporter() -> HistoryExporter:
+    return HistoryExporter()
+
+def content_disposition(filename: str) -> str:
+    """Attachment header with an ASCII fallback name plus the RFC 5987 UTF-8 one"""
+    fallback = "".join(c if " " <= c <= "~" and c not in '"\\' else "_" for c in filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+@router.get("/{city}")
+def export_history(
+    city: str,
+    start: datetime,
+    end: Optional[datetime] = None,
+    format: str = Query("ndjson", pattern="^(ndjson|csv|arrow|parquet)$"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.HISTORY_PAGE_MAX),
+    cursor: Optional[str] = None,
+    exporter: HistoryExporter = Depends(get_history_exporter)
+):
+    """Stream a city's raw observations in [start, end) as NDJSON, CSV, Arrow or Parquet.
+
+    Without `limit` the whole range is streamed. With it, one page is
+    returned and the X-Next-Cursor header (when present) fetches the next.
+    """
+    if city not in city_registry:
+        raise HTTPException(status_code=404, detail="City not found")
+    if format in ("arrow", "parquet") and not pyarrow_available():
+        raise HTTPException(status_code=400, detail=f"{format} export requires pyarrow")
+    if cursor is not None:
+        try:
+            decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    end = end or datetime.utcnow()
+
+    headers = {"Content-Disposition": content_disposition(f"{city}-history.{format}")}
+    if limit is None:
+        batches = exporter.iter_batches(city, start, end, cursor)
+    else:
+        rows, next_cursor = exporter.page(city, start, end, limit, cursor)
+        batches = iter([rows])
+        if next_cursor is not None:
+            headers["X-Next-Cursor"] = next_cursor
+    return StreamingResponse(ENCODERS[format](batches), media_type=MEDIA_TYPES[format], headers=headers)
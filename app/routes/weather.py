@@ -1,10 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from datetime import datetime, timedelta
 
-from ..database import get_db
-from ..models.weather import WeatherData, DailySummary, WeatherAlert
+from ..database import get_async_db
 from ..schemas.weather import (
     WeatherDataResponse, 
     DailySummaryResponse, 
@@ -12,27 +11,28 @@ from ..schemas.weather import (
     CityWeatherResponse,
     WeatherStatsResponse
 )
-from ..services.weather_service import WeatherService
+from ..services.weather_service import AsyncWeatherService
+from ..services.observation_store import observation_store
 
 router = APIRouter(prefix="/api", tags=["weather"])
 
 @router.get("/current-weather", response_model=List[WeatherDataResponse])
-def get_current_weather(db: Session = Depends(get_db)):
+async def get_current_weather():
     """Get current weather for all cities"""
-    weather_service = WeatherService(db)
-    return weather_service.get_current_weather_all_cities()
+    observation_store.refresh_if_stale()
+    return observation_store.get_all()
 
 @router.get("/weather/{city}", response_model=CityWeatherResponse)
-def get_city_weather(city: str, db: Session = Depends(get_db)):
+async def get_city_weather(city: str, db: AsyncSession = Depends(get_async_db)):
     """Get detailed weather information for a specific city"""
-    weather_service = WeatherService(db)
+    weather_service = AsyncWeatherService(db)
     
-    current_weather = weather_service.get_current_weather(city)
+    current_weather = observation_store.get(city)
     if not current_weather:
         raise HTTPException(status_code=404, detail="City not found")
     
-    daily_summary = weather_service.get_latest_summary(city)
-    alerts = weather_service.get_active_alerts(city)
+    daily_summary = await weather_service.get_latest_summary(city)
+    alerts = [alert for alert in await weather_service.get_active_alerts() if alert["city"] == city]
     
     return CityWeatherResponse(
         current_weather=current_weather,
@@ -41,27 +41,30 @@ def get_city_weather(city: str, db: Session = Depends(get_db)):
     )
 
 @router.get("/daily-summary/{city}", response_model=DailySummaryResponse)
-def get_daily_summary(city: str, db: Session = Depends(get_db)):
+async def get_daily_summary(city: str, db: AsyncSession = Depends(get_async_db)):
     """Get daily weather summary for a specific city"""
-    weather_service = WeatherService(db)
-    summary = weather_service.get_latest_summary(city)
+    weather_service = AsyncWeatherService(db)
+    summary = await weather_service.get_latest_summary(city)
     
     if not summary:
         raise HTTPException(status_code=404, detail="Summary not found")
     return summary
 
 @router.get("/alerts", response_model=List[AlertResponse])
-def get_alerts(db: Session = Depends(get_db)):
+async def get_alerts(db: AsyncSession = Depends(get_async_db)):
     """Get all active weather alerts"""
-    weather_service = WeatherService(db)
-    return weather_service.get_active_alerts()
+    weather_service = AsyncWeatherService(db)
+    return await weather_service.get_active_alerts()
 
 @router.get("/statistics/{city}", response_model=WeatherStatsResponse)
-def get_city_statistics(
+async def get_city_statistics(
     city: str, 
     days: int = 7, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get statistical analysis of weather data for a city"""
-    weather_service = WeatherService(db)
-    return weather_service.calculate_statistics(city, days)
\ No newline at end of file
+    weather_service = AsyncWeatherService(db)
+    stats = await weather_service.get_statistics(city, days)
+    if not stats:
+        raise HTTPException(status_code=404, detail="No readings for that period")
+    return stats
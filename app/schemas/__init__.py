@@ -1,4 +1,5 @@
 from .weather import (
+    CityResponse,
     WeatherBase,
     WeatherDataResponse,
     DailySummaryBase,
@@ -12,6 +13,7 @@ from .weather import (
 )
 
 __all__ = [
+    'CityResponse',
     'WeatherBase',
     'WeatherDataResponse',
     'DailySummaryBase',
@@ -2,7 +2,64 @@ from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional, List
 
-# ... (keep existing schemas) ...
+class CityResponse(BaseModel):
+    name: str
+    country: Optional[str] = None
+    owm_id: Optional[int] = None
+    lat: float
+    lon: float
+    distance_km: Optional[float] = None
+
+class WeatherBase(BaseModel):
+    city: str
+    temperature: float
+    feels_like: float
+    weather_condition: str
+
+class WeatherDataResponse(WeatherBase):
+    humidity: Optional[float] = None
+    wind_speed: Optional[float] = None
+    wind_direction: Optional[float] = None
+    pressure: Optional[float] = None
+    recorded_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class DailySummaryBase(BaseModel):
+    city: str
+    avg_temperature: float
+    max_temperature: float
+    min_temperature: float
+    dominant_condition: str
+
+class DailySummaryResponse(DailySummaryBase):
+    date: str
+    avg_humidity: Optional[float] = None
+    avg_wind_speed: Optional[float] = None
+    readings_count: Optional[int] = None
+
+class AlertBase(BaseModel):
+    city: str
+    type: str
+    message: str
+
+class AlertResponse(AlertBase):
+    created_at: datetime
+
+class CityWeatherResponse(BaseModel):
+    current_weather: WeatherDataResponse
+    daily_summary: Optional[DailySummaryResponse] = None
+    active_alerts: List[AlertResponse]
+
+class WeatherStatsResponse(BaseModel):
+    city: str
+    period_days: int
+    avg_temperature: float
+    max_temperature: float
+    min_temperature: float
+    readings_count: int
+    dominant_condition: str
 
 class ForecastResponse(BaseModel):
     city: str
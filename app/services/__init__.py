@@ -1,9 +1,40 @@
-from .weather_service import WeatherService
+from .weather_service import WeatherService, AsyncWeatherService
 from .background_service import BackgroundService
-from .forecast_service import ForecastService  # Added
+from .forecast_service import ForecastService, AsyncForecastService
+from .weather_fetcher import WeatherFetcher
+from .observation_store import ObservationStore
+from .rollup_service import RollupService
+from .scheduler import Scheduler
+from .poll_planner import PollPlanner
+from .city_registry import CityRegistry
+from .upstream_adapter import UpstreamAdapter, SingleRequestAdapter, GroupedRequestAdapter
+from .broadcast import Broadcaster
+from .observation_feed import ObservationFeed
+from .response_cache import ResponseCache
+from .history_export import HistoryExporter
+from .alert_rules import AlertEngine, AlertRule
+from .observation_buffer import ObservationBuffer
 
 __all__ = [
     'WeatherService',
+    'AsyncWeatherService',
     'BackgroundService',
-    'ForecastService'
+    'ForecastService',
+    'AsyncForecastService',
+    'WeatherFetcher',
+    'ObservationStore',
+    'RollupService',
+    'Scheduler',
+    'PollPlanner',
+    'CityRegistry',
+    'UpstreamAdapter',
+    'SingleRequestAdapter',
+    'GroupedRequestAdapter',
+    'Broadcaster',
+    'ObservationFeed',
+    'ResponseCache',
+    'HistoryExporter',
+    'AlertEngine',
+    'AlertRule',
+    'ObservationBuffer'
 ]
\ No newline at end of file
@@ -0,0 +1,274 @@
+import json
+import logging
+import operator
+import threading
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+RULE_KINDS = ("threshold", "rate")
+
+# (kind, field): the metric a rule watches
+MetricKey = Tuple[str, str]
+
+@dataclass
+class AlertRule:
+    """A compiled alert rule.
+
+    The rule's metric is an observation field ("threshold") or that field's
+    change per hour between consecutive readings ("rate"). An alert opens
+    once `count` consecutive readings satisfy `metric <op> value` and closes
+    when the metric no longer does, or, with `clear` set, only once it is
+    back past `clear` (hysteresis). `cities` limits the rule to those cities.
+    """
+    id: str
+    field: str
+    op: str
+    value: float
+    kind: str = "threshold"
+    count: int = 1
+    clear: Optional[float] = None
+    cities: Optional[FrozenSet[str]] = None
+    alert_type: str = ""
+    message: str = ""
+
+    def __post_init__(self):
+        if self.op not in OPERATORS:
+            raise ValueError(f"Rule {self.id}: unknown operator {self.op!r}")
+        if self.kind not in RULE_KINDS:
+            raise ValueError(f"Rule {self.id}: unknown kind {self.kind!r}")
+        if self.count < 1:
+            raise ValueError(f"Rule {self.id}: count must be at least 1")
+        self.upper = self.op in (">", ">=")
+        if self.clear is not None and (self.clear > self.value if self.upper else self.clear < self.value):
+            raise ValueError(f"Rule {self.id}: clear must be on the far side of value from the alert")
+        self.alert_type = self.alert_type or self.id.upper()
+        self.metric: MetricKey = (self.kind, self.field)
+        self._compare = OPERATORS[self.op]
+
+    def matches(self, metric: float) -> bool:
+        return self._compare(metric, self.value)
+
+    def clears(self, metric: float) -> bool:
+        if self.clear is None:
+            return not self._compare(metric, self.value)
+        return metric < self.clear if self.upper else metric > self.clear
+
+    def describe(self, city: str, metric: float) -> str:
+        if self.message:
+            return self.message.format(city=city, value=round(metric, 2), threshold=self.value, field=self.field)
+        unit = "/h" if self.kind == "rate" else ""
+        return f"{self.field} {round(metric, 2)}{unit} {self.op} {self.value}{unit} in {city}"
+
+def parse_rule(spec: Dict) -> AlertRule:
+    spec = dict(spec)
+    if spec.get("cities") is not None:
+        spec["cities"] = frozenset(spec["cities"])
+    return AlertRule(**spec)
+
+def default_rules() -> List[AlertRule]:
+    """ALERT_RULES if configured, otherwise the single high-temperature rule"""
+    if settings.ALERT_RULES:
+        return [parse_rule(spec) for spec in json.loads(settings.ALERT_RULES)]
+    return [AlertRule(
+        id="high_temperature",
+        alert_type="HIGH_TEMPERATURE",
+        field="temperature",
+        op=">",
+        value=settings.TEMPERATURE_THRESHOLD,
+        message="Temperature {value}°C exceeds threshold of {threshold}°C"
+    )]
+
+@dataclass
+class AlertEvent:
+    rule: AlertRule
+    city: str
+    state: str  # "open" or "close"
+    value: float
+    at: datetime
+
+class _BoundaryIndex:
+    """Rules sorted by every threshold at which their state can change"""
+
+    def __init__(self, rules: List[AlertRule]):
+        boundaries = sorted(
+            (
+                (threshold, i)
+                for i, rule in enumerate(rules)
+                for threshold in {rule.value, rule.clear}
+                if threshold is not None
+            ),
+            key=lambda item: item[0]
+        )
+        self.thresholds = [threshold for threshold, _ in boundaries]
+        self.rules = [rules[i] for _, i in boundaries]
+        self.low, self.high = self.thresholds[0], self.thresholds[-1]
+
+    def between(self, low: float, high: float) -> List[AlertRule]:
+        if high < self.low or low > self.high:
+            return []
+        return self.rules[bisect_left(self.thresholds, low):bisect_right(self.thresholds, high)]
+
+@dataclass
+class _CityState:
+    metrics: Dict[MetricKey, float] = field(default_factory=dict)
+    readings: Dict[str, Tuple[float, datetime]] = field(default_factory=dict)
+    open: Set[str] = field(default_factory=set)
+    pending: Dict[str, int] = field(default_factory=dict)
+
+class AlertEngine:
+    """Evaluates alert rules incrementally over the observation stream.
+
+    Each (rule, city) pair is a small state machine: idle, pending while
+    fewer than `count` consecutive readings match, then open until the
+    metric clears. A rule's state can only change when the metric crosses
+    one of its thresholds, so rules are indexed by metric, scope (all
+    cities, or one) and direction with their thresholds sorted. A reading
+    then touches only the rules whose thresholds lie between the previous
+    and the new metric, plus that city's pending rules, instead of every
+    rule in the set.
+    """
+
+    def __init__(self, rules: Optional[Iterable[AlertRule]] = None):
+        self._lock = threading.Lock()
+        self._states: Dict[str, _CityState] = {}
+        self.evaluations = 0
+        self.readings = 0
+        self.load(default_rules() if rules is None else rules)
+
+    def load(self, rules: Iterable[AlertRule]):
+        """Compile a new rule set; state of rules that are kept carries over"""
+        rules = list(rules)
+        grouped: Dict[Tuple[Optional[str], MetricKey, bool], List[AlertRule]] = {}
+        for rule in rules:
+            for scope in (rule.cities or [None]):
+                grouped.setdefault((scope, rule.metric, rule.upper), []).append(rule)
+        with self._lock:
+            self.rules = {rule.id: rule for rule in rules}
+            self._indexes = {key: _BoundaryIndex(group) for key, group in grouped.items()}
+            self._scoped: Dict[Optional[str], Dict[MetricKey, List[Tuple[bool, _BoundaryIndex]]]] = {}
+            for (scope, metric, upper), index in self._indexes.items():
+                self._scoped.setdefault(scope, {}).setdefault(metric, []).append((upper, index))
+            self._fields = {rule.field for rule in rules}
+            self._rate_fields = {rule.field for rule in rules if rule.kind == "rate"}
+            for state in self._states.values():
+                state.open &= self.rules.keys()
+                state.pending = {rule_id: n for rule_id, n in state.pending.items() if rule_id in self.rules}
+        logger.info(f"Loaded {len(self.rules)} alert rule(s) into {len(self._indexes)} index(es)")
+
+    def known(self, city: str) -> bool:
+        return city in self._states
+
+    def restore(self, city: str, open_rule_ids: Iterable[str]):
+        """Seed a city's open alerts, e.g. from the database after a restart"""
+        with self._lock:
+            state = self._states.setdefault(city, _CityState())
+            state.open.update(rule_id for rule_id in open_rule_ids if rule_id in self.rules)
+
+    def forget(self, cities: Iterable[str]):
+        """Drop cities' state so the next reading restores it, e.g. after a failed commit"""
+        with self._lock:
+            for city in cities:
+                self._states.pop(city, None)
+
+    def evaluate(self, observations: Iterable[Dict]) -> List[AlertEvent]:
+        """Advance every affected state machine by one batch of observations"""
+        events: List[AlertEvent] = []
+        with self._lock:
+            for observation in observations:
+                events.extend(self._observe(observation))
+        return events
+
+    def _observe(self, observation: Dict) -> Iterator[AlertEvent]:
+        city = observation["city"]
+        at = observation.get("recorded_at") or datetime.utcnow()
+        state = self._states.setdefault(city, _CityState())
+        metrics = self._metrics(state, observation, at)
+        self.readings += 1
+
+        touched: Dict[str, AlertRule] = {}
+        for scope in (None, city):
+            for metric, indexes in self._scoped.get(scope, {}).items():
+                current = metrics.get(metric)
+                if current is None:
+                    continue
+                previous = state.metrics.get(metric)
+                if previous == current:
+                    continue
+                for upper, index in indexes:
+                    if previous is not None:
+                        low, high = (previous, current) if previous < current else (current, previous)
+                    elif upper:
+                        low, high = float("-inf"), current
+                    else:
+                        low, high = current, float("inf")
+                    for rule in index.between(low, high):
+                        touched[rule.id] = rule
+        for rule_id in state.pending:
+            touched[rule_id] = self.rules[rule_id]
+        # Alerts restored without a previous reading have no crossing to detect
+        for rule_id in state.open:
+            if self.rules[rule_id].metric not in state.metrics:
+                touched[rule_id] = self.rules[rule_id]
+        state.metrics.update(metrics)
+
+        for rule in touched.values():
+            current = metrics.get(rule.metric)
+            if current is None:
+                continue
+            self.evaluations += 1
+            if rule.id in state.open:
+                if rule.clears(current):
+                    state.open.discard(rule.id)
+                    yield AlertEvent(rule, city, "close", current, at)
+            elif rule.matches(current):
+                seen = state.pending.get(rule.id, 0) + 1
+                if seen >= rule.count:
+                    state.pending.pop(rule.id, None)
+                    state.open.add(rule.id)
+                    yield AlertEvent(rule, city, "open", current, at)
+                else:
+                    state.pending[rule.id] = seen
+            else:
+                state.pending.pop(rule.id, None)
+
+    def _metrics(self, state: _CityState, observation: Dict, at: datetime) -> Dict[MetricKey, float]:
+        """Each watched field's value and, against the city's previous reading, its change per hour"""
+        metrics = {}
+        for name in self._fields:
+            value = observation.get(name)
+            if value is None:
+                continue
+            metrics[("threshold", name)] = value
+            if name not in self._rate_fields:
+                continue
+            previous = state.readings.get(name)
+            if previous is not None:
+                hours = (at - previous[1]).total_seconds() / 3600
+                if hours > 0:
+                    metrics[("rate", name)] = (value - previous[0]) / hours
+            state.readings[name] = (value, at)
+        return metrics
+
+    def open_alerts(self) -> Dict[str, List[str]]:
+        with self._lock:
+            return {city: sorted(state.open) for city, state in self._states.items() if state.open}
+
+    def stats(self) -> Dict:
+        return {
+            "rules": len(self.rules),
+            "indexes": len(self._indexes),
+            "cities": len(self._states),
+            "open": sum(len(state.open) for state in self._states.values()),
+            "pending": sum(len(state.pending) for state in self._states.values()),
+            "readings": self.readings,
+            "evaluations": self.evaluations
+        }
+
+alert_engine = AlertEngine()
@@ -1,54 +1,184 @@
 import asyncio
 import logging
-from datetime import datetime
-from sqlalchemy.orm import Session
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
 from ..database import SessionLocal
 from ..services.weather_service import WeatherService
+from ..services.forecast_service import ForecastService
+from ..services.rollup_service import RollupService
+from ..services.retention import RetentionService
+from ..services.observation_store import observation_store
+from ..services.poll_planner import PollPlanner
+from ..services.city_registry import city_registry
+from ..services.scheduler import Scheduler
+from ..services.weather_fetcher import WeatherFetcher, get_fetcher
+from ..services.upstream_adapter import UpstreamAdapter, create_upstream_adapter
+from ..services.sharding import ShardCoordinator
+from ..services.alert_rules import alert_engine
 from ..config import settings
+from ..metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+poll_sweep_seconds = metrics.histogram(
+    "weather_poll_sweep_seconds", "Current-weather poll sweeps by phase: upstream fetch, then database store", ["phase"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+observations_ingested = metrics.counter("weather_observations_ingested_total", "Observations stored by poll sweeps")
+sweep_rows_per_second = metrics.gauge("weather_poll_sweep_rows_per_second", "Observations stored per second in the last sweep")
+
 class BackgroundService:
-    def __init__(self):
-        self.running = False
-        self.update_interval = settings.UPDATE_INTERVAL
-
-    async def start(self):
-        self.running = True
-        while self.running:
-            try:
-                self._process_weather_updates()
-                await asyncio.sleep(self.update_interval)
-            except Exception as e:
-                logger.error(f"Error in background service: {str(e)}")
-                await asyncio.sleep(10)  # Wait before retrying
-
-    def stop(self):
-        self.running = False
-
-    def _process_weather_updates(self):
+    """Periodic ingest jobs, registered with and run by the Scheduler.
+
+    Upstream requests run on the event loop; database writes go through
+    the scheduler's thread pool so they never block it. With a shard
+    coordinator only the cities in partitions this worker holds are polled,
+    and the poll budget is scaled to this worker's share. `on_weather`
+    receives each batch of new observations.
+    """
+
+    def __init__(
+        self,
+        scheduler: Scheduler,
+        fetcher: Optional[WeatherFetcher] = None,
+        on_weather: Optional[Callable[[List[Dict]], Awaitable]] = None,
+        planner: Optional[PollPlanner] = None,
+        adapter: Optional[UpstreamAdapter] = None,
+        shard: Optional[ShardCoordinator] = None
+    ):
+        self.scheduler = scheduler
+        self._fetcher = fetcher
+        self.adapter = adapter or create_upstream_adapter(fetcher)
+        self.planner = planner or PollPlanner()
+        self.shard = shard
+        self._planned_versions = None
+        self.on_weather = on_weather
+        self._last_reconciled = None
+
+    @property
+    def fetcher(self) -> WeatherFetcher:
+        return self._fetcher or get_fetcher()
+
+    def register(self):
+        jitter = settings.SCHEDULER_JITTER
+        if self.shard is not None:
+            self.scheduler.add_job("shard_heartbeat", self.shard_heartbeat, self.shard.lease_ttl / 3)
+        self.scheduler.add_job("current_weather", self.update_current_weather, settings.POLL_TICK_INTERVAL)
+        self.scheduler.add_job("forecasts", self.update_forecasts, settings.FORECAST_UPDATE_INTERVAL, jitter=jitter)
+        self.scheduler.add_job("rollup_reconcile", self.reconcile_rollups, settings.ROLLUP_RECONCILE_INTERVAL, jitter=jitter)
+        self.scheduler.add_job("retention", self.enforce_retention, settings.RETENTION_INTERVAL, jitter=jitter)
+
+    async def update_current_weather(self) -> List[Dict]:
+        """Poll the cities the planner says are due, store them, then fill the observation store and notify listeners"""
+        self._sync_planner()
+        now = time.monotonic()
+        due = self.planner.due(now, self.planner.allowance(now))
+        cities = [city for city in (city_registry.get(name) for name in due) if city is not None and self._owns(city)]
+        if not cities:
+            return []
+        for city in cities:
+            self.planner.mark_polled(city["name"], now)
+
+        logger.info(f"Fetching weather updates for {len(cities)} city(ies)...")
+        # Bypass the response cache's TTL: the planner decided this city needs a poll
+        started = time.perf_counter()
+        fetched = await self.adapter.fetch_current(cities, revalidate=True)
+        fetched_at = time.perf_counter()
         db = SessionLocal()
         try:
-            weather_service = WeatherService(db)
-            
-            # Update weather data for all cities
-            logger.info("Fetching weather updates...")
-            for city in settings.CITIES:
-                try:
-                    weather_data = weather_service.fetch_city_weather(city)
-                    logger.info(f"Updated weather data for {city['name']}: {weather_data.temperature}°C")
-                except Exception as e:
-                    logger.error(f"Error updating weather for {city['name']}: {str(e)}")
-
-            # Generate daily summaries if needed
-            current_hour = datetime.now().hour
-            if current_hour == 0:  # Generate summaries at midnight
-                logger.info("Generating daily summaries...")
-                for city in settings.CITIES:
-                    try:
-                        weather_service.generate_daily_summary(city["name"])
-                    except Exception as e:
-                        logger.error(f"Error generating summary for {city['name']}: {str(e)}")
+            data = await self.scheduler.run_blocking(WeatherService(db).store_current_weather, fetched)
+        finally:
+            db.close()
+        stored_at = time.perf_counter()
+        poll_sweep_seconds.labels("fetch").observe(fetched_at - started)
+        poll_sweep_seconds.labels("store").observe(stored_at - fetched_at)
+        observations_ingested.inc(len(data))
+        sweep_rows_per_second.set(len(data) / (stored_at - started))
+        for observation in data:
+            self.planner.observe(observation["city"], observation["temperature"], now)
+        observation_store.update(data)
+        if self.on_weather is not None and data:
+            await self.on_weather(data)
+        return data
+
+    async def update_forecasts(self) -> int:
+        cities = [city for city in city_registry.all() if self._owns(city)]
+        if not cities:
+            return 0
+        db = SessionLocal()
+        try:
+            service = ForecastService(db)
+            fetched = await service.fetch_forecast_rows(cities, self.fetcher)
+            written = await self.scheduler.run_blocking(service.store_forecast_runs, fetched)
+        finally:
+            db.close()
+        logger.info(f"Stored {written} forecast row(s) for {len(fetched)} city(ies)")
+        return written
+
+    async def reconcile_rollups(self):
+        """Rebuild yesterday's rollups from the raw table once a day to pick up late writes"""
+        yesterday = datetime.utcnow().date() - timedelta(days=1)
+        if self._last_reconciled == yesterday:
+            return
+        # The backfill covers every city; with sharding, partition 0's holder runs it
+        if self.shard is not None and 0 not in self.shard.owned:
+            return
+        logger.info(f"Reconciling daily summaries for {yesterday}...")
+        await self.scheduler.run_blocking(self._backfill, yesterday)
+        self._last_reconciled = yesterday
 
+    async def enforce_retention(self) -> Dict[str, List[str]]:
+        """Create upcoming partitions and drop expired ones (partition 0's holder only, when sharded)"""
+        if self.shard is not None and 0 not in self.shard.owned:
+            return {}
+        return await self.scheduler.run_blocking(self._with_session, lambda db: RetentionService(db).run())
+
+    async def shard_heartbeat(self):
+        await self.scheduler.run_blocking(self._with_session, self.shard.heartbeat)
+        # Catch every lease change, even one reversed before the next poll tick
+        self._sync_planner()
+
+    async def stop(self):
+        """Hand this worker's partitions back so others pick them up at once"""
+        if self.shard is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._with_session, self.shard.release)
+
+    def _owns(self, city: Dict) -> bool:
+        return self.shard is None or self.shard.owns(city["name"])
+
+    def _sync_planner(self):
+        """Point the planner at the cities this worker polls when the registry or its shard changes.
+
+        Alert state for cities handed to another worker is dropped, so if
+        they come back it is reloaded from the alerts that worker committed.
+        """
+        versions = (
+            city_registry.version,
+            (self.shard.version, bool(self.shard.owned)) if self.shard is not None else None
+        )
+        if versions == self._planned_versions:
+            return
+        names = city_registry.names()
+        if self.shard is not None:
+            names = self.shard.owned_cities(names)
+            self.planner.budget_per_minute = max(settings.POLL_BUDGET_PER_MINUTE * self.shard.share, 1.0)
+        lost = set(self.planner.cities) - set(names)
+        if lost:
+            alert_engine.forget(lost)
+        self.planner.sync(names)
+        self._planned_versions = versions
+
+    def _with_session(self, func):
+        db = SessionLocal()
+        try:
+            return func(db)
+        finally:
+            db.close()
+
+    def _backfill(self, day):
+        db = SessionLocal()
+        try:
+            RollupService(db).backfill(day, day)
         finally:
-            db.close()
\ No newline at end of file
+            db.close()
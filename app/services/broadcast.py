@@ -0,0 +1,317 @@
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Set, Union
+
+from ..config import settings
+from ..metrics import MetricFamily
+
+logger = logging.getLogger(__name__)
+
+MessageHandler = Callable[[Dict], Awaitable[None]]
+Payload = Union[str, bytes]
+
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+PG_NOTIFY_LIMIT = 7900
+
+class ClientConnection:
+    """One WebSocket client with a bounded queue of pre-encoded messages.
+
+    A sender task drains the queue, so a slow client only delays itself.
+    When the queue is full the oldest message is dropped and the client is
+    marked `lagged`; a message offered with `supersede` (a full snapshot)
+    replaces everything still queued and clears the mark.
+    """
+
+    def __init__(self, websocket, queue_size: int, send_timeout: float, encoding: str = "json"):
+        self.websocket = websocket
+        self.send_timeout = send_timeout
+        self.encoding = encoding
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # Cities the client subscribed to, or None for every city
+        self.cities: Optional[FrozenSet[str]] = None
+        self.since_keyframe = 0
+        self.lagged = False
+        self.sent = 0
+        self.bytes_sent = 0
+        self.dropped = 0
+        self.closed = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, on_close: Callable[["ClientConnection"], None]):
+        self._task = asyncio.ensure_future(self._send_loop(on_close))
+
+    def offer(self, payload: Payload, supersede: bool = False):
+        """Queue a message without waiting, displacing the oldest if full"""
+        if self.closed:
+            return
+        if supersede:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.dropped += 1
+            self.lagged = False
+        elif self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            self.lagged = True
+        self.queue.put_nowait(payload)
+
+    async def _send_loop(self, on_close):
+        try:
+            # close() sets `closed` before cancelling: wait_for can swallow a
+            # cancellation that lands just as a send completes
+            while not self.closed:
+                payload = await self.queue.get()
+                if isinstance(payload, bytes):
+                    await asyncio.wait_for(self.websocket.send_bytes(payload), self.send_timeout)
+                else:
+                    await asyncio.wait_for(self.websocket.send_text(payload), self.send_timeout)
+                self.sent += 1
+                self.bytes_sent += len(payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"Dropping WebSocket client: {str(e) or type(e).__name__}")
+        finally:
+            self.closed = True
+            on_close(self)
+
+    async def close(self):
+        self.closed = True
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+def encoding_available(encoding: str) -> bool:
+    """Whether messages can be encoded as `encoding` ("json" or "msgpack")"""
+    if encoding == "json":
+        return True
+    if encoding == "msgpack":
+        try:
+            import msgpack  # noqa: F401
+        except ImportError:
+            return False
+        return True
+    return False
+
+def encode_message(message: Any, encoding: str = "json") -> Payload:
+    """JSON text, or MessagePack bytes for binary clients"""
+    if encoding == "msgpack":
+        import msgpack
+        return msgpack.packb(message, default=str)
+    return json.dumps(message, separators=(",", ":"), default=str)
+
+class Backplane(ABC):
+    """Carries broadcast messages to every worker, including the sender"""
+
+    @abstractmethod
+    async def start(self, handler: MessageHandler):
+        """Deliver every published message to `handler`"""
+
+    @abstractmethod
+    async def publish(self, message: Dict):
+        """Send a message to every started worker"""
+
+    async def stop(self):
+        pass
+
+class InMemoryBackplane(Backplane):
+    """Single-process backplane; Broadcasters sharing one instance behave like workers"""
+
+    def __init__(self):
+        self._handlers: List[MessageHandler] = []
+
+    async def start(self, handler: MessageHandler):
+        self._handlers.append(handler)
+
+    async def publish(self, message: Dict):
+        await asyncio.gather(*(handler(message) for handler in list(self._handlers)))
+
+    async def stop(self):
+        self._handlers.clear()
+
+def split_message(message: Dict, limit: int) -> List[str]:
+    """Serialize a message into payloads under `limit` bytes by splitting its `data` list"""
+    payload = json.dumps(message, separators=(",", ":"), default=str)
+    if len(payload.encode()) < limit:
+        return [payload]
+    data = message.get("data")
+    if not isinstance(data, list) or len(data) < 2:
+        raise ValueError(f"Message of {len(payload)} bytes does not fit the backplane")
+    middle = len(data) // 2
+    return (split_message({**message, "data": data[:middle]}, limit)
+            + split_message({**message, "data": data[middle:]}, limit))
+
+class PostgresBackplane(Backplane):
+    """LISTEN/NOTIFY on a dedicated asyncpg connection.
+
+    NOTIFY payloads are capped near 8kB, so messages whose `data` is a list
+    (observation batches) are split into several notifications. An asyncpg
+    connection runs one query at a time, so publishes are serialized.
+    """
+
+    def __init__(self, dsn: Optional[str] = None, channel: Optional[str] = None):
+        self.dsn = dsn
+        self.channel = channel or settings.BROADCAST_CHANNEL
+        self._connection = None
+        self._handler: Optional[MessageHandler] = None
+        self._publish_lock: Optional[asyncio.Lock] = None
+        # Handler tasks for received notifications, kept until they finish
+        self._pending: Set[asyncio.Task] = set()
+
+    def _dsn(self) -> str:
+        if self.dsn:
+            return self.dsn
+        from ..database import build_database_url
+        return build_database_url().set(drivername="postgresql").render_as_string(hide_password=False)
+
+    async def start(self, handler: MessageHandler):
+        import asyncpg
+
+        self._handler = handler
+        self._connection = await asyncpg.connect(self._dsn())
+        await self._connection.add_listener(self.channel, self._on_notify)
+        logger.info(f"Listening for broadcasts on channel {self.channel}")
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.error(f"Ignoring malformed broadcast on {channel}")
+            return
+        task = asyncio.ensure_future(self._handler(message))
+        self._pending.add(task)
+        task.add_done_callback(self._handled)
+
+    def _handled(self, task: asyncio.Task):
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Error handling broadcast on {self.channel}: {str(task.exception())}")
+
+    async def publish(self, message: Dict):
+        if self._publish_lock is None:
+            self._publish_lock = asyncio.Lock()
+        async with self._publish_lock:
+            for payload in split_message(message, PG_NOTIFY_LIMIT):
+                await self._connection.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+
+    async def stop(self):
+        await asyncio.gather(*self._pending, return_exceptions=True)
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+def create_backplane(kind: Optional[str] = None) -> Backplane:
+    """Backplane for BROADCAST_BACKPLANE ("memory" or "postgres")"""
+    kind = (kind or settings.BROADCAST_BACKPLANE).lower()
+    if kind == "memory":
+        return InMemoryBackplane()
+    if kind == "postgres":
+        return PostgresBackplane()
+    raise ValueError(f"Unknown broadcast backplane: {kind}")
+
+class Broadcaster:
+    """Fans messages out to this worker's WebSocket clients via a shared backplane.
+
+    publish() goes through the backplane so every worker receives it. On
+    receipt, `on_message` turns the message into what clients should get,
+    or None to send nothing. That is encoded once per client encoding and
+    offered to every local connection without waiting on any of them.
+    """
+
+    def __init__(
+        self,
+        backplane: Optional[Backplane] = None,
+        on_message: Optional[Callable[[Dict], Any]] = None,
+        queue_size: Optional[int] = None,
+        send_timeout: Optional[float] = None
+    ):
+        self.backplane = backplane or create_backplane()
+        self.on_message = on_message
+        self.queue_size = queue_size or settings.BROADCAST_QUEUE_SIZE
+        self.send_timeout = send_timeout or settings.BROADCAST_SEND_TIMEOUT
+        self.connections: Set[ClientConnection] = set()
+        self.messages = 0
+        self.dropped = 0
+        self.sent = 0
+        self.bytes_sent = 0
+
+    async def start(self):
+        await self.backplane.start(self._receive)
+
+    async def stop(self):
+        await self.backplane.stop()
+        await asyncio.gather(*(connection.close() for connection in list(self.connections)))
+        self.connections.clear()
+
+    def connect(self, websocket, encoding: str = "json") -> ClientConnection:
+        connection = ClientConnection(websocket, self.queue_size, self.send_timeout, encoding)
+        self.connections.add(connection)
+        connection.start(self._forget)
+        return connection
+
+    async def disconnect(self, connection: ClientConnection):
+        self._forget(connection)
+        await connection.close()
+
+    def _forget(self, connection: ClientConnection):
+        if connection in self.connections:
+            self.connections.discard(connection)
+            self.dropped += connection.dropped
+            self.sent += connection.sent
+            self.bytes_sent += connection.bytes_sent
+
+    async def publish(self, message: Dict):
+        await self.backplane.publish(message)
+
+    async def _receive(self, message: Dict):
+        try:
+            outgoing = self.on_message(message) if self.on_message is not None else message
+        except Exception as e:
+            logger.error(f"Error handling broadcast: {str(e)}")
+            return
+        if outgoing is not None:
+            self.send_local(outgoing)
+
+    def send_local(self, outgoing: Any):
+        """Encode once per encoding and queue for every client connected to this worker"""
+        self.messages += 1
+        payloads: Dict[str, Payload] = {}
+        for connection in list(self.connections):
+            if connection.encoding not in payloads:
+                payloads[connection.encoding] = encode_message(outgoing, connection.encoding)
+            connection.offer(payloads[connection.encoding])
+
+    def stats(self) -> Dict:
+        connections = list(self.connections)
+        return {
+            "backplane": type(self.backplane).__name__,
+            "connections": len(connections),
+            "messages": self.messages,
+            "sent": self.sent + sum(c.sent for c in connections),
+            "bytes_sent": self.bytes_sent + sum(c.bytes_sent for c in connections),
+            "dropped": self.dropped + sum(c.dropped for c in connections),
+            "queued": sum(c.queue.qsize() for c in connections),
+            "max_queue_depth": max((c.queue.qsize() for c in connections), default=0)
+        }
+
+    def metric_families(self) -> List[MetricFamily]:
+        stats = self.stats()
+        by_encoding = Counter(c.encoding for c in list(self.connections))
+        connections = MetricFamily("weather_ws_connections", "gauge", "WebSocket clients connected to this worker")
+        for encoding in ("json", "msgpack"):
+            connections.add(by_encoding.get(encoding, 0), encoding=encoding)
+        families = [connections]
+        for name, kind, description, value in (
+            ("weather_ws_send_queue_messages", "gauge", "Messages waiting in client send queues", stats["queued"]),
+            ("weather_ws_send_queue_max_depth", "gauge", "Longest client send queue", stats["max_queue_depth"]),
+            ("weather_ws_messages_sent_total", "counter", "Frames sent to clients", stats["sent"]),
+            ("weather_ws_bytes_sent_total", "counter", "Bytes sent to clients", stats["bytes_sent"]),
+            ("weather_ws_messages_dropped_total", "counter", "Frames dropped because a client fell behind", stats["dropped"])
+        ):
+            family = MetricFamily(name, kind, description)
+            family.add(value)
+            families.append(family)
+        return families
@@ -0,0 +1,165 @@
+import csv
+import json
+import logging
+import math
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.weather import City
+from .persistence import bulk_upsert
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+IMPORT_BATCH_SIZE = 5000
+
+def _unit_vectors(lat, lon) -> np.ndarray:
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+def parse_city_rows(rows: Iterable[Dict]) -> List[Dict]:
+    """Validate raw import rows into registry dicts; the last row wins for a repeated name"""
+    cities = {}
+    for number, row in enumerate(rows, start=1):
+        name = (row.get("name") or "").strip()
+        try:
+            lat, lon = float(row["lat"]), float(row["lon"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Row {number}: lat and lon must be numbers")
+        if not name:
+            raise ValueError(f"Row {number}: name is required")
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError(f"Row {number}: coordinates out of range for {name}")
+        owm_id = row.get("owm_id")
+        cities[name] = {
+            "name": name,
+            "country": row.get("country") or None,
+            "owm_id": int(owm_id) if owm_id not in (None, "") else None,
+            "lat": lat,
+            "lon": lon
+        }
+    return list(cities.values())
+
+def read_city_file(path: str, fmt: Optional[str] = None) -> List[Dict]:
+    """Read cities from a CSV (name,lat,lon[,country,owm_id] header) or a JSON array of objects"""
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".")).lower()
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            return parse_city_rows(csv.DictReader(f))
+        if fmt == "json":
+            return parse_city_rows(json.load(f))
+    raise ValueError(f"Unsupported city file format: {fmt}")
+
+class CityRegistry:
+    """In-memory index over the monitored cities.
+
+    Names resolve through a dict. Bounding-box queries walk a grid of
+    `cell_size`-degree cells, and nearest-city queries compare unit vectors,
+    which stays correct across the antimeridian and near the poles. The
+    registry starts out with settings.CITIES. load() replaces it with the
+    `cities` table, and `version` changes whenever the contents do.
+    """
+
+    def __init__(self, cities: Optional[Iterable[Dict]] = None, cell_size: float = 1.0):
+        self.cell_size = cell_size
+        self.version = 0
+        self.replace(settings.CITIES if cities is None else cities)
+
+    def replace(self, cities: Iterable[Dict]):
+        """Rebuild every index from `cities`"""
+        self._cities: List[Dict] = [dict(city) for city in cities]
+        self._by_name: Dict[str, Dict] = {city["name"]: city for city in self._cities}
+        self._grid: Dict[Tuple[int, int], List[Dict]] = defaultdict(list)
+        for city in self._cities:
+            self._grid[self._cell(city["lat"], city["lon"])].append(city)
+        lat = np.array([city["lat"] for city in self._cities], dtype=float)
+        lon = np.array([city["lon"] for city in self._cities], dtype=float)
+        self._vectors = _unit_vectors(lat, lon)
+        self.version += 1
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_size), math.floor(lon / self.cell_size)
+
+    def __len__(self) -> int:
+        return len(self._cities)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._by_name
+
+    def get(self, name: str) -> Optional[Dict]:
+        return self._by_name.get(name)
+
+    def all(self) -> List[Dict]:
+        return list(self._cities)
+
+    def names(self) -> List[str]:
+        return [city["name"] for city in self._cities]
+
+    def within(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[Dict]:
+        """Cities inside a bounding box; min_lon > max_lon wraps across the antimeridian"""
+        if min_lon > max_lon:
+            return self.within(min_lat, min_lon, max_lat, 180.0) + self.within(min_lat, -180.0, max_lat, max_lon)
+
+        lat_lo, lon_lo = self._cell(min_lat, min_lon)
+        lat_hi, lon_hi = self._cell(max_lat, max_lon)
+        found = []
+        for i in range(lat_lo, lat_hi + 1):
+            for j in range(lon_lo, lon_hi + 1):
+                for city in self._grid.get((i, j), ()):
+                    if min_lat <= city["lat"] <= max_lat and min_lon <= city["lon"] <= max_lon:
+                        found.append(city)
+        return found
+
+    def nearest(self, lat: float, lon: float, limit: int = 1) -> List[Dict]:
+        """The `limit` closest cities, nearest first, each with its distance_km"""
+        if not self._cities or limit <= 0:
+            return []
+        # Chord length on the unit sphere orders points like great-circle distance
+        chord = np.linalg.norm(self._vectors - _unit_vectors([lat], [lon]), axis=1)
+        limit = min(limit, len(chord))
+        closest = np.argpartition(chord, limit - 1)[:limit]
+        closest = closest[np.argsort(chord[closest])]
+        return [
+            {**self._cities[i], "distance_km": round(2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord[i] / 2)), 3)}
+            for i in closest
+        ]
+
+    def load(self, db: Session) -> int:
+        """Replace the registry with the active rows of the cities table.
+
+        An empty table is seeded from settings.CITIES first.
+        """
+        if db.execute(select(City.id).limit(1)).first() is None:
+            logger.info(f"Seeding cities table with {len(settings.CITIES)} configured cities")
+            bulk_upsert(db, City, parse_city_rows(settings.CITIES), ["name"])
+            db.commit()
+
+        rows = db.execute(
+            select(City.name, City.country, City.owm_id, City.lat, City.lon)
+            .where(City.active.isnot(False))
+            .order_by(City.id)
+        ).all()
+        self.replace(
+            {"name": r.name, "country": r.country, "owm_id": r.owm_id, "lat": r.lat, "lon": r.lon}
+            for r in rows
+        )
+        logger.info(f"Loaded {len(self)} cities into the registry")
+        return len(self)
+
+    def import_cities(self, db: Session, rows: Iterable[Dict]) -> int:
+        """Validate and upsert cities by name in batches, then reload. Returns rows imported."""
+        cities = parse_city_rows(rows)
+        for start in range(0, len(cities), IMPORT_BATCH_SIZE):
+            batch = [{**city, "active": True} for city in cities[start:start + IMPORT_BATCH_SIZE]]
+            bulk_upsert(db, City, batch, ["name"])
+        db.commit()
+        self.load(db)
+        return len(cities)
+
+city_registry = CityRegistry()
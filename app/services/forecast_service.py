@@ -1,92 +1,257 @@
-import requests
+import asyncio
+import hashlib
+import json
+import pandas as pd
 from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Dict
+from typing import List, Dict, Optional
 import logging
 
-from ..models.weather import WeatherForecast
+from ..models.weather import WeatherForecast, ForecastRun, LatestForecastRun
 from ..config import settings
+from ..metrics import instrument_queries
+from .persistence import bulk_upsert
+from .city_registry import city_registry
+from .response_cache import response_cache
+from .weather_fetcher import WeatherFetcher, get_fetcher
 
 logger = logging.getLogger(__name__)
 
+def _payload_hash(rows: List[Dict]) -> str:
+    """Content hash of a city's forecast rows, used to skip unchanged refetches"""
+    content = sorted(
+        (row["forecast_time"].isoformat(), row["temperature"], row["feels_like"], row["humidity"],
+         row["wind_speed"], row["weather_condition"], row["probability_precipitation"])
+        for row in rows
+    )
+    return hashlib.sha256(json.dumps(content).encode()).hexdigest()
+
+@instrument_queries
 class ForecastService:
     def __init__(self, db: Session):
         self.db = db
-        self.api_key = settings.OPENWEATHER_API_KEY
 
-    def fetch_forecast(self, city: Dict) -> List[WeatherForecast]:
-        """Fetch 5-day weather forecast for a city"""
+    async def fetch_forecast_rows(self, cities: Optional[List[Dict]] = None, fetcher: Optional[WeatherFetcher] = None) -> Dict[str, List[Dict]]:
+        """Fetch and parse forecasts for a sweep of cities without touching the database"""
+        fetcher = fetcher or get_fetcher()
+        cities = cities if cities is not None else city_registry.all()
+        results = await asyncio.gather(
+            *(fetcher.fetch_forecast(city) for city in cities),
+            return_exceptions=True
+        )
+        
+        fetched = {}
+        for city, result in zip(cities, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error fetching forecast for {city['name']}: {str(result)}")
+                continue
+            fetched[city["name"]] = self._forecast_rows(city, result)
+        return fetched
+
+    def store_forecast_runs(self, forecasts: Dict[str, List[Dict]]) -> int:
+        """Version a batch of fetched forecasts, writing only those that changed.
+
+        A city whose rows hash the same as its latest run is skipped. Any
+        other city gets a new run: its rows are upserted on (city,
+        forecast_time, run_id), the latest-run pointer moves to it and runs
+        beyond FORECAST_RUN_RETENTION are pruned. Every row dict is tagged
+        with the run it belongs to. Returns the number of rows written.
+        """
+        latest = self._latest_runs(list(forecasts))
+        new_runs = {}
+        for city, rows in forecasts.items():
+            if not rows:
+                continue
+            payload_hash = _payload_hash(rows)
+            run = latest.get(city)
+            if run is not None and run.payload_hash == payload_hash:
+                for row in rows:
+                    row["run_id"] = run.id
+                continue
+            new_runs[city] = ForecastRun(city=city, payload_hash=payload_hash, row_count=len(rows))
+        
+        if not new_runs:
+            return 0
+        
         try:
-            url = "https://api.openweathermap.org/data/2.5/forecast"
-            params = {
-                "lat": city["lat"],
-                "lon": city["lon"],
-                "appid": self.api_key,
-                "units": "metric"
-            }
+            self.db.add_all(new_runs.values())
+            self.db.flush()
             
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            forecasts = []
-            for item in data["list"]:
-                forecast = WeatherForecast(
-                    city=city["name"],
-                    forecast_time=datetime.fromtimestamp(item["dt"]),
-                    temperature=item["main"]["temp"],
-                    feels_like=item["main"]["feels_like"],
-                    humidity=item["main"]["humidity"],
-                    wind_speed=item["wind"]["speed"],
-                    weather_condition=item["weather"][0]["main"],
-                    probability_precipitation=item.get("pop", 0) * 100
-                )
-                forecasts.append(forecast)
-                self.db.add(forecast)
+            forecast_rows = []
+            for city, run in new_runs.items():
+                for row in forecasts[city]:
+                    row["run_id"] = run.id
+                forecast_rows.extend(forecasts[city])
             
+            result = bulk_upsert(self.db, WeatherForecast, forecast_rows, ["city", "forecast_time", "run_id"])
+            bulk_upsert(self.db, LatestForecastRun, [
+                {"city": city, "run_id": run.id, "updated_at": datetime.utcnow()}
+                for city, run in new_runs.items()
+            ], ["city"])
+            self.prune_forecast_runs(list(new_runs), commit=False)
             self.db.commit()
-            return forecasts
-            
-        except Exception as e:
-            logger.error(f"Error fetching forecast for {city['name']}: {str(e)}")
+        except Exception:
+            self.db.rollback()
             raise
+        response_cache.invalidate("forecasts")
+        
+        logger.info(
+            f"Stored {len(new_runs)} new forecast run(s), {result.rows} rows "
+            f"({result.rows_per_sec:.0f} rows/sec); {len(forecasts) - len(new_runs)} unchanged"
+        )
+        return result.rows
+
+    def prune_forecast_runs(self, cities: Optional[List[str]] = None, commit: bool = True) -> int:
+        """Delete runs older than the newest FORECAST_RUN_RETENTION per city.
+
+        Rows stored before runs existed (run_id NULL) are dropped as well once
+        the city has a run. Returns the number of runs deleted.
+        """
+        if cities is None:
+            cities = city_registry.names()
+        
+        expired_ids = []
+        for city in cities:
+            expired_ids.extend(self.db.execute(
+                select(ForecastRun.id)
+                .where(ForecastRun.city == city)
+                .order_by(ForecastRun.id.desc())
+                .offset(settings.FORECAST_RUN_RETENTION)
+            ).scalars())
+        
+        if expired_ids:
+            self.db.query(WeatherForecast).filter(
+                WeatherForecast.run_id.in_(expired_ids)
+            ).delete(synchronize_session=False)
+            self.db.query(ForecastRun).filter(
+                ForecastRun.id.in_(expired_ids)
+            ).delete(synchronize_session=False)
+        
+        self.db.query(WeatherForecast).filter(
+            WeatherForecast.city.in_(
+                select(LatestForecastRun.city).where(LatestForecastRun.city.in_(cities))
+            ),
+            WeatherForecast.run_id.is_(None)
+        ).delete(synchronize_session=False)
+        
+        if commit:
+            self.db.commit()
+        return len(expired_ids)
+
+    def _latest_runs(self, cities: List[str]) -> Dict[str, ForecastRun]:
+        runs = self.db.query(ForecastRun).join(
+            LatestForecastRun, LatestForecastRun.run_id == ForecastRun.id
+        ).filter(LatestForecastRun.city.in_(cities))
+        return {run.city: run for run in runs}
+
+    @staticmethod
+    def _forecast_rows(city: Dict, data: Dict) -> List[Dict]:
+        return [{
+            "city": city["name"],
+            "forecast_time": datetime.fromtimestamp(item["dt"]),
+            "temperature": item["main"]["temp"],
+            "feels_like": item["main"]["feels_like"],
+            "humidity": item["main"]["humidity"],
+            "wind_speed": item["wind"]["speed"],
+            "weather_condition": item["weather"][0]["main"],
+            "probability_precipitation": item.get("pop", 0) * 100
+        } for item in data["list"]]
 
     def get_daily_forecast_summary(self, city: str, days: int = 5) -> List[Dict]:
         """Get daily summary of forecasts"""
-        end_date = datetime.utcnow() + timedelta(days=days)
-        forecasts = self.db.query(WeatherForecast).filter(
-            WeatherForecast.city == city,
-            WeatherForecast.forecast_time <= end_date
-        ).all()
+        return self.get_daily_forecast_summaries([city], days).get(city, [])
+
+    def get_daily_forecast_summaries(self, cities: Optional[List[str]] = None, days: int = 5) -> Dict[str, List[Dict]]:
+        """Daily forecast summaries for several cities from one query.
+
+        Only each city's latest forecast run is read, and only from the start
+        of today to `days` ahead, so repeated fetches are not double-counted
+        and old forecasts are never scanned.
+        Grouping and aggregation run as vectorized pandas operations.
+        """
+        if cities is None:
+            cities = city_registry.names()
         
-        # Group forecasts by day
-        daily_summaries = {}
-        for forecast in forecasts:
-            day = forecast.forecast_time.date()
-            if day not in daily_summaries:
-                daily_summaries[day] = {
-                    "temperatures": [],
-                    "humidity": [],
-                    "wind_speed": [],
-                    "conditions": []
-                }
-            
-            daily_summaries[day]["temperatures"].append(forecast.temperature)
-            daily_summaries[day]["humidity"].append(forecast.humidity)
-            daily_summaries[day]["wind_speed"].append(forecast.wind_speed)
-            daily_summaries[day]["conditions"].append(forecast.weather_condition)
+        frame = self._load_latest_forecasts(cities, days)
+        if frame.empty:
+            return {}
+        
+        frame["date"] = pd.to_datetime(frame["forecast_time"]).dt.strftime("%Y-%m-%d")
+        keys = ["city", "date"]
+        
+        summary = frame.groupby(keys, sort=True).agg(
+            avg_temperature=("temperature", "mean"),
+            max_temperature=("temperature", "max"),
+            min_temperature=("temperature", "min"),
+            avg_humidity=("humidity", "mean"),
+            avg_wind_speed=("wind_speed", "mean")
+        )
         
-        # Calculate summaries
-        result = []
-        for day, data in daily_summaries.items():
-            result.append({
-                "date": day.strftime("%Y-%m-%d"),
-                "avg_temperature": sum(data["temperatures"]) / len(data["temperatures"]),
-                "max_temperature": max(data["temperatures"]),
-                "min_temperature": min(data["temperatures"]),
-                "avg_humidity": sum(data["humidity"]) / len(data["humidity"]),
-                "avg_wind_speed": sum(data["wind_speed"]) / len(data["wind_speed"]),
-                "dominant_condition": max(set(data["conditions"]), key=data["conditions"].count)
-            })
+        # Most frequent condition per day, ties broken alphabetically
+        conditions = (
+            frame.groupby(keys + ["weather_condition"]).size().rename("n").reset_index()
+            .sort_values(keys + ["n", "weather_condition"], ascending=[True, True, False, True])
+            .drop_duplicates(keys)
+            .set_index(keys)["weather_condition"]
+        )
+        summary["dominant_condition"] = conditions
+        summary = summary.reset_index()
         
-        return result
\ No newline at end of file
+        result: Dict[str, List[Dict]] = {}
+        for record in summary.to_dict("records"):
+            city = record.pop("city")
+            result.setdefault(city, []).append(record)
+        return result
+
+    def _load_latest_forecasts(self, cities: List[str], days: int) -> pd.DataFrame:
+        start = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        end = datetime.utcnow() + timedelta(days=days)
+        
+        latest_runs = select(LatestForecastRun.run_id).where(LatestForecastRun.city.in_(cities))
+        
+        columns = [
+            WeatherForecast.city,
+            WeatherForecast.forecast_time,
+            WeatherForecast.temperature,
+            WeatherForecast.humidity,
+            WeatherForecast.wind_speed,
+            WeatherForecast.weather_condition
+        ]
+        rows = self.db.execute(
+            select(*columns).where(
+                WeatherForecast.city.in_(cities),
+                WeatherForecast.run_id.in_(latest_runs),
+                WeatherForecast.forecast_time >= start,
+                WeatherForecast.forecast_time <= end
+            )
+        ).all()
+        return pd.DataFrame.from_records(rows, columns=[c.key for c in columns])
+
+class AsyncForecastService:
+    """ForecastService's request-path operations over an AsyncSession.
+
+    The upstream fetch is awaited as before; the database work runs through
+    `AsyncSession.run_sync` on the asyncio driver.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def refresh_forecast(self, city: Dict, fetcher: Optional[WeatherFetcher] = None) -> List[WeatherForecast]:
+        """Fetch a city's forecast through the shared upstream cache and store it"""
+        fetcher = fetcher or get_fetcher()
+        try:
+            rows = ForecastService._forecast_rows(city, await fetcher.fetch_forecast(city))
+            await self.db.run_sync(lambda session: ForecastService(session).store_forecast_runs({city["name"]: rows}))
+            return [WeatherForecast(**row) for row in rows]
+        except Exception as e:
+            logger.error(f"Error fetching forecast for {city['name']}: {str(e)}")
+            raise
+
+    async def get_daily_forecast_summary(self, city: str, days: int = 5) -> List[Dict]:
+        return await self.db.run_sync(lambda session: ForecastService(session).get_daily_forecast_summary(city, days))
+
+    async def get_daily_forecast_summaries(self, cities: Optional[List[str]] = None, days: int = 5) -> Dict[str, List[Dict]]:
+        return await self.db.run_sync(lambda session: ForecastService(session).get_daily_forecast_summaries(cities, days))
@@ -0,0 +1,250 @@
+import base64
+import csv
+import io
+import logging
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..metrics import instrument_queries
+from .partitioning import observation_source
+
+logger = logging.getLogger(__name__)
+
+# Exported columns, in output order
+HISTORY_COLUMNS = [
+    "city",
+    "recorded_at",
+    "temperature",
+    "feels_like",
+    "humidity",
+    "wind_speed",
+    "wind_direction",
+    "pressure",
+    "weather_condition"
+]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+def _naive_utc(value: datetime) -> datetime:
+    """Observations are stored as naive UTC; convert aware bounds to match"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def encode_cursor(recorded_at: datetime, row_id: int) -> str:
+    """Opaque keyset cursor pointing just past a row"""
+    raw = f"{_naive_utc(recorded_at).isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        recorded_at, row_id = raw.split("|")
+        return datetime.fromisoformat(recorded_at), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def pyarrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+@instrument_queries
+class HistoryExporter:
+    """Reads a city's raw observations in (recorded_at, id) order without holding them all.
+
+    Rows are fetched in batches through a server-side cursor (yield_per,
+    which streams results on PostgreSQL), so memory stays at one batch
+    however long the range. Pages continue from a keyset cursor rather
+    than an OFFSET, so each page costs the same as the first.
+    """
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None, batch_size: Optional[int] = None):
+        if session_factory is None:
+            from ..database import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.batch_size = batch_size or settings.HISTORY_BATCH_SIZE
+
+    def query(
+        self,
+        db: Session,
+        city: str,
+        start: datetime,
+        end: datetime,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ):
+        source = observation_source(db)
+        columns = [source.c[name] for name in HISTORY_COLUMNS]
+        stmt = select(*columns, source.c.id).where(
+            source.c.city == city,
+            source.c.recorded_at >= _naive_utc(start),
+            source.c.recorded_at < _naive_utc(end)
+        )
+        if cursor is not None:
+            after_recorded_at, after_id = decode_cursor(cursor)
+            stmt = stmt.where(or_(
+                source.c.recorded_at > after_recorded_at,
+                and_(source.c.recorded_at == after_recorded_at, source.c.id > after_id)
+            ))
+        stmt = stmt.order_by(source.c.recorded_at, source.c.id)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return stmt
+
+    def iter_batches(
+        self,
+        city: str,
+        start: datetime,
+        end: datetime,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Iterator[List[Tuple]]:
+        """Yield lists of rows (HISTORY_COLUMNS then id), at most `batch_size` at a time.
+
+        The session lives as long as the generator, so this can feed a
+        streaming response after the request handler has returned.
+        """
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                self.query(db, city, start, end, cursor, limit),
+                execution_options={"yield_per": self.batch_size}
+            )
+            for batch in result.partitions():
+                yield [tuple(row) for row in batch]
+        finally:
+            db.close()
+
+    def page(
+        self,
+        city: str,
+        start: datetime,
+        end: datetime,
+        limit: int,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Tuple], Optional[str]]:
+        """One page of at most `limit` rows and the cursor of the next page, if any"""
+        rows = [row for batch in self.iter_batches(city, start, end, cursor, limit + 1) for row in batch]
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, encode_cursor(last[HISTORY_COLUMNS.index("recorded_at")], last[-1])
+
+def _records(batch: List[Tuple]) -> Iterator[Dict]:
+    for row in batch:
+        yield dict(zip(HISTORY_COLUMNS, row))
+
+def encode_ndjson(batches: Iterable[List[Tuple]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield b"".join(orjson.dumps(record) + b"\n" for record in _records(batch))
+
+def encode_csv(batches: Iterable[List[Tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(HISTORY_COLUMNS)
+    for batch in batches:
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row[:len(HISTORY_COLUMNS)]]
+            for row in batch
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _arrow_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("city", pa.string()),
+        ("recorded_at", pa.timestamp("us", tz="UTC")),
+        ("temperature", pa.float64()),
+        ("feels_like", pa.float64()),
+        ("humidity", pa.float64()),
+        ("wind_speed", pa.float64()),
+        ("wind_direction", pa.float64()),
+        ("pressure", pa.float64()),
+        ("weather_condition", pa.string())
+    ])
+
+def _arrow_batch(batch: List[Tuple], schema):
+    import pyarrow as pa
+
+    columns = list(zip(*batch)) if batch else [()] * len(HISTORY_COLUMNS)
+    return pa.RecordBatch.from_arrays(
+        [pa.array(columns[i], type=field.type) for i, field in enumerate(schema)],
+        schema=schema
+    )
+
+def encode_arrow(batches: Iterable[List[Tuple]]) -> Iterator[bytes]:
+    """Arrow IPC stream, one record batch per fetched batch"""
+    import pyarrow as pa
+
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema)
+    for batch in batches:
+        writer.write_batch(_arrow_batch(batch, schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+def encode_parquet(batches: Iterable[List[Tuple]]) -> Iterator[bytes]:
+    """Parquet with one row group per fetched batch; the footer comes last"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    for batch in batches:
+        writer.write_batch(_arrow_batch(batch, schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+ENCODERS = {
+    "ndjson": encode_ndjson,
+    "csv": encode_csv,
+    "arrow": encode_arrow,
+    "parquet": encode_parquet
+}
@@ -0,0 +1,258 @@
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..metrics import cache_families, metrics
+from .partitioning import observation_source
+
+logger = logging.getLogger(__name__)
+
+# Numeric fields kept per reading, as float32 (NaN when missing)
+BUFFER_FIELDS = ("temperature", "feels_like", "humidity", "wind_speed", "wind_direction", "pressure")
+
+# Condition code 0 means no condition; the rest are assigned on first sight
+_MAX_CONDITIONS = 255
+
+def _epoch(value) -> int:
+    """Seconds since the epoch for a naive-UTC or aware datetime, or an ISO string"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+def _from_epoch(seconds: int) -> datetime:
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+
+class _CityRing:
+    """Fixed-capacity columns of one city's readings, oldest overwritten first"""
+
+    def __init__(self, capacity: int, complete_since: int):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.columns = {name: np.full(capacity, np.nan, dtype=np.float32) for name in BUFFER_FIELDS}
+        self.conditions = np.zeros(capacity, dtype=np.uint8)
+        self.count = 0
+        # Every reading of this city at or after this epoch second is held
+        self.complete_since = complete_since
+
+    @property
+    def size(self) -> int:
+        return min(self.count, self.capacity)
+
+    @property
+    def newest(self) -> Optional[int]:
+        return int(self.timestamps[(self.count - 1) % self.capacity]) if self.count else None
+
+    def nbytes(self) -> int:
+        return self.timestamps.nbytes + self.conditions.nbytes + sum(c.nbytes for c in self.columns.values())
+
+    def extend(self, timestamps: np.ndarray, columns: Dict[str, np.ndarray], conditions: np.ndarray) -> int:
+        """Append readings in time order, skipping any not newer than the newest held"""
+        newest = self.newest
+        if newest is not None:
+            keep = timestamps > newest
+            timestamps, conditions = timestamps[keep], conditions[keep]
+            columns = {name: values[keep] for name, values in columns.items()}
+        if len(timestamps) > self.capacity:
+            # Only the last `capacity` readings fit; the ones before them are lost
+            self.complete_since = max(self.complete_since, int(timestamps[-self.capacity - 1]) + 1)
+            timestamps, conditions = timestamps[-self.capacity:], conditions[-self.capacity:]
+            columns = {name: values[-self.capacity:] for name, values in columns.items()}
+        added = len(timestamps)
+        if not added:
+            return 0
+
+        slots = (self.count + np.arange(added)) % self.capacity
+        overwritten = slots if self.count >= self.capacity else slots[slots < self.count]
+        if len(overwritten):
+            self.complete_since = max(self.complete_since, int(self.timestamps[overwritten].max()) + 1)
+        self.timestamps[slots] = timestamps
+        self.conditions[slots] = conditions
+        for name, values in columns.items():
+            self.columns[name][slots] = values
+        self.count += added
+        return added
+
+    def window(self, since: int) -> np.ndarray:
+        """Positions of the held readings at or after `since`"""
+        return np.flatnonzero(self.timestamps[:self.size] >= since)
+
+class ObservationBuffer:
+    """Recent readings per city in compact NumPy ring buffers.
+
+    Each reading costs a timestamp, six float32 fields and a one-byte
+    condition code (33 bytes) rather than an ORM instance. The buffer is
+    warm-started from the database for the last `hours` and then fed every
+    published batch, so windowed aggregates over recent readings are
+    computed in memory. `covers` says whether a window is fully held; when
+    it is not (before warm start, for a city with no buffered readings, or
+    once a city's ring has wrapped past the window) callers fall back to
+    the database. With POLL_SHARDING on the in-memory backplane, other
+    workers' batches never arrive, so nothing counts as covered.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, hours: Optional[float] = None, complete: Optional[bool] = None):
+        self.capacity = capacity or settings.OBSERVATION_BUFFER_CAPACITY
+        self.hours = settings.OBSERVATION_BUFFER_HOURS if hours is None else hours
+        if complete is None:
+            complete = not (settings.POLL_SHARDING and settings.BROADCAST_BACKPLANE.lower() == "memory")
+        # Whether every worker's published batches reach this buffer
+        self.complete = complete
+        self._rings: Dict[str, _CityRing] = {}
+        self._codes: Dict[str, int] = {}
+        self._conditions: List[Optional[str]] = [None]
+        self._lock = threading.Lock()
+        self.loaded_since: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _code(self, condition: Optional[str]) -> int:
+        if not condition:
+            return 0
+        code = self._codes.get(condition)
+        if code is None:
+            if len(self._conditions) > _MAX_CONDITIONS:
+                return 0
+            code = self._codes[condition] = len(self._conditions)
+            self._conditions.append(condition)
+        return code
+
+    def _ring(self, city: str) -> _CityRing:
+        ring = self._rings.get(city)
+        if ring is None:
+            # A city first seen after warm start had no readings in the window
+            ring = self._rings[city] = _CityRing(self.capacity, self.loaded_since or 0)
+        return ring
+
+    def _extend(self, city: str, rows: List[Tuple]):
+        rows = sorted(rows, key=lambda row: row[0])
+        timestamps = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        conditions = np.fromiter((self._code(row[2]) for row in rows), dtype=np.uint8, count=len(rows))
+        columns = {
+            name: np.array([np.nan if row[1][i] is None else row[1][i] for row in rows], dtype=np.float32)
+            for i, name in enumerate(BUFFER_FIELDS)
+        }
+        self._ring(city).extend(timestamps, columns, conditions)
+
+    def extend(self, observations: Iterable[Dict]):
+        """Add a batch of observations (API views or WeatherData-shaped dicts)"""
+        grouped: Dict[str, List] = {}
+        for observation in observations:
+            if observation.get("recorded_at") is None or observation.get("temperature") is None:
+                continue
+            grouped.setdefault(observation["city"], []).append((
+                _epoch(observation["recorded_at"]),
+                [observation.get(name) for name in BUFFER_FIELDS],
+                observation.get("weather_condition")
+            ))
+        with self._lock:
+            for city, rows in grouped.items():
+                self._extend(city, rows)
+
+    def warm_start(self, db: Session, now: Optional[datetime] = None, batch_size: int = 50000) -> int:
+        """Load the last `hours` of raw observations for every city"""
+        now = now or datetime.utcnow()
+        since = now - timedelta(hours=self.hours)
+        source = observation_source(db)
+        result = db.execute(
+            select(source.c.city, source.c.recorded_at, source.c.weather_condition, *[source.c[name] for name in BUFFER_FIELDS])
+            .where(source.c.recorded_at >= since)
+            .order_by(source.c.recorded_at, source.c.id),
+            execution_options={"yield_per": batch_size}
+        )
+        loaded = 0
+        with self._lock:
+            self._rings.clear()
+            self.loaded_since = _epoch(since)
+            for batch in result.partitions():
+                grouped: Dict[str, List] = {}
+                for row in batch:
+                    grouped.setdefault(row[0], []).append((_epoch(row[1]), list(row[3:]), row[2]))
+                for city, rows in grouped.items():
+                    self._extend(city, rows)
+                loaded += len(batch)
+        logger.info(f"Warm-started observation buffer with {loaded} reading(s) for {len(self._rings)} city(ies)")
+        return loaded
+
+    def covers(self, city: str, since: datetime) -> bool:
+        """Whether every reading of `city` from `since` on is held in memory"""
+        if self.loaded_since is None or not self.complete:
+            return False
+        ring = self._rings.get(city)
+        # A city with no readings here may be ingested by a worker whose
+        # batches do not reach this buffer, so let the database answer
+        if ring is None:
+            return False
+        return _epoch(since) >= ring.complete_since
+
+    def aggregate(self, city: str, since: datetime) -> Optional[Dict]:
+        """Aggregates over a city's readings since a point in time, computed on the arrays.
+
+        Returns the same fields as the database aggregates, or None when
+        there are no readings in the window.
+        """
+        with self._lock:
+            ring = self._rings.get(city)
+            if ring is None:
+                return None
+            positions = ring.window(_epoch(since))
+            if not len(positions):
+                return None
+            temperature = ring.columns["temperature"][positions]
+            humidity = ring.columns["humidity"][positions]
+            wind_speed = ring.columns["wind_speed"][positions]
+            counts = np.bincount(ring.conditions[positions], minlength=len(self._conditions))
+            conditions = list(self._conditions)
+
+        counts[0] = 0
+        dominant = None
+        if counts.any():
+            # Most frequent condition, ties broken alphabetically as in SQL
+            dominant = min(conditions[code] for code in np.flatnonzero(counts == counts.max()))
+        return {
+            "avg_temperature": float(temperature.mean(dtype=np.float64)),
+            "max_temperature": round(float(temperature.max()), 2),
+            "min_temperature": round(float(temperature.min()), 2),
+            "avg_humidity": self._mean(humidity),
+            "avg_wind_speed": self._mean(wind_speed),
+            "readings_count": int(len(positions)),
+            "dominant_condition": dominant
+        }
+
+    def _mean(self, values: np.ndarray) -> Optional[float]:
+        present = values[~np.isnan(values)]
+        return float(present.mean(dtype=np.float64)) if len(present) else None
+
+    def latest(self, city: str) -> Optional[datetime]:
+        ring = self._rings.get(city)
+        return _from_epoch(ring.newest) if ring is not None and ring.count else None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            readings = sum(ring.size for ring in self._rings.values())
+            nbytes = sum(ring.nbytes() for ring in self._rings.values())
+            return {
+                "cities": len(self._rings),
+                "capacity": self.capacity,
+                "readings": readings,
+                "bytes": nbytes,
+                "bytes_per_reading": round(nbytes / (self.capacity * len(self._rings)), 1) if self._rings else 0.0,
+                "conditions": len(self._conditions) - 1,
+                "warm": self.loaded_since is not None,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+    def metric_families(self):
+        counts = {"hit": self.hits, "miss": self.misses}
+        return cache_families("weather_observation_buffer", "Observation buffer", counts, self.hits)
+
+observation_buffer = ObservationBuffer()
+metrics.register_collector("observation_buffer", observation_buffer.metric_families)
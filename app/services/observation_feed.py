@@ -0,0 +1,200 @@
+import json
+import logging
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from ..config import settings
+from .broadcast import Backplane, Broadcaster, ClientConnection, Payload, encode_message
+from .observation_store import ObservationStore
+
+logger = logging.getLogger(__name__)
+
+# Keys that name the city rather than describe its weather; frames key by city
+IDENTITY_FIELDS = ("city", "name")
+
+def changed_fields(previous: Optional[Dict], current: Dict) -> Dict:
+    """Fields of `current` that `previous` lacks or holds a different value for"""
+    if previous is None:
+        return dict(current)
+    return {key: value for key, value in current.items() if key not in previous or previous[key] != value}
+
+def _city_names(value) -> Optional[List[str]]:
+    """A command's city list; "*" means every city"""
+    if value == "*":
+        return None
+    if not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+        raise ValueError("cities must be a list of names or \"*\"")
+    return value
+
+class ObservationFeed:
+    """Streams observations to WebSocket clients as per-subscription deltas.
+
+    Every worker applies each observation batch from the backplane to its
+    copy of the latest fields per city. A client gets a keyframe with all
+    fields of its subscribed cities when it connects or changes its
+    subscription, after its queue overflowed, and every `keyframe_interval`
+    frames. In between it gets only the fields that changed, and nothing
+    when none of its cities did. Each distinct frame is encoded once per
+    tick, however many clients share it.
+
+    Frames are {"type": "keyframe" | "delta", "seq": n, "data": {city: fields}};
+    a keyframe replaces the client's state, a delta is merged into it.
+    """
+
+    def __init__(
+        self,
+        backplane: Optional[Backplane] = None,
+        store: Optional[ObservationStore] = None,
+        on_batch: Optional[Callable[[List[Dict]], None]] = None,
+        keyframe_interval: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        send_timeout: Optional[float] = None
+    ):
+        self.broadcaster = Broadcaster(backplane, self._on_message, queue_size, send_timeout)
+        self.store = store
+        self.on_batch = on_batch
+        self.keyframe_interval = keyframe_interval or settings.BROADCAST_KEYFRAME_INTERVAL
+        self.latest: Dict[str, Dict] = {}
+        self.seq = 0
+        self.keyframes = 0
+        self.deltas = 0
+
+    async def start(self):
+        await self.broadcaster.start()
+
+    async def stop(self):
+        await self.broadcaster.stop()
+
+    async def publish(self, observations: List[Dict]):
+        """Share a batch of new observations with every worker's clients"""
+        await self.broadcaster.publish({"type": "observations", "data": observations})
+
+    def connect(self, websocket, cities: Optional[Iterable[str]] = None, encoding: str = "json") -> ClientConnection:
+        """Register an accepted WebSocket and start it off with a keyframe"""
+        connection = self.broadcaster.connect(websocket, encoding)
+        connection.cities = frozenset(cities) if cities is not None else None
+        self.send_keyframe(connection)
+        return connection
+
+    async def disconnect(self, connection: ClientConnection):
+        await self.broadcaster.disconnect(connection)
+
+    async def serve(self, websocket, cities: Optional[Iterable[str]] = None, encoding: str = "json"):
+        """Stream to an accepted WebSocket and apply its commands until it goes away"""
+        connection = self.connect(websocket, cities, encoding)
+        try:
+            while True:
+                self.handle_command(connection, await websocket.receive_text())
+        except Exception:
+            pass
+        finally:
+            await self.disconnect(connection)
+
+    def handle_command(self, connection: ClientConnection, text: str):
+        """Apply {"subscribe": [...]}, {"unsubscribe": [...]} or {"resync": true}"""
+        try:
+            command = json.loads(text)
+            if not isinstance(command, dict):
+                raise ValueError("command must be a JSON object")
+            if "subscribe" in command:
+                self.subscribe(connection, _city_names(command["subscribe"]))
+            elif "unsubscribe" in command:
+                self.unsubscribe(connection, _city_names(command["unsubscribe"]))
+            elif command.get("resync"):
+                self.send_keyframe(connection)
+            else:
+                raise ValueError("expected subscribe, unsubscribe or resync")
+        except ValueError as e:
+            connection.offer(encode_message({"type": "error", "message": str(e)}, connection.encoding))
+
+    def subscribe(self, connection: ClientConnection, cities: Optional[List[str]]):
+        """Add cities to the subscription (None for every city)"""
+        if cities is None:
+            connection.cities = None
+        else:
+            connection.cities = (connection.cities or frozenset()) | frozenset(cities)
+        self.send_keyframe(connection)
+
+    def unsubscribe(self, connection: ClientConnection, cities: Optional[List[str]]):
+        """Remove cities from the subscription (None for every city)"""
+        if cities is None:
+            connection.cities = frozenset()
+        else:
+            current = connection.cities if connection.cities is not None else frozenset(self.latest)
+            connection.cities = current - frozenset(cities)
+        self.send_keyframe(connection)
+
+    def send_keyframe(self, connection: ClientConnection):
+        self._offer(connection, encode_message(self.keyframe(connection.cities), connection.encoding), True)
+
+    def keyframe(self, cities: Optional[FrozenSet[str]] = None) -> Dict:
+        """Every field of the subscribed cities seen so far"""
+        if cities is None:
+            data = dict(self.latest)
+        else:
+            data = {city: self.latest[city] for city in cities if city in self.latest}
+        return {"type": "keyframe", "seq": self.seq, "data": data}
+
+    def apply(self, observations: List[Dict]) -> Dict[str, Dict]:
+        """Fold a batch into the latest state, returning the changed fields per city"""
+        changes = {}
+        for observation in observations:
+            city = observation["city"]
+            current = {key: value for key, value in observation.items() if key not in IDENTITY_FIELDS}
+            changed = changed_fields(self.latest.get(city), current)
+            if changed:
+                self.latest[city] = {**self.latest.get(city, {}), **changed}
+                changes[city] = changed
+        return changes
+
+    def _on_message(self, message: Dict):
+        if message.get("type") != "observations":
+            return None
+        if self.store is not None:
+            self.store.update(message["data"])
+        if self.on_batch is not None:
+            self.on_batch(message["data"])
+        changes = self.apply(message["data"])
+        self.seq += 1
+        self._fan_out(changes)
+        # Frames are queued per client above; nothing for the generic path
+        return None
+
+    def _fan_out(self, changes: Dict[str, Dict]):
+        payloads: Dict[Tuple, Optional[Payload]] = {}
+        for connection in list(self.broadcaster.connections):
+            keyframe = connection.lagged or connection.since_keyframe >= self.keyframe_interval
+            key = (keyframe, connection.cities, connection.encoding)
+            if key not in payloads:
+                payloads[key] = self._render(keyframe, connection.cities, changes, connection.encoding)
+            if payloads[key] is not None:
+                self._offer(connection, payloads[key], keyframe)
+
+    def _render(self, keyframe: bool, cities: Optional[FrozenSet[str]], changes: Dict[str, Dict], encoding: str) -> Optional[Payload]:
+        if keyframe:
+            return encode_message(self.keyframe(cities), encoding)
+        if cities is not None:
+            changes = {city: fields for city, fields in changes.items() if city in cities}
+        if not changes:
+            return None
+        return encode_message({"type": "delta", "seq": self.seq, "data": changes}, encoding)
+
+    def _offer(self, connection: ClientConnection, payload: Payload, keyframe: bool):
+        connection.offer(payload, supersede=keyframe)
+        if keyframe:
+            connection.since_keyframe = 0
+            self.keyframes += 1
+        else:
+            connection.since_keyframe += 1
+            self.deltas += 1
+
+    def stats(self) -> Dict:
+        connections = list(self.broadcaster.connections)
+        return {
+            **self.broadcaster.stats(),
+            "seq": self.seq,
+            "cities": len(self.latest),
+            "subscribed_to_all": sum(1 for c in connections if c.cities is None),
+            "keyframe_interval": self.keyframe_interval,
+            "keyframes": self.keyframes,
+            "deltas": self.deltas
+        }
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from ..config import settings
+from .city_registry import city_registry
+
+logger = logging.getLogger(__name__)
+
+class ObservationStore:
+    """In-process cache of the latest observation per city.
+
+    Only the background poller writes to it; read endpoints serve straight
+    from memory and never wait on OpenWeatherMap.
+    """
+
+    def __init__(self, max_age: Optional[float] = None):
+        self.max_age = settings.OBSERVATION_MAX_AGE if max_age is None else max_age
+        self._observations: Dict[str, Dict] = {}
+        self._updated_at: Dict[str, float] = {}
+        self._refresher: Optional[Callable[[List[str]], Awaitable]] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def update(self, observations: List[Dict]):
+        """Replace the latest observation for each city in the batch"""
+        now = time.monotonic()
+        for observation in observations:
+            self._observations[observation["city"]] = observation
+            self._updated_at[observation["city"]] = now
+
+    def age(self, city: str) -> Optional[float]:
+        """Seconds since the city was last updated, or None if never seen"""
+        updated_at = self._updated_at.get(city)
+        if updated_at is None:
+            return None
+        return time.monotonic() - updated_at
+
+    def is_stale(self, city: str) -> bool:
+        age = self.age(city)
+        return age is None or age > self.max_age
+
+    def get(self, city: str) -> Optional[Dict]:
+        """Latest observation for a city with staleness metadata"""
+        observation = self._observations.get(city)
+        if observation is None:
+            return None
+        age = self.age(city)
+        return {
+            **observation,
+            "age_seconds": round(age, 3),
+            "stale": age > self.max_age
+        }
+
+    def get_all(self, cities: Optional[List[str]] = None) -> List[Dict]:
+        """Latest observations in configured city order, skipping unseen cities"""
+        if cities is None:
+            cities = city_registry.names()
+        return [o for o in (self.get(city) for city in cities) if o is not None]
+
+    def stale_cities(self, cities: Optional[List[str]] = None) -> List[str]:
+        if cities is None:
+            cities = city_registry.names()
+        return [city for city in cities if self.is_stale(city)]
+
+    def set_refresher(self, refresher: Optional[Callable[[List[str]], Awaitable]]):
+        """Register the coroutine function that repopulates the store with the given cities"""
+        self._refresher = refresher
+
+    def _start_refresh(self, cities: List[str]) -> asyncio.Task:
+        """Start a refresh, or join the one already in flight"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._run_refresh(cities))
+        return self._refresh_task
+
+    async def refresh(self, cities: Optional[List[str]] = None):
+        """Run the refresher for `cities` (default the stale ones) and wait for it to finish"""
+        if self._refresher is not None:
+            await self._start_refresh(self.stale_cities() if cities is None else cities)
+
+    def refresh_if_stale(self) -> bool:
+        """Schedule a background refresh when any city is stale.
+
+        Returns True if a refresh is running after the call. The caller
+        does not wait for it; at most one refresh is in flight at a time.
+        """
+        if self._refresher is None:
+            return False
+        stale = self.stale_cities()
+        if not stale:
+            return False
+        self._start_refresh(stale)
+        return True
+
+    async def _run_refresh(self, cities: List[str]):
+        try:
+            await self._refresher(cities)
+        except Exception as e:
+            logger.error(f"Error refreshing observation store: {str(e)}")
+
+    def clear(self):
+        self._observations.clear()
+        self._updated_at.clear()
+
+observation_store = ObservationStore()
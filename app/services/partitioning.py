@@ -0,0 +1,260 @@
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import MetaData, PrimaryKeyConstraint, Table, column, table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.weather import OBSERVATION_VIEW, Base, WeatherData
+
+logger = logging.getLogger(__name__)
+
+# Tables split into monthly partitions, and the column they are split on
+PARTITIONED_TABLES: Dict[str, str] = {
+    "weather_data": "recorded_at",
+    "weather_forecasts": "forecast_time"
+}
+
+_PARTITION_SUFFIX = re.compile(r"_p(\d{4})_(\d{2})$")
+_OBSERVATION_COLUMNS = ", ".join(c.name for c in WeatherData.__table__.columns)
+
+def month_floor(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+def partition_name(table_name: str, month: datetime) -> str:
+    return f"{table_name}_p{month:%Y_%m}"
+
+def _as_datetime(value) -> datetime:
+    """SQLite hands back timestamps from raw SQL as strings"""
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+@dataclass
+class Partition:
+    name: str
+    start: datetime
+    end: datetime
+
+def _parse_partition(table_name: str, name: str) -> Optional[Partition]:
+    if not name.startswith(f"{table_name}_p"):
+        return None
+    match = _PARTITION_SUFFIX.search(name)
+    if match is None:
+        return None
+    start = datetime(int(match.group(1)), int(match.group(2)), 1)
+    return Partition(name, start, add_months(start, 1))
+
+def _dialect(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+def _view_ddl(month_tables: List[str]) -> str:
+    selects = [f"SELECT {_OBSERVATION_COLUMNS} FROM {name}" for name in ["weather_data"] + month_tables]
+    return f"CREATE VIEW IF NOT EXISTS {OBSERVATION_VIEW} AS " + " UNION ALL ".join(selects)
+
+_observation_view = table(OBSERVATION_VIEW, *[column(c.name, c.type) for c in WeatherData.__table__.columns])
+
+def observation_source(db: Session):
+    """What to select raw observations from in place of WeatherData's table.
+
+    PostgreSQL prunes partitions of weather_data itself. On SQLite sealed
+    months live in their own tables, so reads go through a UNION ALL view
+    of them and weather_data; SQLite pushes the WHERE clause down into
+    each branch, so every month table's index is still used.
+    """
+    if _dialect(db) == "sqlite":
+        return _observation_view
+    return WeatherData.__table__
+
+def partitioned_parent(table_name: str) -> Table:
+    """A copy of the model's table declared PARTITION BY RANGE for PostgreSQL.
+
+    Keys on a partitioned table must include the partition column, so the
+    primary key becomes (id, <column>); id keeps its sequence.
+    """
+    metadata = MetaData()
+    for source in Base.metadata.sorted_tables:
+        source.to_metadata(metadata)
+    parent = metadata.tables[table_name]
+    partition_column = PARTITIONED_TABLES[table_name]
+    parent.c.id.autoincrement = True
+    parent.c[partition_column].primary_key = True
+    parent.append_constraint(PrimaryKeyConstraint(parent.c.id, parent.c[partition_column]))
+    parent.dialect_kwargs["postgresql_partition_by"] = f"RANGE ({partition_column})"
+    return parent
+
+def _month_table(name: str) -> Table:
+    """weather_data's definition under a month table's name, with its own index names"""
+    month = WeatherData.__table__.to_metadata(MetaData(), name=name)
+    for index in month.indexes:
+        index.name = index.name.replace(WeatherData.__tablename__, name, 1)
+    return month
+
+class PartitionManager:
+    """Monthly time partitions for weather_data and weather_forecasts.
+
+    On PostgreSQL both tables are range-partitioned by month, with
+    `months_ahead` partitions created in advance and a DEFAULT partition
+    for anything outside them. SQLite has no partitioning, so weather_data
+    falls back to per-month tables: inserts go to weather_data and `seal`
+    moves each completed month into its own table. Either way an expired
+    month is dropped as a whole table rather than deleted row by row.
+    """
+
+    def __init__(self, months_ahead: Optional[int] = None):
+        self.months_ahead = settings.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+
+    def create_tables(self, engine: Engine) -> List[str]:
+        """Create the partitioned tables (PostgreSQL) or the observation view (SQLite) if missing"""
+        if engine.dialect.name == "sqlite":
+            with engine.begin() as conn:
+                if "weather_data" in engine.dialect.get_table_names(conn):
+                    conn.execute(text(_view_ddl(self._month_tables(conn))))
+            return []
+        if engine.dialect.name != "postgresql":
+            return []
+
+        # Partitioned tables may reference the others, so those come first
+        Base.metadata.create_all(
+            engine,
+            tables=[t for t in Base.metadata.sorted_tables if t.name not in PARTITIONED_TABLES]
+        )
+        created = []
+        with engine.begin() as conn:
+            existing = set(engine.dialect.get_table_names(conn))
+            for table_name in PARTITIONED_TABLES:
+                if table_name in existing:
+                    if not self._is_native(conn, table_name):
+                        logger.warning(f"{table_name} predates partitioning; expired rows will be deleted, not dropped")
+                    continue
+                partitioned_parent(table_name).create(conn)
+                created.append(table_name)
+        return created
+
+    def is_partitioned(self, db: Session, table_name: str) -> bool:
+        if _dialect(db) == "postgresql":
+            return self._is_native(db, table_name)
+        # Only weather_data has the SQLite fallback
+        return table_name == WeatherData.__tablename__
+
+    def _is_native(self, conn, table_name: str) -> bool:
+        return bool(conn.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :name)"
+        ), {"name": table_name}).scalar())
+
+    def _month_tables(self, conn) -> List[str]:
+        return [p.name for p in self._partitions(conn, "sqlite", WeatherData.__tablename__)]
+
+    def partitions(self, db: Session, table_name: str) -> List[Partition]:
+        """Monthly partitions of a table, oldest first (the DEFAULT partition is not listed)"""
+        return self._partitions(db, _dialect(db), table_name)
+
+    def _partitions(self, conn, dialect: str, table_name: str) -> List[Partition]:
+        if dialect == "postgresql":
+            names = conn.execute(text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :name"
+            ), {"name": table_name}).scalars()
+        else:
+            names = conn.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE :pattern"
+            ), {"pattern": f"{table_name}_p%"}).scalars()
+        parsed = [_parse_partition(table_name, name) for name in names]
+        return sorted((p for p in parsed if p is not None), key=lambda p: p.start)
+
+    def _rebuild_view(self, db: Session):
+        db.execute(text(f"DROP VIEW IF EXISTS {OBSERVATION_VIEW}"))
+        db.execute(text(_view_ddl(self._month_tables(db))))
+
+    def ensure_partitions(self, db: Session, now: Optional[datetime] = None) -> List[str]:
+        """Create this month's and the next `months_ahead` partitions (PostgreSQL)"""
+        if _dialect(db) != "postgresql":
+            return []
+        current = month_floor(now or datetime.utcnow())
+        created = []
+        for table_name in PARTITIONED_TABLES:
+            if not self._is_native(db, table_name):
+                continue
+            existing = {p.name for p in self.partitions(db, table_name)}
+            db.execute(text(f"CREATE TABLE IF NOT EXISTS {table_name}_default PARTITION OF {table_name} DEFAULT"))
+            for offset in range(self.months_ahead + 1):
+                start = add_months(current, offset)
+                name = partition_name(table_name, start)
+                if name in existing:
+                    continue
+                db.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table_name} "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{add_months(start, 1).isoformat()}')"
+                ))
+                created.append(name)
+        db.commit()
+        if created:
+            logger.info(f"Created partitions {', '.join(created)}")
+        return created
+
+    def seal(self, db: Session, now: Optional[datetime] = None) -> List[str]:
+        """Move each completed month out of SQLite's weather_data into its own table"""
+        if _dialect(db) != "sqlite":
+            return []
+        base = WeatherData.__table__
+        current = month_floor(now or datetime.utcnow())
+        oldest = db.execute(
+            base.select().with_only_columns(base.c.recorded_at)
+            .where(base.c.recorded_at < current).order_by(base.c.recorded_at).limit(1)
+        ).scalar()
+        if oldest is None:
+            return []
+
+        sealed = []
+        month = month_floor(_as_datetime(oldest))
+        while month < current:
+            name = partition_name(base.name, month)
+            bounds = {"start": month, "end": add_months(month, 1)}
+            in_month = (base.c.recorded_at >= bounds["start"], base.c.recorded_at < bounds["end"])
+            if db.execute(base.select().with_only_columns(base.c.id).where(*in_month).limit(1)).first():
+                # Copy, delete and re-point the view in one transaction so
+                # readers never see a month twice or not at all
+                _month_table(name).create(db.connection(), checkfirst=True)
+                moved = db.execute(text(
+                    f"INSERT INTO {name} ({_OBSERVATION_COLUMNS}) SELECT {_OBSERVATION_COLUMNS} "
+                    f"FROM {base.name} WHERE recorded_at >= :start AND recorded_at < :end"
+                ), bounds).rowcount
+                db.execute(base.delete().where(*in_month))
+                self._rebuild_view(db)
+                db.commit()
+                logger.info(f"Sealed {moved} observation(s) into {name}")
+                sealed.append(name)
+            month = add_months(month, 1)
+        return sealed
+
+    def drop_before(self, db: Session, table_name: str, cutoff: datetime) -> List[Partition]:
+        """Drop every partition that ends at or before `cutoff`"""
+        dropped = [p for p in self.partitions(db, table_name) if p.end <= cutoff]
+        if not dropped:
+            return []
+        for partition in dropped:
+            db.execute(text(f"DROP TABLE {partition.name}"))
+        if _dialect(db) == "sqlite":
+            self._rebuild_view(db)
+        db.commit()
+        logger.info(f"Dropped partitions {', '.join(p.name for p in dropped)}")
+        return dropped
+
+    def status(self, db: Session) -> Dict:
+        return {
+            table_name: {
+                "partitioned": self.is_partitioned(db, table_name),
+                "partitions": [p.name for p in self.partitions(db, table_name)]
+            }
+            for table_name in PARTITIONED_TABLES
+        }
+
+partition_manager = PartitionManager()
@@ -0,0 +1,104 @@
+import time
+import logging
+from dataclasses import dataclass
+from typing import Dict, List
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class BulkInsertResult:
+    table: str
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_sec(self) -> float:
+        if self.seconds <= 0:
+            return 0.0
+        return self.rows / self.seconds
+
+def bulk_insert(db: Session, model, rows: List[Dict]) -> BulkInsertResult:
+    """Insert many rows of one model with a single executemany statement.
+
+    Uses SQLAlchemy 2.0's bulk INSERT (insertmanyvalues on PostgreSQL,
+    executemany on SQLite) instead of flushing one ORM object per row.
+    The caller owns the transaction.
+    """
+    if not rows:
+        return BulkInsertResult(model.__tablename__, 0, 0.0)
+
+    start = time.perf_counter()
+    db.execute(insert(model), rows)
+    return BulkInsertResult(model.__tablename__, len(rows), time.perf_counter() - start)
+
+def bulk_upsert(db: Session, model, rows: List[Dict], conflict_columns: List[str]) -> BulkInsertResult:
+    """Insert rows, updating in place any that collide on a unique key.
+
+    Needs a unique index over `conflict_columns`. Only the columns present
+    in the rows are overwritten on conflict.
+    """
+    if not rows:
+        return BulkInsertResult(model.__tablename__, 0, 0.0)
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise NotImplementedError(f"Upsert is not supported on {dialect}")
+
+    stmt = dialect_insert(model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=conflict_columns,
+        set_={name: stmt.excluded[name] for name in rows[0] if name not in conflict_columns}
+    )
+
+    start = time.perf_counter()
+    db.execute(stmt, rows)
+    return BulkInsertResult(model.__tablename__, len(rows), time.perf_counter() - start)
+
+class BulkWriter:
+    """Buffers rows per model and writes each table in one statement on flush"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._rows: Dict[type, List[Dict]] = {}
+
+    def add(self, model, row: Dict):
+        self._rows.setdefault(model, []).append(row)
+
+    def add_all(self, model, rows: List[Dict]):
+        self._rows.setdefault(model, []).extend(rows)
+
+    def rows(self, model) -> List[Dict]:
+        """Rows buffered for a model and not yet flushed"""
+        return self._rows.get(model, [])
+
+    def __len__(self) -> int:
+        return sum(len(rows) for rows in self._rows.values())
+
+    def flush(self, commit: bool = True) -> List[BulkInsertResult]:
+        """Write all buffered rows, then commit unless told otherwise"""
+        results = []
+        try:
+            for model, rows in self._rows.items():
+                results.append(bulk_insert(self.db, model, rows))
+            if commit:
+                self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        finally:
+            self._rows.clear()
+
+        for result in results:
+            if result.rows:
+                logger.info(
+                    f"Inserted {result.rows} rows into {result.table} "
+                    f"in {result.seconds * 1000:.1f} ms ({result.rows_per_sec:.0f} rows/sec)"
+                )
+        return results
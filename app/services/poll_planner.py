@@ -0,0 +1,174 @@
+import time
+from typing import Dict, Iterable, List, Optional
+
+from ..config import settings
+from .city_registry import city_registry
+
+class CityPollState:
+    """Polling history for one city"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.temperature: Optional[float] = None
+        self.observed_at: Optional[float] = None
+        # EWMA of the absolute temperature change, degC/hour
+        self.volatility: Optional[float] = None
+        self.last_polled: Optional[float] = None
+        # Set by force(): poll on the next tick whatever the interval says
+        self.forced = False
+
+    def observe(self, temperature: float, at: float, smoothing: float):
+        if self.temperature is not None and at > self.observed_at:
+            rate = abs(temperature - self.temperature) / ((at - self.observed_at) / 3600)
+            if self.volatility is None:
+                self.volatility = rate
+            else:
+                self.volatility = smoothing * rate + (1 - smoothing) * self.volatility
+        self.temperature = temperature
+        self.observed_at = at
+
+class PollPlanner:
+    """Decides which cities are due for a poll.
+
+    Each city gets an urgency between 0 and 1: the larger of its volatility
+    (relative to `volatility_ref`) and its closeness to the alert
+    threshold (1 at the threshold, 0 at `threshold_band` away). Urgency
+    interpolates the poll rate linearly between 1/max_interval and
+    1/min_interval. When the rates add up to more than `budget_per_minute`
+    they are scaled down together, so hot cities keep their lead over
+    stable ones. Every poll, scheduled or forced, spends a token from a
+    bucket refilled at the budget rate and holding one tick's batch, so
+    extra runs cannot exceed the budget. Times are time.monotonic() seconds.
+    """
+
+    def __init__(
+        self,
+        cities: Optional[Iterable[str]] = None,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        budget_per_minute: Optional[float] = None,
+        threshold: Optional[float] = None,
+        threshold_band: Optional[float] = None,
+        volatility_ref: Optional[float] = None,
+        smoothing: float = 0.5,
+        tick: Optional[float] = None
+    ):
+        self.min_interval = min_interval or settings.POLL_MIN_INTERVAL
+        self.max_interval = max(max_interval or settings.POLL_MAX_INTERVAL, self.min_interval)
+        self.budget_per_minute = budget_per_minute or settings.POLL_BUDGET_PER_MINUTE
+        self.threshold = threshold if threshold is not None else settings.TEMPERATURE_THRESHOLD
+        self.threshold_band = threshold_band or settings.POLL_THRESHOLD_BAND
+        self.volatility_ref = volatility_ref or settings.POLL_VOLATILITY_REF
+        self.smoothing = smoothing
+        self.tick = tick or settings.POLL_TICK_INTERVAL
+        self._tokens = float(self.batch_limit(self.tick))
+        self._refilled_at: Optional[float] = None
+        self.cities: Dict[str, CityPollState] = {}
+        if cities is None:
+            cities = city_registry.names()
+        for name in cities:
+            self.add_city(name)
+
+    def add_city(self, name: str):
+        if name not in self.cities:
+            self.cities[name] = CityPollState(name)
+
+    def remove_city(self, name: str):
+        self.cities.pop(name, None)
+
+    def sync(self, names: Iterable[str]):
+        """Track exactly `names`, keeping the history of cities already tracked"""
+        names = set(names)
+        for name in list(self.cities):
+            if name not in names:
+                del self.cities[name]
+        for name in names:
+            self.add_city(name)
+
+    def observe(self, city: str, temperature: float, at: Optional[float] = None):
+        """Record a polled temperature"""
+        self.add_city(city)
+        self.cities[city].observe(temperature, time.monotonic() if at is None else at, self.smoothing)
+
+    def mark_polled(self, city: str, at: Optional[float] = None):
+        """Record that a poll of `city` started, spending one token"""
+        self.add_city(city)
+        self.cities[city].last_polled = time.monotonic() if at is None else at
+        self.cities[city].forced = False
+        self._tokens -= 1
+
+    def force(self, cities: Iterable[str], now: Optional[float] = None):
+        """Make tracked `cities` due now, e.g. because a read found them stale.
+
+        Cities polled within the last min_interval are left alone, so a
+        city whose fetch keeps failing is not refetched on every read.
+        """
+        now = time.monotonic() if now is None else now
+        for name in cities:
+            state = self.cities.get(name)
+            if state is not None and (state.last_polled is None or now - state.last_polled >= self.min_interval):
+                state.forced = True
+
+    def urgency(self, city: str) -> float:
+        state = self.cities[city]
+        if state.temperature is None:
+            return 1.0
+        proximity = max(0.0, 1 - abs(self.threshold - state.temperature) / self.threshold_band)
+        volatility = (state.volatility or 0.0) / self.volatility_ref
+        return min(1.0, max(proximity, volatility))
+
+    def intervals(self) -> Dict[str, float]:
+        """Poll interval (seconds) per city, after applying the request budget"""
+        slow, fast = 1 / self.max_interval, 1 / self.min_interval
+        rates = {name: slow + self.urgency(name) * (fast - slow) for name in self.cities}
+        total_per_minute = sum(rates.values()) * 60
+        scale = min(1.0, self.budget_per_minute / total_per_minute) if total_per_minute else 1.0
+        return {name: 1 / (rate * scale) for name, rate in rates.items()}
+
+    def due(self, now: Optional[float] = None, limit: Optional[int] = None) -> List[str]:
+        """Cities whose interval has elapsed, most overdue first.
+
+        Never-polled and forced cities come first. `limit` caps the batch
+        so a tick cannot burst past the budget.
+        """
+        now = time.monotonic() if now is None else now
+        overdue = []
+        for name, interval in self.intervals().items():
+            last_polled = self.cities[name].last_polled
+            if last_polled is None or self.cities[name].forced:
+                overdue.append((float("inf"), name))
+            elif now - last_polled >= interval:
+                overdue.append(((now - last_polled) / interval, name))
+        overdue.sort(key=lambda item: item[0], reverse=True)
+        names = [name for _, name in overdue]
+        return names if limit is None else names[:limit]
+
+    def batch_limit(self, tick: float) -> int:
+        """Most requests one tick of `tick` seconds may spend"""
+        return max(1, int(self.budget_per_minute * tick / 60))
+
+    def allowance(self, now: Optional[float] = None) -> int:
+        """Polls that may start now, after refilling the token bucket"""
+        now = time.monotonic() if now is None else now
+        if self._refilled_at is not None:
+            refill = (now - self._refilled_at) * self.budget_per_minute / 60
+            self._tokens = min(float(self.batch_limit(self.tick)), self._tokens + refill)
+        self._refilled_at = now
+        return max(0, int(self._tokens))
+
+    def status(self, now: Optional[float] = None) -> List[Dict]:
+        now = time.monotonic() if now is None else now
+        intervals = self.intervals()
+        status = []
+        for name, state in self.cities.items():
+            interval = intervals[name]
+            next_in = 0.0 if state.last_polled is None else max(0.0, state.last_polled + interval - now)
+            status.append({
+                "city": name,
+                "temperature": state.temperature,
+                "volatility": round(state.volatility, 3) if state.volatility is not None else None,
+                "urgency": round(self.urgency(name), 3),
+                "interval": round(interval, 1),
+                "next_poll_in": round(next_in, 1)
+            })
+        return status
@@ -0,0 +1,147 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, Optional, Tuple
+
+import orjson
+from starlette.requests import Request
+from starlette.responses import Response
+
+from ..config import settings
+from ..metrics import cache_families, metrics
+
+def encode_json(data: Any) -> bytes:
+    return orjson.dumps(data, default=str, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+def _cache_key(request: Request) -> str:
+    return request.url.path if not request.url.query else f"{request.url.path}?{request.url.query}"
+
+def etag_for(body: bytes) -> str:
+    """Strong ETag derived from the body, so every worker gives the same one"""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison, so a W/ prefix still matches"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.replace("W/", "", 1) == etag for candidate in candidates)
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    tags: FrozenSet[str]
+    expires_at: float
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+@dataclass
+class ResponseCacheStats:
+    hits: int = 0
+    misses: int = 0
+    not_modified: int = 0
+    invalidations: int = 0
+    discarded: int = 0
+
+class ResponseCache:
+    """Encoded JSON bodies of read endpoints, dropped when their data changes.
+
+    Each entry is tagged with the kinds of data it was built from
+    ("alerts", "summaries", "forecasts"); the code that writes that data
+    invalidates the tag. A body built while one of its tags was invalidated
+    is served but not stored, so a slow request cannot put pre-ingest data
+    back. `ttl` bounds staleness from writes this worker is not told about.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        self.max_entries = max_entries or settings.RESPONSE_CACHE_MAX_ENTRIES
+        self.ttl = settings.RESPONSE_CACHE_TTL if ttl is None else ttl
+        self.stats = ResponseCacheStats()
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not entry.is_fresh:
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry
+
+    def generation(self, tags: Iterable[str]) -> Tuple[int, ...]:
+        with self._lock:
+            return tuple(self._generations.get(tag, 0) for tag in sorted(tags))
+
+    def put(self, key: str, tags: Iterable[str], body: bytes, generation: Tuple[int, ...]) -> CachedResponse:
+        """Store a body built at `generation`, unless its tags were invalidated since"""
+        tags = frozenset(tags)
+        entry = CachedResponse(body, etag_for(body), tags, time.monotonic() + self.ttl)
+        with self._lock:
+            if tuple(self._generations.get(tag, 0) for tag in sorted(tags)) != generation:
+                self.stats.discarded += 1
+                return entry
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, *tags: str):
+        """Drop every entry built from any of `tags`"""
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            stale = [key for key, entry in self._entries.items() if not entry.tags.isdisjoint(tags)]
+            for key in stale:
+                del self._entries[key]
+            self.stats.invalidations += 1
+
+    def respond(self, request: Request, tags: Iterable[str], build: Callable[[], Any]) -> Response:
+        """Serve `build()` as JSON through the cache, or 304 when the client's ETag still matches"""
+        key = _cache_key(request)
+        entry = self.get(key)
+        if entry is None:
+            generation = self.generation(tags)
+            entry = self.put(key, tags, encode_json(build()), generation)
+        return self._serve(request, entry)
+
+    async def respond_async(self, request: Request, tags: Iterable[str], build: Callable[[], Awaitable[Any]]) -> Response:
+        """`respond` for an async `build`, e.g. one querying through an AsyncSession"""
+        key = _cache_key(request)
+        entry = self.get(key)
+        if entry is None:
+            generation = self.generation(tags)
+            entry = self.put(key, tags, encode_json(await build()), generation)
+        return self._serve(request, entry)
+
+    def _serve(self, request: Request, entry: CachedResponse) -> Response:
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            self.stats.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(entry.body, media_type="application/json", headers=headers)
+
+    def status(self) -> Dict:
+        with self._lock:
+            entries = len(self._entries)
+            size = sum(len(entry.body) for entry in self._entries.values())
+        return {"entries": entries, "bytes": size, "ttl": self.ttl, **vars(self.stats)}
+
+    def metric_families(self):
+        counts = {"hit": self.stats.hits, "miss": self.stats.misses}
+        return cache_families("weather_response_cache", "Response cache", counts, self.stats.hits)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+response_cache = ResponseCache()
+metrics.register_collector("response_cache", response_cache.metric_families)
@@ -0,0 +1,107 @@
+import logging
+from datetime import datetime, time, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..metrics import instrument_queries
+from ..models.weather import HourlySummary, WeatherData
+from .partitioning import PartitionManager, add_months, month_floor, partition_manager
+from .rollup_service import RollupService
+
+logger = logging.getLogger(__name__)
+
+def _day_floor(value: datetime) -> datetime:
+    return datetime.combine(value.date(), time.min)
+
+def raw_cutoff(now: datetime) -> Optional[datetime]:
+    """Raw observations before this may be gone; None keeps them forever"""
+    if settings.RAW_RETENTION_DAYS <= 0:
+        return None
+    return _day_floor(now - timedelta(days=settings.RAW_RETENTION_DAYS))
+
+def hourly_cutoff(now: datetime) -> Optional[datetime]:
+    if settings.HOURLY_RETENTION_MONTHS <= 0:
+        return None
+    return add_months(month_floor(now), -settings.HOURLY_RETENTION_MONTHS)
+
+def resolution_for(start: datetime, now: Optional[datetime] = None) -> str:
+    """The finest data still retained back to `start`: "raw", "hourly" or "daily" """
+    now = now or datetime.utcnow()
+    cutoff = raw_cutoff(now)
+    if cutoff is None or start >= cutoff:
+        return "raw"
+    cutoff = hourly_cutoff(now)
+    if cutoff is None or start >= cutoff:
+        return "hourly"
+    return "daily"
+
+@instrument_queries
+class RetentionService:
+    """Downsamples and expires time-partitioned data.
+
+    Each run creates upcoming partitions (or, on SQLite, seals completed
+    months), then expires raw observations older than RAW_RETENTION_DAYS
+    once their hourly and daily rollups have been rebuilt, hourly rollups
+    older than HOURLY_RETENTION_MONTHS, and forecast partitions older than
+    FORECAST_RETENTION_DAYS. Partitioned data is expired a whole month at
+    a time by dropping its table; tables created before partitioning fall
+    back to DELETE.
+    """
+
+    def __init__(self, db: Session, manager: Optional[PartitionManager] = None):
+        self.db = db
+        self.manager = manager or partition_manager
+
+    def run(self, now: Optional[datetime] = None) -> Dict[str, List[str]]:
+        now = now or datetime.utcnow()
+        self.manager.ensure_partitions(self.db, now)
+        self.manager.seal(self.db, now)
+        return {
+            "observations": self.expire_observations(now),
+            "hourly_summaries": self.expire_hourly(now),
+            "forecasts": self.expire_forecasts(now)
+        }
+
+    def expire_observations(self, now: datetime) -> List[str]:
+        cutoff = raw_cutoff(now)
+        if cutoff is None:
+            return []
+        table_name = WeatherData.__tablename__
+        rollups = RollupService(self.db)
+        if not self.manager.is_partitioned(self.db, table_name):
+            oldest = self.db.query(func.min(WeatherData.recorded_at)).filter(WeatherData.recorded_at < cutoff).scalar()
+            if oldest is None:
+                return []
+            rollups.backfill(oldest.date(), (cutoff - timedelta(days=1)).date(), expiring=True)
+            deleted = self.db.query(WeatherData).filter(
+                WeatherData.recorded_at < cutoff
+            ).delete(synchronize_session=False)
+            self.db.commit()
+            logger.info(f"Deleted {deleted} observation(s) recorded before {cutoff}")
+            return [f"{table_name} < {cutoff.isoformat()}"]
+
+        expired = [p for p in self.manager.partitions(self.db, table_name) if p.end <= cutoff]
+        for partition in expired:
+            rollups.backfill(partition.start.date(), (partition.end - timedelta(days=1)).date(), expiring=True)
+        return [p.name for p in self.manager.drop_before(self.db, table_name, cutoff)]
+
+    def expire_hourly(self, now: datetime) -> List[str]:
+        cutoff = hourly_cutoff(now)
+        if cutoff is None:
+            return []
+        deleted = self.db.query(HourlySummary).filter(HourlySummary.hour < cutoff).delete(synchronize_session=False)
+        self.db.commit()
+        if not deleted:
+            return []
+        logger.info(f"Deleted {deleted} hourly summary(ies) before {cutoff}")
+        return [f"hourly_summaries < {cutoff.isoformat()}"]
+
+    def expire_forecasts(self, now: datetime) -> List[str]:
+        """Drop old forecast partitions; unpartitioned forecasts are already pruned per run"""
+        if settings.FORECAST_RETENTION_DAYS <= 0:
+            return []
+        cutoff = _day_floor(now - timedelta(days=settings.FORECAST_RETENTION_DAYS))
+        return [p.name for p in self.manager.drop_before(self.db, "weather_forecasts", cutoff)]
@@ -0,0 +1,253 @@
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..models.weather import DailySummary, HourlySummary
+from ..metrics import instrument_queries
+from .partitioning import observation_source
+from .response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min)
+
+def _as_period(value) -> datetime:
+    """Normalise a bucket start (datetime, date or SQLite string) to naive UTC"""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+    if isinstance(value, date):
+        return _day_start(value)
+    return datetime.fromisoformat(str(value))
+
+@dataclass(frozen=True)
+class Resolution:
+    """A rollup table and how observation timestamps are bucketed into it"""
+    name: str
+    model: type
+    period_column: str
+    floor: Callable[[datetime], datetime]
+
+    def column(self):
+        return getattr(self.model, self.period_column)
+
+    def bucket(self, db: Session, recorded_at):
+        """SQL expression for the start of each observation's bucket"""
+        if self.name == "daily":
+            return func.date(recorded_at)
+        if db.get_bind().dialect.name == "sqlite":
+            return func.strftime("%Y-%m-%d %H:00:00", recorded_at)
+        return func.date_trunc("hour", recorded_at)
+
+DAILY = Resolution("daily", DailySummary, "date", lambda t: _day_start(t.date()))
+HOURLY = Resolution("hourly", HourlySummary, "hour", lambda t: t.replace(minute=0, second=0, microsecond=0))
+RESOLUTIONS = (DAILY, HOURLY)
+
+@dataclass
+class RollupAggregate:
+    """Running aggregates for one city and one UTC day or hour"""
+    city: str
+    period: datetime
+    readings_count: int = 0
+    temperature_sum: float = 0.0
+    min_temperature: Optional[float] = None
+    max_temperature: Optional[float] = None
+    humidity_sum: float = 0.0
+    humidity_count: int = 0
+    wind_speed_sum: float = 0.0
+    wind_speed_count: int = 0
+    condition_counts: Counter = field(default_factory=Counter)
+
+    def add(self, observation: Dict):
+        temperature = observation["temperature"]
+        self.readings_count += 1
+        self.temperature_sum += temperature
+        self.min_temperature = temperature if self.min_temperature is None else min(self.min_temperature, temperature)
+        self.max_temperature = temperature if self.max_temperature is None else max(self.max_temperature, temperature)
+        if observation.get("humidity") is not None:
+            self.humidity_sum += observation["humidity"]
+            self.humidity_count += 1
+        if observation.get("wind_speed") is not None:
+            self.wind_speed_sum += observation["wind_speed"]
+            self.wind_speed_count += 1
+        if observation.get("weather_condition"):
+            self.condition_counts[observation["weather_condition"]] += 1
+
+    def merge_into(self, summary):
+        """Fold these aggregates into a persisted summary and refresh its derived fields"""
+        counts = Counter(summary.condition_counts or {})
+        counts.update(self.condition_counts)
+
+        summary.readings_count = (summary.readings_count or 0) + self.readings_count
+        summary.temperature_sum = (summary.temperature_sum or 0.0) + self.temperature_sum
+        summary.humidity_sum = (summary.humidity_sum or 0.0) + self.humidity_sum
+        summary.humidity_count = (summary.humidity_count or 0) + self.humidity_count
+        summary.wind_speed_sum = (summary.wind_speed_sum or 0.0) + self.wind_speed_sum
+        summary.wind_speed_count = (summary.wind_speed_count or 0) + self.wind_speed_count
+        summary.min_temperature = min(
+            t for t in (summary.min_temperature, self.min_temperature) if t is not None
+        )
+        summary.max_temperature = max(
+            t for t in (summary.max_temperature, self.max_temperature) if t is not None
+        )
+        # Assign a new dict so the JSON column is flagged as changed
+        summary.condition_counts = dict(counts)
+
+        summary.avg_temperature = summary.temperature_sum / summary.readings_count
+        summary.avg_humidity = (
+            summary.humidity_sum / summary.humidity_count if summary.humidity_count else None
+        )
+        summary.avg_wind_speed = (
+            summary.wind_speed_sum / summary.wind_speed_count if summary.wind_speed_count else None
+        )
+        summary.dominant_condition = (
+            min(counts.items(), key=lambda item: (-item[1], item[0]))[0] if counts else None
+        )
+
+@dataclass(frozen=True)
+class BackfillResult:
+    """The days a backfill actually covered and the rollups it wrote"""
+    start: date
+    end: date
+    daily: int = 0
+    hourly: int = 0
+
+@instrument_queries
+class RollupService:
+    """Maintains daily and hourly summaries incrementally as observations are ingested.
+
+    Hourly rollups outlive the raw observations and daily rollups are kept
+    forever, so older ranges are answered from them (see RetentionService).
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def ingest(self, observations: Iterable[Dict]) -> List[DailySummary]:
+        """Fold a batch of WeatherData rows into their daily and hourly summaries.
+
+        Changes are staged on the session; the caller commits them with
+        the observations so rollups never drift from the raw table.
+        Returns the daily summaries touched.
+        """
+        pending: Dict[Resolution, Dict[Tuple[str, datetime], RollupAggregate]] = {r: {} for r in RESOLUTIONS}
+        for observation in observations:
+            recorded_at = _as_period(observation.get("recorded_at") or datetime.utcnow())
+            for resolution, aggregates in pending.items():
+                key = (observation["city"], resolution.floor(recorded_at))
+                if key not in aggregates:
+                    aggregates[key] = RollupAggregate(city=key[0], period=key[1])
+                aggregates[key].add(observation)
+
+        self._merge(HOURLY, pending[HOURLY].values())
+        return self._merge(DAILY, pending[DAILY].values())
+
+    def _merge(self, resolution: Resolution, aggregates: Iterable[RollupAggregate]) -> List:
+        aggregates = list(aggregates)
+        if not aggregates:
+            return []
+
+        period = resolution.column()
+        existing = {
+            (s.city, _as_period(getattr(s, resolution.period_column))): s
+            for s in self.db.query(resolution.model).filter(
+                resolution.model.city.in_({a.city for a in aggregates}),
+                period.in_({a.period for a in aggregates})
+            )
+        }
+
+        summaries = []
+        for aggregate in aggregates:
+            summary = existing.get((aggregate.city, aggregate.period))
+            if summary is None:
+                summary = resolution.model(city=aggregate.city, **{resolution.period_column: aggregate.period})
+                self.db.add(summary)
+            aggregate.merge_into(summary)
+            summaries.append(summary)
+        return summaries
+
+    def backfill(self, start: date, end: date, cities: Optional[List[str]] = None,
+                 now: Optional[datetime] = None, expiring: bool = False) -> BackfillResult:
+        """Rebuild the rollups for [start, end] from raw observations.
+
+        Summaries that raw rows re-populate are replaced; the rest are kept.
+        `start` is clamped to the raw retention cutoff, since older raw rows
+        may already be gone, unless `expiring` (retention rolling up days it
+        is about to drop). The result carries the start actually used.
+        """
+        from .retention import raw_cutoff
+
+        cutoff = None if expiring else raw_cutoff(now or datetime.utcnow())
+        if cutoff is not None and start < cutoff.date():
+            logger.warning(f"Raw observations before {cutoff.date()} are expired; backfilling from there instead of {start}")
+            start = cutoff.date()
+        if start > end:
+            return BackfillResult(start, end)
+        range_start, range_end = _day_start(start), _day_start(end + timedelta(days=1))
+        written = {resolution: self._rebuild(resolution, range_start, range_end, cities) for resolution in RESOLUTIONS}
+        self.db.commit()
+        response_cache.invalidate("summaries")
+        logger.info(f"Rebuilt {written[DAILY]} daily and {written[HOURLY]} hourly rollups from {start} to {end}")
+        return BackfillResult(start, end, written[DAILY], written[HOURLY])
+
+    def _rebuild(self, resolution: Resolution, range_start: datetime, range_end: datetime, cities: Optional[List[str]]) -> int:
+        source = observation_source(self.db)
+        bucket = resolution.bucket(self.db, source.c.recorded_at)
+        filters = [source.c.recorded_at >= range_start, source.c.recorded_at < range_end]
+        if cities:
+            filters.append(source.c.city.in_(cities))
+
+        aggregates: Dict[Tuple[str, datetime], RollupAggregate] = {}
+        totals = self.db.execute(select(
+            source.c.city,
+            bucket,
+            func.count(source.c.id),
+            func.sum(source.c.temperature),
+            func.min(source.c.temperature),
+            func.max(source.c.temperature),
+            func.sum(source.c.humidity),
+            func.count(source.c.humidity),
+            func.sum(source.c.wind_speed),
+            func.count(source.c.wind_speed)
+        ).where(*filters).group_by(source.c.city, bucket))
+
+        for row in totals:
+            key = (row[0], _as_period(row[1]))
+            aggregates[key] = RollupAggregate(
+                city=key[0],
+                period=key[1],
+                readings_count=row[2],
+                temperature_sum=row[3] or 0.0,
+                min_temperature=row[4],
+                max_temperature=row[5],
+                humidity_sum=row[6] or 0.0,
+                humidity_count=row[7],
+                wind_speed_sum=row[8] or 0.0,
+                wind_speed_count=row[9]
+            )
+
+        histogram = self.db.execute(select(
+            source.c.city, bucket, source.c.weather_condition, func.count(source.c.id)
+        ).where(*filters, source.c.weather_condition.isnot(None)).group_by(
+            source.c.city, bucket, source.c.weather_condition
+        ))
+        for city, period, condition, count in histogram:
+            aggregates[(city, _as_period(period))].condition_counts[condition] = count
+
+        periods_by_city: Dict[str, List[datetime]] = {}
+        for city, bucket_start in aggregates:
+            periods_by_city.setdefault(city, []).append(bucket_start)
+        for city, periods in periods_by_city.items():
+            self.db.query(resolution.model).filter(
+                resolution.model.city == city, resolution.column().in_(periods)
+            ).delete(synchronize_session=False)
+
+        self._merge(resolution, aggregates.values())
+        return len(aggregates)
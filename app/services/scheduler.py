@@ -0,0 +1,169 @@
+import asyncio
+import functools
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+class Job:
+    """A periodic coroutine owned by the Scheduler"""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable],
+        interval: float,
+        jitter: float = 0.0,
+        run_at_start: bool = True
+    ):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.run_at_start = run_at_start
+        # Unjittered slot of the next run; next_run adds this run's jitter to it
+        self.scheduled_at = 0.0
+        self.next_run = 0.0
+        self.runs = 0
+        self.failures = 0
+        self.missed = 0
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._current: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._current is not None and not self._current.done()
+
+    def status(self) -> Dict:
+        return {
+            "name": self.name,
+            "interval": self.interval,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "missed": self.missed,
+            "next_run_in": round(max(0.0, self.next_run - time.monotonic()), 3),
+            "last_duration": self.last_duration,
+            "last_error": self.last_error
+        }
+
+class Scheduler:
+    """Single asyncio-native owner of every periodic job.
+
+    Each job runs on its own interval with optional jitter and never
+    overlaps itself: a run that is triggered while the previous one is in
+    flight joins it instead. When a run overshoots one or more intervals the
+    missed runs are counted and coalesced into a single immediate run.
+    Blocking work is handed to a dedicated thread pool via run_blocking.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or settings.SCHEDULER_WORKERS
+        self.jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.running = False
+
+    def add_job(
+        self,
+        name: str,
+        func: Callable[[], Awaitable],
+        interval: float,
+        jitter: float = 0.0,
+        run_at_start: bool = True
+    ) -> Job:
+        if name in self.jobs:
+            raise ValueError(f"Job {name} is already scheduled")
+        job = Job(name, func, interval, jitter, run_at_start)
+        self.jobs[name] = job
+        if self.running:
+            self._tasks.append(asyncio.ensure_future(self._job_loop(job)))
+        return job
+
+    async def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="scheduler")
+        self._tasks = [asyncio.ensure_future(self._job_loop(job)) for job in self.jobs.values()]
+        logger.info(f"Scheduler started with jobs: {', '.join(self.jobs)}")
+
+    async def stop(self):
+        self.running = False
+        pending = self._tasks + [job._current for job in self.jobs.values() if job.running]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        logger.info("Scheduler stopped")
+
+    async def run_blocking(self, func: Callable, *args, **kwargs) -> Any:
+        """Run blocking work (DB I/O) off the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def run_now(self, name: str) -> Any:
+        """Run a job immediately, or join its current run if one is in flight"""
+        job = self.jobs[name]
+        if not job.running:
+            job._current = asyncio.ensure_future(self._run(job))
+        return await asyncio.shield(job._current)
+
+    def status(self) -> List[Dict]:
+        return [job.status() for job in self.jobs.values()]
+
+    async def _run(self, job: Job) -> Any:
+        start = time.monotonic()
+        try:
+            result = await job.func()
+            job.last_error = None
+            return result
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            logger.error(f"Error in scheduled job {job.name}: {str(e)}")
+        finally:
+            job.runs += 1
+            job.last_duration = round(time.monotonic() - start, 3)
+
+    def _schedule_next(self, job: Job, now: float):
+        job.scheduled_at += job.interval
+        if job.scheduled_at <= now:
+            missed = int((now - job.scheduled_at) // job.interval) + 1
+            job.missed += missed
+            logger.warning(f"Job {job.name} overran; coalescing {missed} missed run(s)")
+            job.scheduled_at = now
+        self._jitter(job)
+
+    def _jitter(self, job: Job):
+        # Jitter is drawn afresh around the unjittered slot so it never accumulates
+        job.next_run = job.scheduled_at + (random.uniform(0, job.jitter) if job.jitter else 0.0)
+
+    async def _job_loop(self, job: Job):
+        now = time.monotonic()
+        job.scheduled_at = now if job.run_at_start else now + job.interval
+        self._jitter(job)
+
+        while self.running:
+            delay = job.next_run - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # run_now shields the run, so cancelling this loop only stops
+            # waiting for it; stop() cancels the run itself via job._current
+            try:
+                await self.run_now(job.name)
+            except asyncio.CancelledError:
+                if not self.running:
+                    raise
+            self._schedule_next(job, time.monotonic())
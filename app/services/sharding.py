@@ -0,0 +1,196 @@
+import bisect
+import hashlib
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.weather import PollerWorker, PollLease
+from .persistence import bulk_insert
+
+logger = logging.getLogger(__name__)
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+def default_worker_id() -> str:
+    return settings.WORKER_ID or f"{socket.gethostname()}-{os.getpid()}"
+
+class HashRing:
+    """Consistent hash ring; each member gets `vnodes` points so load evens out"""
+
+    def __init__(self, members: Iterable[str], vnodes: int = 64):
+        points = sorted((_hash(f"{member}#{i}"), member) for member in set(members) for i in range(vnodes))
+        self._keys = [point for point, _ in points]
+        self._members = [member for _, member in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._members[index]
+
+class ShardCoordinator:
+    """Splits polling across worker processes through leases in the database.
+
+    Cities hash into `partitions` fixed partitions. Every heartbeat the
+    worker:
+
+    - refreshes its row in poller_workers;
+    - places the partitions on a consistent hash ring of the live workers;
+    - claims or renews the leases of the partitions the ring gives it;
+    - releases leases the ring has moved elsewhere.
+
+    A lease can only be taken once its holder lets it go or stops renewing
+    it. That means a partition has at most one poller even while workers
+    briefly disagree about who is alive. A worker that dies loses its
+    partitions within one lease TTL.
+    """
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        partitions: Optional[int] = None,
+        lease_ttl: Optional[float] = None,
+        vnodes: int = 64
+    ):
+        self.worker_id = worker_id or default_worker_id()
+        self.partitions = partitions or settings.POLL_PARTITIONS
+        self.lease_ttl = lease_ttl or settings.POLL_LEASE_TTL
+        self.vnodes = vnodes
+        self._owned: Set[int] = set()
+        self._held_until = 0.0
+        self.live_workers: List[str] = []
+        self.version = 0
+
+    @property
+    def owned(self) -> Set[int]:
+        """Partitions held, or none once the leases may have lapsed without a heartbeat"""
+        if time.monotonic() >= self._held_until:
+            return set()
+        return self._owned
+
+    def partition_of(self, city: str) -> int:
+        return _hash(city) % self.partitions
+
+    def owns(self, city: str) -> bool:
+        return self.partition_of(city) in self.owned
+
+    def owned_cities(self, names: Iterable[str]) -> List[str]:
+        return [name for name in names if self.owns(name)]
+
+    @property
+    def share(self) -> float:
+        """Fraction of the partitions this worker currently holds"""
+        return len(self.owned) / self.partitions
+
+    def heartbeat(self, db: Session, now: Optional[datetime] = None) -> Set[int]:
+        """Renew membership and leases, returning the partitions now held.
+
+        Lease and heartbeat times come from the database clock, so workers
+        on hosts whose clocks disagree still agree on when a lease expires.
+        """
+        now = now or db.execute(select(func.now())).scalar_one()
+        held_until = time.monotonic() + self.lease_ttl
+        expires_at = now + timedelta(seconds=self.lease_ttl)
+
+        self._touch_worker(db, now)
+        self.live_workers = list(db.execute(
+            select(PollerWorker.worker_id)
+            .where(PollerWorker.heartbeat_at > now - timedelta(seconds=self.lease_ttl))
+            .order_by(PollerWorker.worker_id)
+        ).scalars())
+        ring = HashRing(self.live_workers, self.vnodes)
+        wanted = [p for p in range(self.partitions) if ring.owner(str(p)) == self.worker_id]
+        self._ensure_partitions(db)
+
+        # Hand back partitions the ring has moved elsewhere so their new owner
+        # need not wait for the lease to expire
+        db.execute(
+            update(PollLease)
+            .where(PollLease.worker_id == self.worker_id, PollLease.partition.notin_(wanted))
+            .values(worker_id=None, expires_at=None)
+        )
+        if wanted:
+            db.execute(
+                update(PollLease)
+                .where(
+                    PollLease.partition.in_(wanted),
+                    or_(
+                        PollLease.worker_id == self.worker_id,
+                        PollLease.worker_id.is_(None),
+                        PollLease.expires_at.is_(None),
+                        PollLease.expires_at < now
+                    )
+                )
+                .values(worker_id=self.worker_id, expires_at=expires_at)
+            )
+        owned = set(db.execute(
+            select(PollLease.partition).where(and_(PollLease.worker_id == self.worker_id, PollLease.expires_at > now))
+        ).scalars())
+
+        # Forget workers that have been gone for many lease periods
+        db.execute(delete(PollerWorker).where(PollerWorker.heartbeat_at < now - timedelta(seconds=10 * self.lease_ttl)))
+        db.commit()
+
+        if owned != self._owned:
+            logger.info(
+                f"Worker {self.worker_id} holds {len(owned)}/{self.partitions} partitions "
+                f"({len(self.live_workers)} live workers)"
+            )
+            self.version += 1
+        self._owned = owned
+        self._held_until = held_until
+        return owned
+
+    def release(self, db: Session):
+        """Give up every lease and leave the ring, e.g. on shutdown"""
+        db.execute(
+            update(PollLease)
+            .where(PollLease.worker_id == self.worker_id)
+            .values(worker_id=None, expires_at=None)
+        )
+        db.execute(delete(PollerWorker).where(PollerWorker.worker_id == self.worker_id))
+        db.commit()
+        self._owned = set()
+        self._held_until = 0.0
+        self.version += 1
+
+    def status(self) -> Dict:
+        return {
+            "worker_id": self.worker_id,
+            "live_workers": self.live_workers,
+            "partitions": self.partitions,
+            "owned_partitions": len(self.owned),
+            "share": round(self.share, 4)
+        }
+
+    def _touch_worker(self, db: Session, now: datetime):
+        updated = db.execute(
+            update(PollerWorker).where(PollerWorker.worker_id == self.worker_id).values(heartbeat_at=now)
+        ).rowcount
+        if not updated:
+            try:
+                with db.begin_nested():
+                    db.add(PollerWorker(worker_id=self.worker_id, heartbeat_at=now, started_at=now))
+            except IntegrityError:
+                pass
+
+    def _ensure_partitions(self, db: Session):
+        existing = set(db.execute(select(PollLease.partition)).scalars())
+        missing = [{"partition": p} for p in range(self.partitions) if p not in existing]
+        if not missing:
+            return
+        try:
+            with db.begin_nested():
+                bulk_insert(db, PollLease, missing)
+        except IntegrityError:
+            # Another worker created them first
+            pass
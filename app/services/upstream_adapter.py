@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import math
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from ..config import settings
+from .weather_fetcher import WeatherFetcher, get_fetcher
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+
+def _distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+class UpstreamAdapter(ABC):
+    """How a sweep of cities is turned into upstream requests.
+
+    Adapters return (city, payload) pairs shaped like a /weather response,
+    in input order, leaving out cities that could not be fetched.
+    """
+
+    def __init__(self, fetcher: Optional[WeatherFetcher] = None):
+        self._fetcher = fetcher
+
+    @property
+    def fetcher(self) -> WeatherFetcher:
+        return self._fetcher or get_fetcher()
+
+    @abstractmethod
+    async def fetch_current(self, cities: List[Dict], revalidate: bool = False) -> List[Tuple[Dict, Dict]]:
+        """Fetch current weather for `cities`"""
+
+class SingleRequestAdapter(UpstreamAdapter):
+    """One request per city, pipelined over the fetcher's pooled connections"""
+
+    async def fetch_current(self, cities: List[Dict], revalidate: bool = False) -> List[Tuple[Dict, Dict]]:
+        return await self.fetcher.fetch_all_current(cities, revalidate)
+
+class GroupedRequestAdapter(UpstreamAdapter):
+    """Fetch many cities per request through OpenWeatherMap's multi-city endpoints.
+
+    Cities with an `owm_id` are fetched `group_size` at a time from /group.
+    If `use_box` is set, the remaining cities are bucketed into
+    `cell_size`-degree cells. Each cell holding at least `min_box_group`
+    cities is fetched with a single /box/city call, and every city is
+    matched to the nearest station returned within `match_km`. Cities left
+    unmatched, and those in a group or box call that failed, fall back to
+    pipelined single requests.
+    """
+
+    def __init__(
+        self,
+        fetcher: Optional[WeatherFetcher] = None,
+        group_size: Optional[int] = None,
+        use_box: Optional[bool] = None,
+        cell_size: Optional[float] = None,
+        min_box_group: Optional[int] = None,
+        match_km: Optional[float] = None
+    ):
+        super().__init__(fetcher)
+        self.group_size = group_size or settings.UPSTREAM_GROUP_SIZE
+        self.use_box = settings.UPSTREAM_BOX_QUERIES if use_box is None else use_box
+        self.cell_size = cell_size or settings.UPSTREAM_BOX_CELL_SIZE
+        self.min_box_group = min_box_group or settings.UPSTREAM_BOX_MIN_GROUP
+        self.match_km = match_km or settings.UPSTREAM_BOX_MATCH_KM
+
+    async def fetch_current(self, cities: List[Dict], revalidate: bool = False) -> List[Tuple[Dict, Dict]]:
+        with_ids = [city for city in cities if city.get("owm_id")]
+        without_ids = [city for city in cities if not city.get("owm_id")]
+
+        batches = [with_ids[i:i + self.group_size] for i in range(0, len(with_ids), self.group_size)]
+        boxes, singles = self._plan_boxes(without_ids) if self.use_box else ([], without_ids)
+
+        results = await asyncio.gather(
+            *(self._fetch_group(batch) for batch in batches),
+            *(self._fetch_box(box) for box in boxes)
+        )
+
+        payloads: Dict[str, Dict] = {}
+        for found, missed in results:
+            payloads.update(found)
+            singles.extend(missed)
+        if singles:
+            for city, payload in await self.fetcher.fetch_all_current(singles, revalidate):
+                payloads[city["name"]] = payload
+
+        return [(city, payloads[city["name"]]) for city in cities if city["name"] in payloads]
+
+    def _plan_boxes(self, cities: List[Dict]) -> Tuple[List[List[Dict]], List[Dict]]:
+        cells = defaultdict(list)
+        for city in cities:
+            cells[(math.floor(city["lat"] / self.cell_size), math.floor(city["lon"] / self.cell_size))].append(city)
+
+        boxes, singles = [], []
+        for members in cells.values():
+            if len(members) >= self.min_box_group:
+                boxes.append(members)
+            else:
+                singles.extend(members)
+        return boxes, singles
+
+    async def _fetch_group(self, cities: List[Dict]) -> Tuple[Dict[str, Dict], List[Dict]]:
+        """One /group call; returns payloads by city name and the cities it did not cover"""
+        params = {
+            "id": ",".join(str(city["owm_id"]) for city in cities),
+            "appid": self.fetcher.api_key,
+            "units": "metric"
+        }
+        try:
+            data = await self.fetcher.get_json("/group", params)
+        except Exception as e:
+            logger.error(f"Group request for {len(cities)} cities failed, falling back to single requests: {str(e)}")
+            return {}, cities
+
+        by_id = {str(entry.get("id")): entry for entry in data.get("list", [])}
+        found = {}
+        for city in cities:
+            entry = by_id.get(str(city["owm_id"]))
+            if entry is not None:
+                found[city["name"]] = entry
+        return found, [city for city in cities if city["name"] not in found]
+
+    async def _fetch_box(self, cities: List[Dict]) -> Tuple[Dict[str, Dict], List[Dict]]:
+        """One /box/city call around a cell's cities, matched back by distance"""
+        margin = self.match_km / 111.0
+        bbox = (
+            min(city["lon"] for city in cities) - margin,
+            min(city["lat"] for city in cities) - margin,
+            max(city["lon"] for city in cities) + margin,
+            max(city["lat"] for city in cities) + margin
+        )
+        params = {
+            "bbox": ",".join(f"{value:.4f}" for value in bbox) + ",10",
+            "appid": self.fetcher.api_key,
+            "units": "metric"
+        }
+        try:
+            data = await self.fetcher.get_json("/box/city", params)
+        except Exception as e:
+            logger.error(f"Box request for {len(cities)} cities failed, falling back to single requests: {str(e)}")
+            return {}, cities
+
+        stations = []
+        for entry in data.get("list", []):
+            coord = entry.get("coord", {})
+            # /box/city capitalises its coordinate keys
+            lat, lon = coord.get("Lat", coord.get("lat")), coord.get("Lon", coord.get("lon"))
+            if lat is not None and lon is not None:
+                stations.append((lat, lon, entry))
+
+        found = {}
+        for city in cities:
+            best = min(
+                stations,
+                key=lambda station: _distance_km(city["lat"], city["lon"], station[0], station[1]),
+                default=None
+            )
+            if best is not None and _distance_km(city["lat"], city["lon"], best[0], best[1]) <= self.match_km:
+                found[city["name"]] = best[2]
+        return found, [city for city in cities if city["name"] not in found]
+
+def create_upstream_adapter(fetcher: Optional[WeatherFetcher] = None, mode: Optional[str] = None) -> UpstreamAdapter:
+    """Adapter for UPSTREAM_FETCH_MODE ("grouped" or "single")"""
+    mode = (mode or settings.UPSTREAM_FETCH_MODE).lower()
+    if mode == "grouped":
+        return GroupedRequestAdapter(fetcher)
+    if mode == "single":
+        return SingleRequestAdapter(fetcher)
+    raise ValueError(f"Unknown upstream fetch mode: {mode}")
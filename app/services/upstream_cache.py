@@ -0,0 +1,92 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+@dataclass
+class CacheEntry:
+    payload: Any
+    expires_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    revalidated: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses + self.coalesced
+        return (self.hits + self.coalesced) / total if total else 0.0
+
+class UpstreamCache:
+    """TTL cache for upstream responses with single-flight loading.
+
+    Expired entries are kept (up to `max_entries`, least recently used
+    evicted first) so their validators can be sent on the next request.
+    Concurrent misses for the same key share one load.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def peek(self, key: Hashable) -> Optional[CacheEntry]:
+        return self._entries.get(key)
+
+    async def get(
+        self,
+        key: Hashable,
+        load: Callable[[Optional[CacheEntry]], Awaitable[CacheEntry]],
+        revalidate: bool = False
+    ) -> Any:
+        """Return the cached payload for `key`, loading it if missing or expired.
+
+        `load` receives the expired entry (or None) so it can revalidate,
+        and returns the entry to cache. With `revalidate` a fresh entry is
+        treated as expired, so the caller always gets a round-trip (a
+        conditional one when validators are cached).
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.is_fresh and not revalidate:
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry.payload
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats.coalesced += 1
+        else:
+            self.stats.misses += 1
+            task = asyncio.ensure_future(self._load(key, load, entry))
+            self._inflight[key] = task
+        # A waiter being cancelled (e.g. its client disconnected) must not
+        # abort the load the other waiters share
+        return (await asyncio.shield(task)).payload
+
+    async def _load(self, key, load, stale: Optional[CacheEntry]) -> CacheEntry:
+        try:
+            entry = await load(stale)
+        finally:
+            self._inflight.pop(key, None)
+
+        if entry is stale:
+            self.stats.revalidated += 1
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        self._entries.clear()
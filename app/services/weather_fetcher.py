@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from ..config import settings
+from ..metrics import cache_families, metrics
+from .upstream_cache import CacheEntry, UpstreamCache
+
+logger = logging.getLogger(__name__)
+
+upstream_request_seconds = metrics.histogram(
+    "weather_upstream_request_seconds", "OpenWeatherMap round-trip time per endpoint", ["endpoint"]
+)
+upstream_requests = metrics.counter(
+    "weather_upstream_requests_total", "OpenWeatherMap requests per endpoint and status code", ["endpoint", "status"]
+)
+
+class WeatherFetcher:
+    """Async OpenWeatherMap client with a pooled connection and bounded concurrency"""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        cache: Optional[UpstreamCache] = None
+    ):
+        self.base_url = (base_url or settings.OPENWEATHER_BASE_URL).rstrip("/")
+        self.api_key = api_key or settings.OPENWEATHER_API_KEY
+        self.max_concurrency = max_concurrency or settings.FETCH_CONCURRENCY
+        self.timeout = timeout or settings.FETCH_TIMEOUT
+        self._transport = transport
+        self.cache = cache if cache is not None else UpstreamCache(settings.UPSTREAM_CACHE_MAX_ENTRIES)
+        self.ttls = {
+            "/weather": settings.CURRENT_WEATHER_CACHE_TTL,
+            "/forecast": settings.FORECAST_CACHE_TTL
+        }
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared client, created on first use so it binds to the running loop"""
+        if self._client is None or self._client.is_closed:
+            limits = httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency
+            )
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=limits,
+                transport=self._transport
+            )
+        return self._client
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _params(self, city: Dict) -> Dict:
+        return {
+            "lat": city["lat"],
+            "lon": city["lon"],
+            "appid": self.api_key,
+            "units": "metric"
+        }
+
+    async def get_json(self, path: str, params: Dict, revalidate: bool = False) -> Dict:
+        """GET an upstream endpoint through the response cache.
+
+        Responses are cached per (endpoint, lat, lon, units) for the
+        endpoint's TTL; concurrent identical requests share one round-trip,
+        and expired entries are revalidated with ETag/Last-Modified.
+        `revalidate` forces that round-trip even for a fresh entry.
+        """
+        ttl = self.ttls.get(path, 0)
+        if ttl <= 0:
+            return (await self._request(path, params, ttl, None)).payload
+
+        key = (path, round(float(params["lat"]), 4), round(float(params["lon"]), 4), params.get("units"))
+        return await self.cache.get(key, lambda stale: self._request(path, params, ttl, stale), revalidate)
+
+    async def _request(self, path: str, params: Dict, ttl: float, stale: Optional[CacheEntry]) -> CacheEntry:
+        """One upstream round-trip, holding a concurrency slot while it runs"""
+        headers = {}
+        if stale is not None:
+            if stale.etag:
+                headers["If-None-Match"] = stale.etag
+            if stale.last_modified:
+                headers["If-Modified-Since"] = stale.last_modified
+
+        async with self.semaphore:
+            started = time.perf_counter()
+            try:
+                response = await self.client.get(path, params=params, headers=headers)
+            except httpx.HTTPError:
+                upstream_requests.labels(path, "error").inc()
+                raise
+            finally:
+                upstream_request_seconds.labels(path).observe(time.perf_counter() - started)
+        upstream_requests.labels(path, response.status_code).inc()
+
+        if response.status_code == 304 and stale is not None:
+            stale.expires_at = time.monotonic() + ttl
+            return stale
+
+        response.raise_for_status()
+        return CacheEntry(
+            payload=response.json(),
+            expires_at=time.monotonic() + ttl,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified")
+        )
+
+    async def fetch_current(self, city: Dict, revalidate: bool = False) -> Dict:
+        """Fetch the raw current-weather payload for one city"""
+        return await self.get_json("/weather", self._params(city), revalidate)
+
+    async def fetch_forecast(self, city: Dict) -> Dict:
+        """Fetch the raw 5-day forecast payload for one city"""
+        return await self.get_json("/forecast", self._params(city))
+
+    async def fetch_all_current(self, cities: List[Dict], revalidate: bool = False) -> List[Tuple[Dict, Dict]]:
+        """Fetch current weather for every city at once.
+
+        Returns (city, payload) pairs in input order; cities whose request
+        failed are logged and left out.
+        """
+        results = await asyncio.gather(
+            *(self.fetch_current(city, revalidate) for city in cities),
+            return_exceptions=True
+        )
+
+        fetched = []
+        for city, result in zip(cities, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error fetching weather for {city['name']}: {str(result)}")
+                continue
+            fetched.append((city, result))
+        return fetched
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._semaphore = None
+
+_fetcher: Optional[WeatherFetcher] = None
+
+def get_fetcher() -> WeatherFetcher:
+    """Process-wide fetcher shared by the API handlers and the pollers"""
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = WeatherFetcher()
+    return _fetcher
+
+def _collect_upstream_cache_metrics():
+    if _fetcher is None:
+        return []
+    stats = _fetcher.cache.stats
+    counts = {"hit": stats.hits, "miss": stats.misses, "coalesced": stats.coalesced}
+    return cache_families("weather_upstream_cache", "Upstream response cache", counts, stats.hits + stats.coalesced)
+
+metrics.register_collector("upstream_cache", _collect_upstream_cache_metrics)
+
+async def close_fetcher():
+    global _fetcher
+    if _fetcher is not None:
+        await _fetcher.aclose()
+        _fetcher = None
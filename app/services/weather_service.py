@@ -1,161 +1,371 @@
-import requests
+from collections import Counter, defaultdict
 from datetime import datetime, timedelta
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Dict
-from ..models.weather import WeatherData, DailySummary, WeatherAlert
-from ..config import settings
+from typing import List, Dict, Optional, Tuple
+from ..models.weather import WeatherData, DailySummary, HourlySummary, WeatherAlert
+from ..metrics import instrument_queries
+from .weather_fetcher import WeatherFetcher, get_fetcher
+from .upstream_adapter import UpstreamAdapter, create_upstream_adapter
+from .persistence import BulkWriter
+from .rollup_service import RollupService
+from .partitioning import observation_source
+from .retention import resolution_for
+from .observation_store import observation_store
+from .observation_buffer import observation_buffer
+from .response_cache import response_cache
+from .alert_rules import alert_engine
+from .city_registry import city_registry
 import logging
 
 logger = logging.getLogger(__name__)
 
+@instrument_queries
 class WeatherService:
     def __init__(self, db: Session):
         self.db = db
-        self.api_key = settings.OPENWEATHER_API_KEY
-
-    def get_current_weather_all_cities(self) -> List[Dict]:
-        """Get current weather for all configured cities"""
-        weather_data = []
-        for city in settings.CITIES:
-            try:
-                url = "https://api.openweathermap.org/data/2.5/weather"
-                params = {
-                    "lat": city["lat"],
-                    "lon": city["lon"],
-                    "appid": self.api_key,
-                    "units": "metric"
-                }
-                
-                response = requests.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-                
-                # Create weather data object with explicit city name
-                weather = {
-                    "name": city["name"],
-                    "city": city["name"],
-                    "temperature": data["main"]["temp"],
-                    "feels_like": data["main"]["feels_like"],
-                    "weather_condition": data["weather"][0]["main"],
-                    "recorded_at": datetime.utcnow().isoformat()
-                }
-                logger.info(f"Weather data for {city['name']}: {weather}")
-                weather_data.append(weather)
-                
-                # Store in database
-                db_weather = WeatherData(
-                    city=city["name"],
-                    temperature=data["main"]["temp"],
-                    feels_like=data["main"]["feels_like"],
-                    weather_condition=data["weather"][0]["main"],
-                    recorded_at=datetime.utcnow()
-                )
-                self.db.add(db_weather)
-                
-                # Check for temperature alerts
-                if data["main"]["temp"] > settings.TEMPERATURE_THRESHOLD:
-                    alert = WeatherAlert(
-                        city=city["name"],
-                        alert_type="HIGH_TEMPERATURE",
-                        message=f"Temperature {data['main']['temp']}°C exceeds threshold of {settings.TEMPERATURE_THRESHOLD}°C"
-                    )
-                    self.db.add(alert)
-                
-            except Exception as e:
-                logger.error(f"Error fetching weather for {city['name']}: {str(e)}")
-                continue
-                
-        self.db.commit()
+
+    async def fetch_current_weather_all_cities(
+        self,
+        fetcher: Optional[WeatherFetcher] = None,
+        adapter: Optional[UpstreamAdapter] = None,
+        cities: Optional[List[Dict]] = None
+    ) -> List[Dict]:
+        """Get current weather for all registered cities, batching upstream calls where the adapter can"""
+        adapter = adapter or create_upstream_adapter(fetcher or get_fetcher())
+        fetched = await adapter.fetch_current(cities if cities is not None else city_registry.all())
+        return self.store_current_weather(fetched)
+
+    def store_current_weather(self, fetched: List[Tuple[Dict, Dict]]) -> List[Dict]:
+        """Write a sweep of (city, payload) pairs in one transaction, returning their API views"""
+        writer = BulkWriter(self.db)
+        weather_data = [self._record_weather(city, data, writer) for city, data in fetched]
+        self._flush_observations(writer)
         return weather_data
 
+    def _record_weather(self, city: Dict, data: Dict, writer: BulkWriter) -> Dict:
+        """Buffer an upstream payload for writing, returning its API view"""
+        row = {
+            "city": city["name"],
+            "temperature": data["main"]["temp"],
+            "feels_like": data["main"]["feels_like"],
+            "humidity": data["main"].get("humidity"),
+            "wind_speed": data.get("wind", {}).get("speed"),
+            "wind_direction": data.get("wind", {}).get("deg"),
+            "pressure": data["main"].get("pressure"),
+            "weather_condition": data["weather"][0]["main"],
+            "recorded_at": datetime.utcnow()
+        }
+        # The API view is the same reading, so in-memory consumers of it
+        # (the observation store and buffer) match what was stored
+        weather = {"name": city["name"], **row, "recorded_at": row["recorded_at"].isoformat()}
+        logger.info(f"Weather data for {city['name']}: {weather}")
+        
+        # Store in database
+        writer.add(WeatherData, row)
+        
+        return weather
+
+    def _flush_observations(self, writer: BulkWriter):
+        """Write buffered rows, rollups and alert changes for the observations in one transaction"""
+        RollupService(self.db).ingest(writer.rows(WeatherData))
+        self._commit_alerts(writer, writer.rows(WeatherData))
+        response_cache.invalidate("alerts", "summaries")
+
+    def check_temperature_alert(self, weather: WeatherData):
+        """Run one stored reading through the alert rules and write any alert it opens or closes"""
+        writer = BulkWriter(self.db)
+        self._commit_alerts(writer, [{c.name: getattr(weather, c.name) for c in WeatherData.__table__.columns}])
+        response_cache.invalidate("alerts")
+
+    def _commit_alerts(self, writer: BulkWriter, observations: List[Dict]):
+        """Evaluate alerts for the observations and flush the writer in one transaction"""
+        cities = {o["city"] for o in observations}
+        try:
+            self._evaluate_alerts(writer, observations)
+            writer.flush()
+        except Exception:
+            # The engine has already advanced past what was rolled back, so
+            # drop these cities' state; the next reading reloads it from the database
+            alert_engine.forget(cities)
+            raise
+
+    def _evaluate_alerts(self, writer: BulkWriter, observations: List[Dict]):
+        """Run observations through the alert engine, staging opened and closed alerts on the writer"""
+        unseen = {o["city"] for o in observations if not alert_engine.known(o["city"])}
+        if unseen:
+            # Carry on alerts left open by a previous process or shard owner
+            open_rules = defaultdict(list)
+            for city, rule_id in self.db.query(WeatherAlert.city, WeatherAlert.rule_id).filter(
+                WeatherAlert.city.in_(unseen),
+                WeatherAlert.rule_id.isnot(None),
+                WeatherAlert.closed_at.is_(None)
+            ):
+                open_rules[city].append(rule_id)
+            for city in unseen:
+                alert_engine.restore(city, open_rules[city])
+
+        opened = {}
+        for event in alert_engine.evaluate(observations):
+            key = (event.city, event.rule.id)
+            if event.state == "open":
+                opened[key] = {
+                    "city": event.city,
+                    "alert_type": event.rule.alert_type,
+                    "message": event.rule.describe(event.city, event.value),
+                    "rule_id": event.rule.id,
+                    "value": event.value,
+                    "closed_at": None
+                }
+                writer.add(WeatherAlert, opened[key])
+            elif key in opened:
+                opened.pop(key)["closed_at"] = event.at
+            else:
+                self.db.query(WeatherAlert).filter(
+                    WeatherAlert.city == event.city,
+                    WeatherAlert.rule_id == event.rule.id,
+                    WeatherAlert.closed_at.is_(None)
+                ).update({"closed_at": event.at}, synchronize_session=False)
+
     def get_active_alerts(self) -> List[Dict]:
-        """Get active alerts from the last 24 hours"""
+        """Get alerts raised in the last 24 hours or still open"""
         yesterday = datetime.utcnow() - timedelta(days=1)
-        alerts = self.db.query(WeatherAlert).filter(
-            WeatherAlert.created_at >= yesterday
-        ).order_by(WeatherAlert.created_at.desc()).all()
+        alerts = self.db.query(WeatherAlert).filter(or_(
+            WeatherAlert.created_at >= yesterday,
+            and_(WeatherAlert.rule_id.isnot(None), WeatherAlert.closed_at.is_(None))
+        )).order_by(WeatherAlert.created_at.desc()).all()
         
         return [{
             "city": alert.city,
             "type": alert.alert_type,
             "message": alert.message,
-            "created_at": alert.created_at.isoformat()
+            "created_at": alert.created_at.isoformat(),
+            "closed_at": alert.closed_at.isoformat() if alert.closed_at else None
         } for alert in alerts]
 
     def get_daily_summary(self, city: str) -> Dict:
         """Generate daily summary for a city"""
         today = datetime.utcnow().date()
-        weather_data = self.db.query(WeatherData).filter(
-            WeatherData.city == city,
-            WeatherData.recorded_at >= today
-        ).all()
+        rollup = self._find_summary(city, today)
+        if rollup is not None:
+            return self._summary_to_dict(rollup)
+        
+        stats = self._aggregate_recent(city, datetime.combine(today, datetime.min.time()))
         
-        if not weather_data:
-            # If no data today, get current weather
-            try:
-                city_config = next((c for c in settings.CITIES if c["name"] == city), None)
-                if city_config:
-                    url = "https://api.openweathermap.org/data/2.5/weather"
-                    params = {
-                        "lat": city_config["lat"],
-                        "lon": city_config["lon"],
-                        "appid": self.api_key,
-                        "units": "metric"
-                    }
-                    response = requests.get(url, params=params)
-                    response.raise_for_status()
-                    data = response.json()
-                    
-                    weather_data = [WeatherData(
-                        city=city,
-                        temperature=data["main"]["temp"],
-                        feels_like=data["main"]["feels_like"],
-                        weather_condition=data["weather"][0]["main"],
-                        recorded_at=datetime.utcnow()
-                    )]
-                    self.db.add(weather_data[0])
-                    self.db.commit()
-            except Exception as e:
-                logger.error(f"Error getting current weather for {city}: {str(e)}")
-                return None
+        if stats is None:
+            # No readings stored yet today: fall back to the poller's cached
+            # observation rather than calling upstream from a read path
+            observation = observation_store.get(city)
+            if observation is not None:
+                stats = {
+                    "avg_temperature": observation["temperature"],
+                    "max_temperature": observation["temperature"],
+                    "min_temperature": observation["temperature"],
+                    "dominant_condition": observation["weather_condition"]
+                }
         
-        if not weather_data:
+        if stats is None:
             return None
-            
-        temperatures = [w.temperature for w in weather_data]
-        conditions = [w.weather_condition for w in weather_data]
         
         summary = {
             "city": city,
-            "avg_temperature": sum(temperatures) / len(temperatures),
-            "max_temperature": max(temperatures),
-            "min_temperature": min(temperatures),
-            "dominant_condition": max(set(conditions), key=conditions.count),
+            "avg_temperature": stats["avg_temperature"],
+            "max_temperature": stats["max_temperature"],
+            "min_temperature": stats["min_temperature"],
+            "dominant_condition": stats["dominant_condition"],
             "date": today.isoformat()
         }
         
         return summary
 
+    def get_latest_summary(self, city: str) -> Optional[Dict]:
+        """Most recent daily rollup for a city"""
+        summary = self.db.query(DailySummary).filter(
+            DailySummary.city == city
+        ).order_by(DailySummary.date.desc()).first()
+        return self._summary_to_dict(summary) if summary else None
+
+    def get_summary_history(self, city: str, days: int = 7) -> List[Dict]:
+        """Daily rollups for the last N days, oldest first"""
+        start_day = datetime.combine(datetime.utcnow().date() - timedelta(days=days - 1), datetime.min.time())
+        summaries = self.db.query(DailySummary).filter(
+            DailySummary.city == city,
+            DailySummary.date >= start_day
+        ).order_by(DailySummary.date).all()
+        return [self._summary_to_dict(s) for s in summaries]
+
+    def generate_daily_summary(self, city: str, day=None) -> Optional[DailySummary]:
+        """Rebuild one city's rollup for a day (default today) from raw observations"""
+        day = day or datetime.utcnow().date()
+        RollupService(self.db).backfill(day, day, [city])
+        return self._find_summary(city, day)
+
+    def _find_summary(self, city: str, day) -> Optional[DailySummary]:
+        return self.db.query(DailySummary).filter(
+            DailySummary.city == city,
+            DailySummary.date == datetime.combine(day, datetime.min.time())
+        ).first()
+
+    def _summary_to_dict(self, summary: DailySummary) -> Dict:
+        return {
+            "city": summary.city,
+            "avg_temperature": summary.avg_temperature,
+            "max_temperature": summary.max_temperature,
+            "min_temperature": summary.min_temperature,
+            "avg_humidity": summary.avg_humidity,
+            "avg_wind_speed": summary.avg_wind_speed,
+            "readings_count": summary.readings_count,
+            "dominant_condition": summary.dominant_condition,
+            "date": summary.date.date().isoformat()
+        }
+
     def get_statistics(self, city: str, days: int = 7) -> Dict:
-        """Get weather statistics for a city"""
+        """Get weather statistics for a city.
+
+        Ranges reaching back past the raw retention window are answered
+        from the hourly, then daily, rollups instead.
+        """
         start_date = datetime.utcnow() - timedelta(days=days)
-        data = self.db.query(WeatherData).filter(
-            WeatherData.city == city,
-            WeatherData.recorded_at >= start_date
-        ).all()
+        resolution = resolution_for(start_date)
+        if resolution == "raw":
+            stats = self._aggregate_recent(city, start_date)
+        else:
+            stats = self._aggregate_rollups(city, start_date, HourlySummary if resolution == "hourly" else DailySummary)
         
-        if not data:
+        if stats is None:
             return None
-            
-        temperatures = [d.temperature for d in data]
-        conditions = [d.weather_condition for d in data]
         
         return {
             "city": city,
             "period_days": days,
-            "avg_temperature": sum(temperatures) / len(temperatures),
-            "max_temperature": max(temperatures),
-            "min_temperature": min(temperatures),
-            "readings_count": len(temperatures),
-            "dominant_condition": max(set(conditions), key=conditions.count)
-        }
\ No newline at end of file
+            "avg_temperature": stats["avg_temperature"],
+            "max_temperature": stats["max_temperature"],
+            "min_temperature": stats["min_temperature"],
+            "readings_count": stats["readings_count"],
+            "dominant_condition": stats["dominant_condition"],
+            "resolution": resolution
+        }
+
+    def get_recent_statistics(self, city: str, hours: float = 1) -> Optional[Dict]:
+        """Statistics over a city's raw readings in the last N hours"""
+        stats = self._aggregate_recent(city, datetime.utcnow() - timedelta(hours=hours))
+        if stats is None:
+            return None
+        return {"city": city, "period_hours": hours, **stats}
+
+    def _aggregate_recent(self, city: str, since: datetime) -> Optional[Dict]:
+        """Aggregate recent raw readings from the in-memory buffer when it holds the whole window"""
+        if observation_buffer.covers(city, since):
+            observation_buffer.hits += 1
+            return observation_buffer.aggregate(city, since)
+        observation_buffer.misses += 1
+        return self._aggregate_weather(city, since)
+
+    def _aggregate_weather(self, city: str, since) -> Optional[Dict]:
+        """Aggregate a city's readings since a point in time in a single query.
+
+        AVG/MIN/MAX/COUNT and the most frequent condition (ties broken
+        alphabetically) are computed by the database, so only one row comes
+        back regardless of how many readings match.
+        """
+        source = observation_source(self.db)
+        in_range = (source.c.city == city, source.c.recorded_at >= since)
+        
+        dominant_condition = (
+            select(source.c.weather_condition)
+            .where(*in_range)
+            .group_by(source.c.weather_condition)
+            .order_by(func.count().desc(), source.c.weather_condition)
+            .limit(1)
+            .scalar_subquery()
+        )
+        row = self.db.execute(
+            select(
+                func.avg(source.c.temperature).label("avg_temperature"),
+                func.max(source.c.temperature).label("max_temperature"),
+                func.min(source.c.temperature).label("min_temperature"),
+                func.avg(source.c.humidity).label("avg_humidity"),
+                func.avg(source.c.wind_speed).label("avg_wind_speed"),
+                func.count(source.c.id).label("readings_count"),
+                dominant_condition.label("dominant_condition")
+            ).where(*in_range)
+        ).one()
+        
+        if not row.readings_count:
+            return None
+        return dict(row._mapping)
+
+    def _aggregate_rollups(self, city: str, since: datetime, model) -> Optional[Dict]:
+        """Aggregate a city's hourly or daily rollups from the bucket containing `since`"""
+        period = model.hour if model is HourlySummary else model.date
+        floor = since.replace(minute=0, second=0, microsecond=0)
+        if model is DailySummary:
+            floor = floor.replace(hour=0)
+        rows = self.db.query(
+            model.readings_count, model.temperature_sum, model.min_temperature,
+            model.max_temperature, model.condition_counts
+        ).filter(model.city == city, period >= floor).all()
+
+        readings = sum(row.readings_count or 0 for row in rows)
+        if not readings:
+            return None
+        conditions = Counter()
+        for row in rows:
+            conditions.update(row.condition_counts or {})
+        return {
+            "avg_temperature": sum(row.temperature_sum or 0.0 for row in rows) / readings,
+            "max_temperature": max(row.max_temperature for row in rows if row.max_temperature is not None),
+            "min_temperature": min(row.min_temperature for row in rows if row.min_temperature is not None),
+            "readings_count": readings,
+            "dominant_condition": (
+                min(conditions.items(), key=lambda item: (-item[1], item[0]))[0] if conditions else None
+            )
+        }
+
+class AsyncWeatherService:
+    """WeatherService's read paths over an AsyncSession.
+
+    Each method runs the sync implementation through `AsyncSession.run_sync`,
+    so the queries are the same but every round trip awaits the asyncio
+    driver (asyncpg, aiosqlite) instead of blocking the event loop.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _run(self, method: str, *args):
+        return await self.db.run_sync(lambda session: getattr(WeatherService(session), method)(*args))
+
+    async def get_active_alerts(self) -> List[Dict]:
+        return await self._run("get_active_alerts")
+
+    async def get_daily_summary(self, city: str) -> Optional[Dict]:
+        return await self._run("get_daily_summary", city)
+
+    async def get_daily_summaries(self, cities: List[str]) -> List[Dict]:
+        """Today's summary for each city that has one"""
+        def build(session: Session) -> List[Dict]:
+            service = WeatherService(session)
+            summaries = []
+            for city in cities:
+                try:
+                    summary = service.get_daily_summary(city)
+                    if summary:
+                        summaries.append(summary)
+                except Exception as e:
+                    logger.error(f"Error getting summary for {city}: {str(e)}")
+            return summaries
+        return await self.db.run_sync(build)
+
+    async def get_latest_summary(self, city: str) -> Optional[Dict]:
+        return await self._run("get_latest_summary", city)
+
+    async def get_summary_history(self, city: str, days: int = 7) -> List[Dict]:
+        return await self._run("get_summary_history", city, days)
+
+    async def get_statistics(self, city: str, days: int = 7) -> Optional[Dict]:
+        return await self._run("get_statistics", city, days)
+
+    async def get_recent_statistics(self, city: str, hours: float = 1) -> Optional[Dict]:
+        return await self._run("get_recent_statistics", city, hours)
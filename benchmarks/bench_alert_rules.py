@@ -0,0 +1,83 @@
+"""Alert rule engine throughput: one sweep of readings through many rules.
+
+Rules are mostly per-city thresholds with a few global ones, some with
+consecutive counts and hysteresis, plus rate-of-change rules. The first
+sweep has no previous readings to compare against; later sweeps move each
+city's readings along a random walk, as successive polls do.
+
+Usage:
+    python -m benchmarks.bench_alert_rules --rules 10000 --cities 10000 --sweeps 5
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from app.services.alert_rules import AlertEngine, AlertRule
+
+def make_rules(count, cities, rng):
+    rules = []
+    for i in range(count):
+        scoped = rng.random() < 0.99
+        upper = rng.random() < 0.5
+        value = rng.uniform(25, 45) if upper else rng.uniform(-5, 15)
+        kind = "rate" if rng.random() < 0.1 else "threshold"
+        if kind == "rate":
+            value = rng.uniform(2, 6) if upper else -rng.uniform(2, 6)
+        rules.append(AlertRule(
+            id=f"rule-{i}",
+            field=rng.choice(["temperature", "feels_like", "humidity"]) if kind == "threshold" else "temperature",
+            op=">" if upper else "<",
+            value=value,
+            kind=kind,
+            count=rng.choice([1, 1, 2, 3]),
+            clear=(value - 2 if upper else value + 2) if rng.random() < 0.5 else None,
+            cities=frozenset({f"City{rng.randrange(cities)}"}) if scoped else None
+        ))
+    return rules
+
+def make_sweep(cities, base, at, rng):
+    for i in range(cities):
+        base[i] += rng.gauss(0, 0.2)
+    return [{
+        "city": f"City{i}",
+        "temperature": base[i],
+        "feels_like": base[i] + 1,
+        "humidity": 60 + base[i] / 2,
+        "recorded_at": at
+    } for i in range(cities)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, default=10000)
+    parser.add_argument("--cities", type=int, default=10000)
+    parser.add_argument("--sweeps", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    engine = AlertEngine(make_rules(args.rules, args.cities, rng))
+    print(f"Compiled {args.rules} rules in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    base = [rng.uniform(10, 40) for _ in range(args.cities)]
+    at = datetime(2024, 5, 1)
+    timings = []
+    for sweep in range(args.sweeps):
+        readings = make_sweep(args.cities, base, at + timedelta(minutes=10 * sweep), rng)
+        evaluations = engine.evaluations
+        start = time.perf_counter()
+        events = engine.evaluate(readings)
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        print(
+            f"Sweep {sweep}: {len(readings)} readings in {elapsed * 1000:.1f} ms, "
+            f"{engine.evaluations - evaluations} rule evaluations, {len(events)} events"
+        )
+
+    steady = timings[1:] or timings
+    print(f"Median steady-state sweep: {statistics.median(steady) * 1000:.1f} ms; {engine.stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Databases and seed data shared by the benchmark scenarios"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import create_async_db_engine, create_db_engine
+from app.models import Base, WeatherData
+from app.services.persistence import bulk_insert
+from app.services.rollup_service import RollupService
+from tests.fake_owm import CONDITIONS
+
+@dataclass
+class BenchDatabase:
+    url: str
+    engine: Engine
+    Session: sessionmaker
+
+    @property
+    def backend(self) -> str:
+        return self.engine.dialect.name
+
+    def async_engine(self, **overrides):
+        return create_async_db_engine(self.url, name="bench-async", **overrides)
+
+@contextmanager
+def bench_database(url: Optional[str] = None) -> Iterator[BenchDatabase]:
+    """A freshly created schema: a temporary SQLite file, or `url` (e.g. PostgreSQL) wiped first.
+
+    Never point `url` at a database whose data you want to keep.
+    """
+    directory = None
+    if url is None:
+        directory = tempfile.mkdtemp(prefix="weather-bench-")
+        url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    engine = create_db_engine(url, name="bench")
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    try:
+        yield BenchDatabase(url, engine, sessionmaker(bind=engine))
+    finally:
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+def observation_rows(cities: List[str], readings: int, now: Optional[datetime] = None, step: timedelta = timedelta(minutes=10)) -> List[Dict]:
+    """`readings` observations per city, newest at `now`, `step` apart"""
+    now = now or datetime.utcnow()
+    return [{
+        "city": city,
+        "temperature": 20.0 + (i * 7 + c) % 15,
+        "feels_like": 21.0 + (i * 7 + c) % 15,
+        "humidity": 40.0 + i % 30,
+        "wind_speed": 2.0 + i % 5,
+        "weather_condition": CONDITIONS[(i + c) % len(CONDITIONS)],
+        "recorded_at": now - i * step
+    } for c, city in enumerate(cities) for i in range(readings)]
+
+def seed_observations(db: BenchDatabase, cities: List[str], readings: int, now: Optional[datetime] = None) -> int:
+    """Insert observations and build their rollups, returning the number of city-days"""
+    rows = observation_rows(cities, readings, now)
+    session = db.Session()
+    try:
+        bulk_insert(session, WeatherData, rows)
+        session.commit()
+        first = min(row["recorded_at"] for row in rows).date()
+        return RollupService(session).backfill(first, max(row["recorded_at"] for row in rows).date(), cities).daily
+    finally:
+        session.close()
@@ -0,0 +1,27 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.models import Base
+
+@pytest.fixture
+def engine():
+    """In-memory SQLite database with the schema created, shared across threads"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    yield engine
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+@pytest.fixture
+def db_session(engine):
+    """Session on the test database"""
+    db = sessionmaker(bind=engine)()
+    try:
+        yield db
+    finally:
+        db.close()
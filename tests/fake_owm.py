@@ -0,0 +1,146 @@
+"""OpenWeatherMap stand-in for tests and benchmarks, including the multi-city endpoints.
+
+In-process it plugs into a WeatherFetcher through httpx.MockTransport. Run
+as a module it serves the same endpoints over HTTP, so a real deployment can
+be pointed at it with OPENWEATHER_BASE_URL=http://127.0.0.1:9000/data/2.5:
+
+    python -m tests.fake_owm --cities 1000 --latency 0.05 --error-rate 0.01 --port 9000
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+
+from app.services import WeatherFetcher
+
+CONDITIONS = ["Clear", "Clouds", "Rain", "Haze", "Mist"]
+
+def make_stations(count: int, seed: int = 0, first_id: int = 100000) -> List[Dict]:
+    """`count` stations scattered over India with plausible temperatures"""
+    rng = random.Random(seed)
+    return [{
+        "id": first_id + i,
+        "name": f"City{i}",
+        "lat": round(rng.uniform(8.0, 35.0), 4),
+        "lon": round(rng.uniform(68.0, 97.0), 4),
+        "temp": round(rng.uniform(10.0, 42.0), 1)
+    } for i in range(count)]
+
+def as_cities(stations: List[Dict]) -> List[Dict]:
+    """Registry-style city dicts for stations, with their OpenWeatherMap ids"""
+    return [{"name": s["name"], "lat": s["lat"], "lon": s["lon"], "owm_id": s["id"]} for s in stations]
+
+class FakeOpenWeatherMap:
+    """Serves /weather, /forecast, /group and /box/city for a fixed set of stations.
+
+    Stations are dicts with id, name, lat, lon and temp. Requests are
+    counted per path; any path in `failing_paths` answers 500, and so does
+    any other request with probability `error_rate`. Every response is
+    delayed by `latency` seconds.
+    """
+
+    def __init__(
+        self,
+        stations: List[Dict],
+        latency: float = 0.0,
+        failing_paths: Iterable[str] = (),
+        error_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        self.stations = stations
+        self.latency = latency
+        self.failing_paths = set(failing_paths)
+        self.error_rate = error_rate
+        self.calls = Counter()
+        self.errors = 0
+        self._random = random.Random(seed)
+
+    def _entry(self, station: Dict, box: bool = False) -> Dict:
+        coord = {"Lat": station["lat"], "Lon": station["lon"]} if box else {"lat": station["lat"], "lon": station["lon"]}
+        return {
+            "id": station["id"],
+            "name": station["name"],
+            "coord": coord,
+            "main": {"temp": station["temp"], "feels_like": station["temp"] + 1, "humidity": 50, "pressure": 1010},
+            "wind": {"speed": 2.0, "deg": 90},
+            "weather": [{"main": "Clear"}]
+        }
+
+    def _forecast(self, station: Dict) -> Dict:
+        start = int(time.time()) // 10800 * 10800
+        return {"cnt": 40, "list": [{
+            "dt": start + 10800 * i,
+            "main": {"temp": station["temp"] + i % 8 - 4, "feels_like": station["temp"] + i % 8 - 3, "humidity": 50 + i % 20},
+            "wind": {"speed": 2.0 + i % 5},
+            "weather": [{"main": CONDITIONS[i % len(CONDITIONS)]}],
+            "pop": (i % 10) / 10
+        } for i in range(40)]}
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path.split("/data/2.5", 1)[-1]
+        self.calls[path] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if path in self.failing_paths or (self.error_rate and self._random.random() < self.error_rate):
+            self.errors += 1
+            return httpx.Response(500, json={"message": "upstream error"})
+
+        params = request.url.params
+        if path in ("/weather", "/forecast"):
+            lat, lon = float(params["lat"]), float(params["lon"])
+            station = min(self.stations, key=lambda s: (s["lat"] - lat) ** 2 + (s["lon"] - lon) ** 2)
+            return httpx.Response(200, json=self._entry(station) if path == "/weather" else self._forecast(station))
+        if path == "/group":
+            ids = {int(i) for i in params["id"].split(",")}
+            found = [self._entry(s) for s in self.stations if s["id"] in ids]
+            return httpx.Response(200, json={"cnt": len(found), "list": found})
+        if path == "/box/city":
+            lon_left, lat_bottom, lon_right, lat_top = (float(v) for v in params["bbox"].split(",")[:4])
+            found = [
+                self._entry(s, box=True) for s in self.stations
+                if lat_bottom <= s["lat"] <= lat_top and lon_left <= s["lon"] <= lon_right
+            ]
+            return httpx.Response(200, json={"cod": 200, "cnt": len(found), "list": found})
+        return httpx.Response(404, json={"message": "not found"})
+
+    def fetcher(self, **kwargs) -> WeatherFetcher:
+        return WeatherFetcher(
+            base_url="http://fake-owm.local/data/2.5",
+            api_key="test",
+            transport=httpx.MockTransport(self.handler),
+            **kwargs
+        )
+
+    def asgi_app(self):
+        """The same endpoints as an ASGI app, for serving over real HTTP"""
+        from starlette.applications import Starlette
+        from starlette.requests import Request
+        from starlette.responses import Response
+        from starlette.routing import Route
+
+        async def endpoint(request: Request) -> Response:
+            response = await self.handler(httpx.Request(request.method, str(request.url)))
+            return Response(response.content, status_code=response.status_code, media_type="application/json")
+
+        return Starlette(routes=[Route("/data/2.5/{path:path}", endpoint)])
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve a fake OpenWeatherMap over HTTP")
+    parser.add_argument("--cities", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=9000)
+    args = parser.parse_args()
+
+    upstream = FakeOpenWeatherMap(make_stations(args.cities, args.seed), args.latency, error_rate=args.error_rate, seed=args.seed)
+    uvicorn.run(upstream.asgi_app(), host="127.0.0.1", port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import pytest
+from datetime import datetime, timedelta
+from app.models import WeatherAlert
+from app.services import AlertEngine, AlertRule, WeatherService
+from app.services import weather_service
+from app.services.alert_rules import parse_rule
+
+START = datetime(2024, 5, 1, 12)
+
+def run(engine, temperatures, city="Delhi", step=timedelta(minutes=10)):
+    """Feed one city's readings through the engine, returning (reading index, event state) pairs"""
+    events = []
+    for i, temperature in enumerate(temperatures):
+        reading = {"city": city, "temperature": temperature, "recorded_at": START + i * step}
+        events.extend((i, event.state) for event in engine.evaluate([reading]))
+    return events
+
+def test_threshold_opens_once_and_closes():
+    engine = AlertEngine([AlertRule(id="heat", field="temperature", op=">", value=35)])
+
+    assert run(engine, [30, 36, 37, 38, 34, 36]) == [(1, "open"), (4, "close"), (5, "open")]
+
+def test_consecutive_readings_are_required():
+    engine = AlertEngine([AlertRule(id="heat", field="temperature", op=">", value=35, count=3)])
+
+    assert run(engine, [36, 36, 30, 36, 36, 36, 37]) == [(5, "open")]
+    assert engine.stats()["pending"] == 0
+
+def test_hysteresis_keeps_the_alert_open_until_clear():
+    engine = AlertEngine([AlertRule(id="heat", field="temperature", op=">", value=35, clear=33)])
+
+    assert run(engine, [36, 34, 35.5, 32.9, 34, 35.1]) == [(0, "open"), (3, "close"), (5, "open")]
+
+def test_rate_of_change():
+    engine = AlertEngine([AlertRule(id="drop", field="temperature", op="<", value=-6, kind="rate")])
+
+    # Readings are 10 minutes apart, so a 1.5 degC fall is -9 degC/h
+    assert run(engine, [30, 29.5, 28, 27.8, 27.6]) == [(2, "open"), (3, "close")]
+
+def test_readings_only_touch_rules_they_cross():
+    rules = [AlertRule(id=f"city-{i}", field="temperature", op=">", value=40, cities=frozenset({f"City{i}"}))
+             for i in range(1000)]
+    rules += [AlertRule(id=f"global-{i}", field="humidity", op="<", value=float(i % 10)) for i in range(1000)]
+    engine = AlertEngine(rules)
+
+    readings = [{"city": f"City{i}", "temperature": 20.0, "humidity": 50.0, "recorded_at": START} for i in range(1000)]
+    assert engine.evaluate(readings) == []
+    readings[7]["temperature"] = 41.0
+    events = engine.evaluate(readings)
+
+    assert [(e.city, e.rule.id) for e in events] == [("City7", "city-7")]
+    assert engine.stats()["evaluations"] == 1
+
+def test_invalid_rules_are_rejected():
+    with pytest.raises(ValueError):
+        AlertRule(id="bad", field="temperature", op="!=", value=1)
+    with pytest.raises(ValueError):
+        parse_rule({"id": "bad", "field": "temperature", "op": ">", "value": 35, "clear": 40})
+
+def payload(temperature):
+    return {"main": {"temp": temperature, "feels_like": temperature + 1, "humidity": 40}, "weather": [{"main": "Clear"}]}
+
+def test_sustained_heat_writes_one_alert(db_session, monkeypatch):
+    monkeypatch.setattr(weather_service, "alert_engine", AlertEngine([
+        AlertRule(id="heat", alert_type="HIGH_TEMPERATURE", field="temperature", op=">", value=35)
+    ]))
+    service = WeatherService(db_session)
+    city = {"name": "Delhi", "lat": 28.6, "lon": 77.2}
+
+    for temperature in (36.0, 37.0, 38.0):
+        service.store_current_weather([(city, payload(temperature))])
+
+    alert = db_session.query(WeatherAlert).one()
+    assert (alert.alert_type, alert.rule_id, alert.value, alert.closed_at) == ("HIGH_TEMPERATURE", "heat", 36.0, None)
+    assert [a["city"] for a in service.get_active_alerts()] == ["Delhi"]
+
+    service.store_current_weather([(city, payload(30.0))])
+    db_session.expire_all()
+    assert db_session.query(WeatherAlert).one().closed_at is not None
+
+def test_open_alerts_survive_a_restart(db_session, monkeypatch):
+    rules = [AlertRule(id="heat", field="temperature", op=">", value=35)]
+    city = {"name": "Delhi", "lat": 28.6, "lon": 77.2}
+    monkeypatch.setattr(weather_service, "alert_engine", AlertEngine(rules))
+    WeatherService(db_session).store_current_weather([(city, payload(36.0))])
+
+    # A fresh engine learns of the open alert from the database instead of raising it again
+    monkeypatch.setattr(weather_service, "alert_engine", AlertEngine(rules))
+    WeatherService(db_session).store_current_weather([(city, payload(37.0))])
+    assert db_session.query(WeatherAlert).count() == 1
+
+    WeatherService(db_session).store_current_weather([(city, payload(20.0))])
+    db_session.expire_all()
+    assert db_session.query(WeatherAlert).one().closed_at is not None
+
+def test_failed_commit_does_not_swallow_an_alert(db_session, monkeypatch):
+    monkeypatch.setattr(weather_service, "alert_engine", AlertEngine([
+        AlertRule(id="heat", field="temperature", op=">", value=35)
+    ]))
+    city = {"name": "Delhi", "lat": 28.6, "lon": 77.2}
+    commit = db_session.commit
+
+    def failing_commit():
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(db_session, "commit", failing_commit)
+    with pytest.raises(RuntimeError):
+        WeatherService(db_session).store_current_weather([(city, payload(36.0))])
+    monkeypatch.setattr(db_session, "commit", commit)
+    assert db_session.query(WeatherAlert).count() == 0
+
+    # The rolled-back alert is raised again rather than assumed open
+    WeatherService(db_session).store_current_weather([(city, payload(37.0))])
+    assert db_session.query(WeatherAlert).one().value == 37.0
+
+class FakeShard:
+    """One partition, held or not"""
+
+    def __init__(self):
+        self.version = 0
+        self.owned = {0}
+        self.share = 1.0
+
+    def owned_cities(self, names):
+        return list(names) if self.owned else []
+
+    def move(self, held):
+        self.owned = {0} if held else set()
+        self.share = 1.0 if held else 0.0
+        self.version += 1
+
+def test_lease_moving_away_and_back_reloads_open_alerts(db_session, monkeypatch):
+    from app.services import background_service
+    from app.services.background_service import BackgroundService
+    from app.services.scheduler import Scheduler
+
+    rules = [AlertRule(id="heat", field="temperature", op=">", value=35)]
+    engine_a, engine_b = AlertEngine(rules), AlertEngine(rules)
+    monkeypatch.setattr(background_service, "alert_engine", engine_a)
+    shard = FakeShard()
+    worker_a = BackgroundService(Scheduler(), shard=shard)
+    city = {"name": "Delhi", "lat": 28.6, "lon": 77.2}
+
+    def store(engine, temperature):
+        monkeypatch.setattr(weather_service, "alert_engine", engine)
+        WeatherService(db_session).store_current_weather([(city, payload(temperature))])
+
+    worker_a._sync_planner()
+    store(engine_a, 30.0)
+    shard.move(held=False)
+    worker_a._sync_planner()
+    store(engine_b, 40.0)
+    shard.move(held=True)
+    worker_a._sync_planner()
+    store(engine_a, 41.0)
+
+    assert db_session.query(WeatherAlert).filter(WeatherAlert.closed_at.is_(None)).count() == 1
@@ -0,0 +1,73 @@
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from app.database import create_async_db_engine, get_async_db
+from app.models import Base, DailySummary, WeatherAlert, WeatherData
+from app.services import AsyncWeatherService, WeatherService
+from app.services.response_cache import response_cache
+
+def seed(db):
+    now = datetime.utcnow()
+    db.add_all(WeatherData(
+        city="Delhi", temperature=30.0 + i, feels_like=31.0, humidity=40.0,
+        weather_condition="Clear", recorded_at=now - timedelta(minutes=10 * i)
+    ) for i in range(5))
+    db.add(DailySummary(
+        city="Delhi", date=datetime.combine(now.date(), datetime.min.time()), avg_temperature=32.0,
+        max_temperature=34.0, min_temperature=30.0, readings_count=5, dominant_condition="Clear"
+    ))
+    db.add(WeatherAlert(city="Delhi", alert_type="HIGH_TEMPERATURE", message="hot", created_at=now))
+    db.commit()
+
+@pytest.fixture
+def sync_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/async.db")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    seed(db)
+    db.close()
+    return engine
+
+@pytest.fixture
+def async_engine(sync_engine):
+    """aiosqlite engine over the same file database, seeded through the sync driver"""
+    return create_async_db_engine(sync_engine.url, name="test-async")
+
+@pytest.mark.asyncio
+async def test_async_reads_match_the_sync_service(sync_engine, async_engine):
+    sync_db = sessionmaker(bind=sync_engine)()
+    expected = WeatherService(sync_db)
+    async with async_sessionmaker(async_engine)() as db:
+        service = AsyncWeatherService(db)
+        assert await service.get_recent_statistics("Delhi", 1) == expected.get_recent_statistics("Delhi", 1)
+        assert await service.get_summary_history("Delhi") == expected.get_summary_history("Delhi")
+        assert [s["city"] for s in await service.get_daily_summaries(["Delhi", "Mumbai"])] == ["Delhi"]
+        assert len(await service.get_active_alerts()) == 1
+    sync_db.close()
+    await async_engine.dispose()
+
+def test_routes_use_the_async_session(async_engine):
+    from app.main import app
+
+    async def override():
+        async with async_sessionmaker(async_engine)() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = override
+    response_cache.clear()
+    try:
+        client = TestClient(app)
+        alerts = client.get("/api/alerts")
+        recent = client.get("/api/statistics/Delhi/recent", params={"hours": 1})
+        assert client.get("/api/statistics/Delhi/recent", params={"hours": 500}).status_code == 400
+        assert client.get("/api/daily-summaries").json()[0]["avg_temperature"] == 32.0
+    finally:
+        app.dependency_overrides.clear()
+        response_cache.clear()
+
+    assert alerts.status_code == 200 and alerts.json()[0]["type"] == "HIGH_TEMPERATURE"
+    assert "etag" in alerts.headers
+    assert recent.json()["readings_count"] == 5
@@ -0,0 +1,23 @@
+from benchmarks.suite import DEFAULTS, QUICK, compare, run
+
+def results(metrics):
+    return {"scenarios": {"ingest": {"metrics": metrics}}}
+
+def test_quick_ingest_and_fanout_produce_metrics():
+    params = {**DEFAULTS, **QUICK, "latency": 0.0, "error_rate": 0.0}
+    document = run(["ingest", "fanout"], params)
+
+    ingest = document["scenarios"]["ingest"]["metrics"]
+    assert ingest["rows"] == params["cities"] * params["sweeps"]
+    assert ingest["upstream_errors"] == 0
+    fanout = document["scenarios"]["fanout"]["metrics"]
+    assert fanout["deltas"] == params["clients"] * params["batches"]
+    assert fanout["dropped"] == 0
+    assert document["database"] == "sqlite"
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    baseline = results({"sweep_p50_ms": 100.0, "rows_per_sec": 1000.0, "rows": 10})
+    assert compare(baseline, results({"sweep_p50_ms": 110.0, "rows_per_sec": 900.0, "rows": 1}), 0.2) == []
+    regressions = compare(baseline, results({"sweep_p50_ms": 150.0, "rows_per_sec": 500.0, "rows": 10}), 0.2)
+    assert len(regressions) == 2
+    assert compare({"scenarios": {}}, results({"sweep_p50_ms": 1e6}), 0.2) == []
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import pytest
+from app.services.broadcast import Backplane, Broadcaster, InMemoryBackplane, PostgresBackplane, split_message
+
+class FakeWebSocket:
+    """Records sent frames; `gate` holds every send until it is set"""
+
+    def __init__(self, gate=None, fail=False):
+        self.gate = gate
+        self.fail = fail
+        self.frames = []
+
+    async def send_text(self, payload):
+        if self.fail:
+            raise ConnectionResetError("client went away")
+        if self.gate is not None:
+            await self.gate.wait()
+        self.frames.append(json.loads(payload))
+
+async def settle():
+    await asyncio.sleep(0.01)
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_stall_others():
+    broadcaster = Broadcaster(InMemoryBackplane(), queue_size=2, send_timeout=5)
+    await broadcaster.start()
+    gate = asyncio.Event()
+    slow, fast = FakeWebSocket(gate=gate), FakeWebSocket()
+    broadcaster.connect(slow)
+    broadcaster.connect(fast)
+
+    for i in range(5):
+        await broadcaster.publish({"seq": i})
+        await settle()
+
+    assert [frame["seq"] for frame in fast.frames] == [0, 1, 2, 3, 4]
+    assert slow.frames == []
+
+    gate.set()
+    await settle()
+    # The first send was already in flight; of the rest only the newest two were kept
+    assert [frame["seq"] for frame in slow.frames] == [0, 3, 4]
+    assert broadcaster.stats()["dropped"] == 2
+    await broadcaster.stop()
+
+@pytest.mark.asyncio
+async def test_every_worker_receives_every_update():
+    backplane = InMemoryBackplane()
+    worker_a, worker_b = Broadcaster(backplane), Broadcaster(backplane)
+    await worker_a.start()
+    await worker_b.start()
+    client_a, client_b = FakeWebSocket(), FakeWebSocket()
+    worker_a.connect(client_a)
+    worker_b.connect(client_b)
+
+    await worker_a.publish({"type": "observations", "data": [{"city": "Delhi"}]})
+    await settle()
+
+    assert client_a.frames == client_b.frames == [{"type": "observations", "data": [{"city": "Delhi"}]}]
+    await worker_a.stop()
+    await worker_b.stop()
+
+@pytest.mark.asyncio
+async def test_on_message_shapes_what_clients_receive():
+    seen = []
+
+    def on_message(message):
+        seen.append(message)
+        return {"cities": len(seen)} if message["type"] == "observations" else None
+
+    broadcaster = Broadcaster(InMemoryBackplane(), on_message=on_message)
+    await broadcaster.start()
+    client = FakeWebSocket()
+    broadcaster.connect(client)
+
+    await broadcaster.publish({"type": "observations", "data": []})
+    await broadcaster.publish({"type": "ping"})
+    await settle()
+
+    assert client.frames == [{"cities": 1}]
+    assert len(seen) == 2
+    await broadcaster.stop()
+
+@pytest.mark.asyncio
+async def test_failing_client_is_removed():
+    broadcaster = Broadcaster(InMemoryBackplane())
+    await broadcaster.start()
+    broadcaster.connect(FakeWebSocket(fail=True))
+    healthy = FakeWebSocket()
+    broadcaster.connect(healthy)
+
+    await broadcaster.publish({"seq": 1})
+    await settle()
+
+    assert len(broadcaster.connections) == 1
+    assert healthy.frames == [{"seq": 1}]
+    await broadcaster.stop()
+
+def test_split_message_fits_notify_limit_and_keeps_every_item():
+    observations = [{"city": f"city-{i}", "temperature": 20.0 + i % 10} for i in range(1000)]
+    payloads = split_message({"type": "observations", "data": observations}, 7900)
+
+    assert len(payloads) > 1
+    assert all(len(p.encode()) < 7900 for p in payloads)
+    merged = [item for p in payloads for item in json.loads(p)["data"]]
+    assert merged == observations
+
+@pytest.mark.asyncio
+async def test_disconnect_stops_the_sender():
+    broadcaster = Broadcaster(InMemoryBackplane())
+    await broadcaster.start()
+    client = FakeWebSocket()
+    connection = broadcaster.connect(client)
+    await broadcaster.publish({"seq": 1})
+    await settle()
+
+    await asyncio.wait_for(broadcaster.disconnect(connection), 1)
+
+    assert connection.closed
+    assert broadcaster.connections == set()
+    assert broadcaster.stats()["sent"] == 1
+    await broadcaster.stop()
+
+class FakeConnection:
+    """Stands in for an asyncpg connection, which refuses overlapping queries"""
+
+    def __init__(self):
+        self.busy = False
+        self.sent = []
+
+    async def execute(self, query, channel, payload):
+        assert not self.busy, "another operation is in progress"
+        self.busy = True
+        await asyncio.sleep(0)
+        self.sent.append(json.loads(payload))
+        self.busy = False
+
+    async def close(self):
+        pass
+
+@pytest.mark.asyncio
+async def test_postgres_backplane_serializes_publishes_and_keeps_handler_tasks():
+    backplane = PostgresBackplane(channel="test")
+    backplane._connection = FakeConnection()
+    received = []
+
+    async def handler(message):
+        await asyncio.sleep(0)
+        received.append(message)
+
+    backplane._handler = handler
+    await asyncio.gather(*(backplane.publish({"type": "update", "data": [i]}) for i in range(5)))
+    assert len(backplane._connection.sent) == 5
+
+    for message in backplane._connection.sent:
+        backplane._on_notify(None, 0, "test", json.dumps(message))
+    assert len(backplane._pending) == 5
+    await backplane.stop()
+    assert not backplane._pending
+    assert sorted(m["data"][0] for m in received) == list(range(5))
+
+def test_backplanes_must_implement_start_and_publish():
+    class Incomplete(Backplane):
+        async def start(self, handler):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,99 @@
+import json
+import math
+import random
+import pytest
+from app.models import City
+from app.services import CityRegistry
+from app.services.city_registry import parse_city_rows, read_city_file
+from app.config import settings
+
+def test_defaults_to_configured_cities():
+    registry = CityRegistry()
+
+    assert registry.names() == [c["name"] for c in settings.CITIES]
+    assert registry.get("Delhi")["lat"] == 28.6139
+    assert "Atlantis" not in registry
+
+def test_nearest_orders_by_great_circle_distance():
+    registry = CityRegistry()
+
+    nearest = registry.nearest(12.9, 77.6, limit=2)
+    assert [c["name"] for c in nearest] == ["Bangalore", "Chennai"]
+    assert nearest[0]["distance_km"] < 15
+    assert 250 < nearest[1]["distance_km"] < 300
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * 6371.0088 * math.asin(math.sqrt(a))
+
+def test_nearest_matches_brute_force_on_random_points():
+    rng = random.Random(7)
+    cities = [{"name": f"s{i}", "lat": rng.uniform(-90, 90), "lon": rng.uniform(-180, 180)} for i in range(2000)]
+    registry = CityRegistry(cities)
+
+    for _ in range(20):
+        lat, lon = rng.uniform(-90, 90), rng.uniform(-180, 180)
+        expected = sorted(cities, key=lambda c: haversine_km(lat, lon, c["lat"], c["lon"]))[:3]
+        assert [c["name"] for c in registry.nearest(lat, lon, 3)] == [c["name"] for c in expected]
+
+def test_nearest_across_the_antimeridian():
+    registry = CityRegistry([
+        {"name": "Suva", "lat": -18.1, "lon": 178.4},
+        {"name": "Apia", "lat": -13.8, "lon": -171.8},
+        {"name": "Perth", "lat": -31.9, "lon": 115.9}
+    ])
+
+    assert registry.nearest(-16.0, -179.5)[0]["name"] == "Suva"
+
+def test_within_bounding_box():
+    registry = CityRegistry()
+
+    names = {c["name"] for c in registry.within(12.0, 77.0, 20.0, 81.0)}
+    assert names == {"Bangalore", "Chennai", "Hyderabad"}
+
+def test_within_wraps_across_the_antimeridian():
+    registry = CityRegistry([
+        {"name": "Suva", "lat": -18.1, "lon": 178.4},
+        {"name": "Apia", "lat": -13.8, "lon": -171.8},
+        {"name": "Perth", "lat": -31.9, "lon": 115.9}
+    ])
+
+    names = {c["name"] for c in registry.within(-20.0, 170.0, -10.0, -170.0)}
+    assert names == {"Suva", "Apia"}
+
+def test_parse_rejects_bad_rows():
+    with pytest.raises(ValueError):
+        parse_city_rows([{"name": "Nowhere", "lat": "abc", "lon": 0}])
+    with pytest.raises(ValueError):
+        parse_city_rows([{"name": "Nowhere", "lat": 91, "lon": 0}])
+    with pytest.raises(ValueError):
+        parse_city_rows([{"name": "", "lat": 1, "lon": 1}])
+
+def test_load_seeds_empty_table_from_settings(db_session):
+    registry = CityRegistry([])
+    version = registry.version
+
+    assert registry.load(db_session) == len(settings.CITIES)
+    assert db_session.query(City).count() == len(settings.CITIES)
+    assert registry.version > version
+
+def test_import_upserts_by_name_and_reloads(db_session, tmp_path):
+    registry = CityRegistry()
+    registry.load(db_session)
+
+    csv_path = tmp_path / "stations.csv"
+    csv_path.write_text("name,lat,lon,country\nPune,18.5204,73.8567,IN\nDelhi,28.7,77.1,IN\n")
+    assert registry.import_cities(db_session, read_city_file(str(csv_path))) == 2
+
+    assert len(registry) == len(settings.CITIES) + 1
+    assert registry.get("Pune")["country"] == "IN"
+    assert registry.get("Delhi")["lat"] == 28.7
+    assert db_session.query(City).filter_by(name="Delhi").count() == 1
+
+def test_read_json_city_file(tmp_path):
+    json_path = tmp_path / "stations.json"
+    json_path.write_text(json.dumps([{"name": "Pune", "lat": 18.52, "lon": 73.86}]))
+
+    assert read_city_file(str(json_path)) == [{"name": "Pune", "country": None, "owm_id": None, "lat": 18.52, "lon": 73.86}]
@@ -0,0 +1,90 @@
+import threading
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from app.config import settings
+from app.database import (
+    build_database_url,
+    async_database_url,
+    create_db_engine,
+    create_async_db_engine,
+    pool_metrics
+)
+
+def test_url_is_built_from_fields(monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_URL", "")
+    monkeypatch.setattr(settings, "DATABASE_HOST", "pg.internal")
+    monkeypatch.setattr(settings, "DATABASE_PORT", 6543)
+    monkeypatch.setattr(settings, "DATABASE_USER", "weather")
+    monkeypatch.setattr(settings, "DATABASE_PASSWORD", "p@ss/word")
+    monkeypatch.setattr(settings, "DATABASE_NAME", "weather_db")
+
+    url = build_database_url()
+
+    assert url.drivername == "postgresql"
+    assert url.host == "pg.internal"
+    assert url.port == 6543
+    assert url.password == "p@ss/word"
+    assert url.database == "weather_db"
+
+def test_database_url_overrides_fields(monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_URL", "sqlite:///weather.db")
+    assert build_database_url().get_backend_name() == "sqlite"
+
+def test_async_url_uses_asyncio_drivers():
+    assert async_database_url("postgresql://u:p@h/db").drivername == "postgresql+asyncpg"
+    assert async_database_url("sqlite:///weather.db").drivername == "sqlite+aiosqlite"
+
+def test_pool_settings_are_applied(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/pool.db", name="test-settings", pool_size=3, max_overflow=2)
+
+    assert engine.pool.size() == 3
+    assert engine.pool._max_overflow == 2
+    assert engine.pool._pre_ping is settings.DB_POOL_PRE_PING
+
+def test_pool_reports_in_use_and_wait(tmp_path):
+    engine = create_db_engine(
+        f"sqlite:///{tmp_path}/pool.db", name="test-wait",
+        pool_size=1, max_overflow=0, pool_timeout=1
+    )
+    metrics = pool_metrics["test-wait"]
+
+    held = engine.connect()
+    assert metrics.snapshot()["in_use"] == 1
+
+    release = threading.Timer(0.2, held.close)
+    release.start()
+    with engine.connect() as conn:  # waits for the held connection
+        conn.execute(text("SELECT 1"))
+    release.join()
+
+    snapshot = metrics.snapshot()
+    assert snapshot["checkouts"] == 2
+    assert snapshot["in_use"] == 0
+    assert snapshot["wait_seconds_max"] >= 0.15
+
+def test_pool_counts_timeouts(tmp_path):
+    engine = create_db_engine(
+        f"sqlite:///{tmp_path}/pool.db", name="test-timeout",
+        pool_size=1, max_overflow=0, pool_timeout=0.05
+    )
+    held = engine.connect()
+    try:
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+    finally:
+        held.close()
+
+    assert pool_metrics["test-timeout"].snapshot()["timeouts"] == 1
+
+@pytest.mark.asyncio
+async def test_async_engine_is_instrumented(tmp_path):
+    engine = create_async_db_engine(f"sqlite:///{tmp_path}/async.db", name="test-async")
+    try:
+        async with engine.connect() as conn:
+            assert (await conn.execute(text("SELECT 1"))).scalar() == 1
+            assert pool_metrics["test-async"].snapshot()["in_use"] == 1
+    finally:
+        await engine.dispose()
+
+    assert pool_metrics["test-async"].snapshot()["checkouts"] == 1
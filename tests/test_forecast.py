@@ -4,15 +4,22 @@ from app.services import ForecastService
 from app.models import WeatherForecast
 from app.config import settings
 
+async def fetch_forecast(db_session, city):
+    """Fetch and store a city's forecast the way the scheduled job does"""
+    service = ForecastService(db_session)
+    fetched = await service.fetch_forecast_rows([city])
+    service.store_forecast_runs(fetched)
+    return [WeatherForecast(**row) for row in fetched[city["name"]]]
+
 class TestForecastService:
     """Test suite for ForecastService"""
 
-    def test_fetch_forecast(self, db_session):
+    @pytest.mark.asyncio
+    async def test_fetch_forecast(self, db_session):
         """Test forecast retrieval"""
-        service = ForecastService(db_session)
         city = settings.CITIES[0]  # Test with Delhi
         
-        forecasts = service.fetch_forecast(city)
+        forecasts = await fetch_forecast(db_session, city)
         
         assert len(forecasts) > 0
         assert all(isinstance(f, WeatherForecast) for f in forecasts)
@@ -62,21 +69,20 @@ class TestForecastService:
         assert 'avg_wind_speed' in first_summary
         assert 'dominant_condition' in first_summary
 
-    def test_multiple_cities_forecast(self, db_session):
+    @pytest.mark.asyncio
+    async def test_multiple_cities_forecast(self, db_session):
         """Test forecast retrieval for multiple cities"""
-        service = ForecastService(db_session)
-        
         for city in settings.CITIES:
-            forecasts = service.fetch_forecast(city)
+            forecasts = await fetch_forecast(db_session, city)
             assert len(forecasts) > 0
             assert all(f.city == city["name"] for f in forecasts)
 
-    def test_precipitation_probability(self, db_session):
+    @pytest.mark.asyncio
+    async def test_precipitation_probability(self, db_session):
         """Test precipitation probability handling"""
-        service = ForecastService(db_session)
         city = settings.CITIES[0]
         
-        forecasts = service.fetch_forecast(city)
+        forecasts = await fetch_forecast(db_session, city)
         
         for forecast in forecasts:
             assert hasattr(forecast, 'probability_precipitation')
@@ -89,23 +95,23 @@ class TestForecastService:
         with pytest.raises(Exception):
             service.get_daily_forecast_summary("InvalidCity")
 
-    def test_future_forecast_dates(self, db_session):
+    @pytest.mark.asyncio
+    async def test_future_forecast_dates(self, db_session):
         """Test that forecasts are for future dates"""
-        service = ForecastService(db_session)
         city = settings.CITIES[0]
         
-        forecasts = service.fetch_forecast(city)
+        forecasts = await fetch_forecast(db_session, city)
         current_time = datetime.utcnow()
         
         for forecast in forecasts:
             assert forecast.forecast_time >= current_time
 
-    def test_forecast_data_ranges(self, db_session):
+    @pytest.mark.asyncio
+    async def test_forecast_data_ranges(self, db_session):
         """Test that forecast data is within reasonable ranges"""
-        service = ForecastService(db_session)
         city = settings.CITIES[0]
         
-        forecasts = service.fetch_forecast(city)
+        forecasts = await fetch_forecast(db_session, city)
         
         for forecast in forecasts:
             assert -50 <= forecast.temperature <= 60  # Reasonable temperature range
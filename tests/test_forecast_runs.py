@@ -0,0 +1,78 @@
+import pytest
+from datetime import datetime, timedelta
+from app.models import WeatherForecast, ForecastRun, LatestForecastRun
+from app.services import ForecastService
+from app.config import settings
+
+START = datetime.combine(datetime.utcnow().date() + timedelta(days=1), datetime.min.time())
+
+def forecast_rows(city="Delhi", temperature=25.0, count=40):
+    return [{
+        "city": city,
+        "forecast_time": START + timedelta(hours=3 * i),
+        "temperature": temperature,
+        "feels_like": temperature + 1,
+        "humidity": 60.0,
+        "wind_speed": 4.0,
+        "weather_condition": "Clear",
+        "probability_precipitation": 10.0
+    } for i in range(count)]
+
+def latest_run_id(db, city="Delhi"):
+    return db.query(LatestForecastRun).filter(LatestForecastRun.city == city).one().run_id
+
+def test_unchanged_refetch_writes_nothing(db_session):
+    service = ForecastService(db_session)
+
+    assert service.store_forecast_runs({"Delhi": forecast_rows()}) == 40
+    first_run = latest_run_id(db_session)
+    assert service.store_forecast_runs({"Delhi": forecast_rows()}) == 0
+
+    assert db_session.query(WeatherForecast).count() == 40
+    assert db_session.query(ForecastRun).count() == 1
+    assert latest_run_id(db_session) == first_run
+
+def test_changed_forecast_creates_new_run(db_session):
+    service = ForecastService(db_session)
+    service.store_forecast_runs({"Delhi": forecast_rows(temperature=25.0)})
+    first_run = latest_run_id(db_session)
+
+    rows = forecast_rows(temperature=26.0)
+    service.store_forecast_runs({"Delhi": rows})
+
+    assert latest_run_id(db_session) != first_run
+    assert all(row["run_id"] == latest_run_id(db_session) for row in rows)
+    summary = service.get_daily_forecast_summary("Delhi")
+    assert summary[0]["avg_temperature"] == pytest.approx(26.0)
+
+def test_pointer_is_per_city(db_session):
+    service = ForecastService(db_session)
+    service.store_forecast_runs({"Delhi": forecast_rows(), "Mumbai": forecast_rows("Mumbai")})
+    delhi_run = latest_run_id(db_session, "Delhi")
+
+    service.store_forecast_runs({"Delhi": forecast_rows(), "Mumbai": forecast_rows("Mumbai", 31.0)})
+
+    assert latest_run_id(db_session, "Delhi") == delhi_run
+    assert latest_run_id(db_session, "Mumbai") != delhi_run
+    assert db_session.query(ForecastRun).count() == 3
+
+def test_retention_prunes_old_runs(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "FORECAST_RUN_RETENTION", 2)
+    service = ForecastService(db_session)
+
+    for temperature in (20.0, 21.0, 22.0, 23.0):
+        service.store_forecast_runs({"Delhi": forecast_rows(temperature=temperature, count=8)})
+
+    runs = db_session.query(ForecastRun).order_by(ForecastRun.id).all()
+    assert len(runs) == 2
+    assert db_session.query(WeatherForecast).count() == 16
+    assert runs[-1].id == latest_run_id(db_session)
+
+def test_legacy_rows_are_dropped_once_versioned(db_session):
+    db_session.add(WeatherForecast(**forecast_rows(count=1)[0]))
+    db_session.commit()
+
+    ForecastService(db_session).store_forecast_runs({"Delhi": forecast_rows(count=8)})
+
+    assert db_session.query(WeatherForecast).filter(WeatherForecast.run_id.is_(None)).count() == 0
+    assert db_session.query(WeatherForecast).count() == 8
@@ -0,0 +1,63 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app.services import ForecastService
+
+TOMORROW = datetime.combine(datetime.utcnow().date() + timedelta(days=1), datetime.min.time())
+
+def store_run(db, city, temperatures, conditions=None, start=TOMORROW):
+    """Store one fetched forecast run: readings every 3 hours from `start`"""
+    rows = [{
+        "city": city,
+        "forecast_time": start + timedelta(hours=3 * i),
+        "temperature": temperature,
+        "feels_like": temperature + 1,
+        "humidity": 60.0,
+        "wind_speed": 4.0,
+        "weather_condition": (conditions or ["Clear"] * len(temperatures))[i],
+        "probability_precipitation": 10.0
+    } for i, temperature in enumerate(temperatures)]
+    ForecastService(db).store_forecast_runs({city: rows})
+
+def test_summary_groups_by_day(db_session):
+    store_run(db_session, "Delhi", [20.0, 22.0, 24.0, 26.0, 28.0, 30.0, 32.0, 34.0, 10.0],
+              conditions=["Clear"] * 3 + ["Rain"] * 5 + ["Clouds"])
+
+    summaries = ForecastService(db_session).get_daily_forecast_summary("Delhi")
+
+    assert [s["date"] for s in summaries] == [
+        TOMORROW.strftime("%Y-%m-%d"),
+        (TOMORROW + timedelta(days=1)).strftime("%Y-%m-%d")
+    ]
+    first = summaries[0]
+    assert first["avg_temperature"] == pytest.approx(27.0)
+    assert first["max_temperature"] == 34.0
+    assert first["min_temperature"] == 20.0
+    assert first["avg_humidity"] == pytest.approx(60.0)
+    assert first["dominant_condition"] == "Rain"
+
+def test_repeated_fetches_are_not_double_counted(db_session):
+    store_run(db_session, "Delhi", [20.0] * 8)
+    store_run(db_session, "Delhi", [30.0] * 8)
+
+    summaries = ForecastService(db_session).get_daily_forecast_summary("Delhi")
+
+    assert len(summaries) == 1
+    assert summaries[0]["avg_temperature"] == pytest.approx(30.0)
+
+def test_past_forecasts_are_ignored(db_session):
+    store_run(db_session, "Delhi", [5.0] * 8, start=TOMORROW - timedelta(days=5))
+
+    assert ForecastService(db_session).get_daily_forecast_summary("Delhi") == []
+
+def test_multi_city_summary_uses_one_query(engine, db_session):
+    store_run(db_session, "Delhi", [20.0] * 8)
+    store_run(db_session, "Mumbai", [30.0] * 8)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    summaries = ForecastService(db_session).get_daily_forecast_summaries(["Delhi", "Mumbai", "Chennai"])
+
+    assert len(statements) == 1
+    assert set(summaries) == {"Delhi", "Mumbai"}
+    assert summaries["Mumbai"][0]["avg_temperature"] == pytest.approx(30.0)
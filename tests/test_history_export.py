@@ -0,0 +1,128 @@
+import csv
+import io
+import json
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.main import app
+from app.models import Base, WeatherData
+from app.routes.history import get_history_exporter
+from app.services.history_export import HISTORY_COLUMNS, HistoryExporter, decode_cursor, encode_cursor
+
+START = datetime(2024, 1, 1)
+
+@pytest.fixture
+def Session():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    # Two readings share a timestamp so the id breaks the tie
+    times = [START + timedelta(minutes=10 * i) for i in range(25)] + [START + timedelta(minutes=50)]
+    db.add_all(WeatherData(city="Delhi", temperature=20.0 + i, feels_like=21.0, weather_condition="Clear", recorded_at=t)
+               for i, t in enumerate(times))
+    db.add(WeatherData(city="Mumbai", temperature=30.0, feels_like=31.0, weather_condition="Rain", recorded_at=START))
+    db.commit()
+    db.close()
+    yield Session
+    Base.metadata.drop_all(engine)
+
+@pytest.fixture
+def client(Session):
+    app.dependency_overrides[get_history_exporter] = lambda: HistoryExporter(Session, batch_size=4)
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+def test_batches_are_bounded_and_ordered(Session):
+    exporter = HistoryExporter(Session, batch_size=4)
+    batches = list(exporter.iter_batches("Delhi", START, START + timedelta(days=1)))
+
+    assert max(len(batch) for batch in batches) == 4
+    rows = [row for batch in batches for row in batch]
+    assert len(rows) == 26
+    keys = [(row[HISTORY_COLUMNS.index("recorded_at")], row[-1]) for row in rows]
+    assert keys == sorted(keys)
+
+def test_pages_continue_from_the_cursor_without_gaps(Session):
+    exporter = HistoryExporter(Session, batch_size=4)
+    seen, cursor = [], None
+    while True:
+        rows, cursor = exporter.page("Delhi", START, START + timedelta(days=1), limit=7, cursor=cursor)
+        seen.extend(row[-1] for row in rows)
+        if cursor is None:
+            break
+
+    assert len(seen) == len(set(seen)) == 26
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(START, 42)) == (START, 42)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+def test_ndjson_stream(client):
+    response = client.get("/api/history/Delhi", params={"start": "2024-01-01T00:00:00", "end": "2024-01-01T01:00:00"})
+
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert len(records) == 7
+    assert records[0] == {
+        "city": "Delhi", "recorded_at": "2024-01-01T00:00:00", "temperature": 20.0, "feels_like": 21.0,
+        "humidity": None, "wind_speed": None, "wind_direction": None, "pressure": None, "weather_condition": "Clear"
+    }
+
+def test_csv_pages(client):
+    params = {"start": "2024-01-01T00:00:00", "format": "csv", "limit": 20}
+    first = client.get("/api/history/Delhi", params=params)
+    second = client.get("/api/history/Delhi", params={**params, "cursor": first.headers["x-next-cursor"]})
+
+    first_rows = list(csv.DictReader(io.StringIO(first.text)))
+    second_rows = list(csv.DictReader(io.StringIO(second.text)))
+    assert len(first_rows) == 20 and len(second_rows) == 6
+    assert "x-next-cursor" not in second.headers
+    assert first_rows[0]["recorded_at"] == "2024-01-01T00:00:00"
+
+def test_parquet_stream(client):
+    pq = pytest.importorskip("pyarrow.parquet")
+    response = client.get("/api/history/Delhi", params={"start": "2024-01-01T00:00:00", "format": "parquet"})
+
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.column_names == HISTORY_COLUMNS
+    assert table.num_rows == 26
+    assert pq.ParquetFile(io.BytesIO(response.content)).num_row_groups == 7
+
+def test_arrow_stream(client):
+    pa = pytest.importorskip("pyarrow")
+    response = client.get("/api/history/Delhi", params={"start": "2024-01-01T00:00:00", "format": "arrow"})
+
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == 26
+    assert table.column("temperature").to_pylist()[:2] == [20.0, 21.0]
+
+def test_bad_cursor_is_rejected(client):
+    response = client.get("/api/history/Delhi", params={"start": "2024-01-01T00:00:00", "cursor": "zzz"})
+    assert response.status_code == 400
+
+def test_unknown_city_is_not_found(client):
+    response = client.get("/api/history/Atlantis", params={"start": "2024-01-01T00:00:00"})
+    assert response.status_code == 404
+
+def test_non_ascii_city_gets_an_encoded_filename(client):
+    from app.services.city_registry import city_registry
+
+    cities = city_registry.all()
+    city_registry.replace(cities + [{"name": 'São "Paulo"', "lat": -23.55, "lon": -46.63}])
+    try:
+        response = client.get('/api/history/São "Paulo"', params={"start": "2024-01-01T00:00:00"})
+    finally:
+        city_registry.replace(cities)
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == (
+        "attachment; filename=\"S_o _Paulo_-history.ndjson\"; filename*=UTF-8''S%C3%A3o%20%22Paulo%22-history.ndjson"
+    )
@@ -0,0 +1,92 @@
+import asyncio
+import time
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+from app.database import create_db_engine
+from app.metrics import LoopLagMonitor, Metric, MetricsRegistry, db_query_seconds
+from app.models import Base, WeatherData
+from app.services import WeatherService
+from app.services.weather_fetcher import upstream_request_seconds, upstream_requests
+from tests.fake_owm import FakeOpenWeatherMap, make_stations
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ["path"])
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    requests.labels('/a"b').inc()
+    requests.labels('/a"b').inc(2)
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{path="/a\\"b"} 3' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text
+    # Registering the same metric again returns it; a different shape is an error
+    assert registry.counter("requests_total", "Requests", ["path"]) is requests
+    with pytest.raises(ValueError):
+        registry.gauge("requests_total", "Requests")
+
+def test_metric_types_must_implement_children_and_collect():
+    class Incomplete(Metric):
+        def collect(self):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete("incomplete", "Incomplete")
+
+def test_queries_are_timed_per_service_method(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/metrics.db", name="test-metrics")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(WeatherData(city="Delhi", temperature=30.0, feels_like=31.0, weather_condition="Clear", recorded_at=datetime.utcnow()))
+    db.commit()
+    before = db_query_seconds.labels("WeatherService.get_recent_statistics").count
+    try:
+        assert WeatherService(db).get_recent_statistics("Delhi", 1)["readings_count"] == 1
+    finally:
+        db.close()
+        engine.dispose()
+    assert db_query_seconds.labels("WeatherService.get_recent_statistics").count > before
+
+@pytest.mark.asyncio
+async def test_upstream_requests_are_timed_per_endpoint():
+    upstream = FakeOpenWeatherMap(make_stations(2), failing_paths=["/forecast"])
+    fetcher = upstream.fetcher()
+    ok, failed = upstream_requests.labels("/weather", 200).value, upstream_requests.labels("/forecast", 500).value
+    timed = upstream_request_seconds.labels("/weather").count
+    try:
+        await fetcher.fetch_current(upstream.stations[0])
+        with pytest.raises(Exception):
+            await fetcher.fetch_forecast(upstream.stations[0])
+    finally:
+        await fetcher.aclose()
+    assert upstream_requests.labels("/weather", 200).value == ok + 1
+    assert upstream_requests.labels("/forecast", 500).value == failed + 1
+    assert upstream_request_seconds.labels("/weather").count == timed + 1
+
+@pytest.mark.asyncio
+async def test_loop_lag_monitor_sees_a_blocked_loop():
+    lag = MetricsRegistry().histogram("lag_seconds", "Lag")
+    monitor = LoopLagMonitor(0.01, lag)
+    await monitor.start()
+    await asyncio.sleep(0.02)
+    time.sleep(0.1)
+    await asyncio.sleep(0.02)
+    await monitor.stop()
+    assert lag.labels().count >= 2
+    assert lag.labels().sum >= 0.05
+
+def test_metrics_endpoint():
+    from app.main import app
+
+    response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    for name in ("weather_response_cache_hit_ratio", "weather_ws_connections", "weather_db_pool_checkouts_total"):
+        assert f"# TYPE {name}" in response.text
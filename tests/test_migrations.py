@@ -0,0 +1,34 @@
+from sqlalchemy import create_engine, inspect
+from app.models import Base
+from app.migrations import ensure_indexes, run_migrations
+
+def index_names(engine, table):
+    return {index["name"] for index in inspect(engine).get_indexes(table)}
+
+def test_models_define_time_range_indexes():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    assert "ix_weather_data_city_recorded_at" in index_names(engine, "weather_data")
+    assert "ix_weather_forecasts_city_forecast_time" in index_names(engine, "weather_forecasts")
+    assert "ix_weather_alerts_created_at" in index_names(engine, "weather_alerts")
+
+def test_existing_database_gets_missing_indexes():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    # Simulate a database created before the indexes existed
+    for index in Base.metadata.tables["weather_data"].indexes:
+        index.drop(bind=engine)
+    assert index_names(engine, "weather_data") == set()
+
+    created = ensure_indexes(engine)
+
+    assert "ix_weather_data_city_recorded_at" in created
+    assert "ix_weather_data_city_recorded_at" in index_names(engine, "weather_data")
+
+def test_migrations_are_idempotent():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    assert run_migrations(engine) == []
+    assert run_migrations(engine) == []
@@ -0,0 +1,99 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app.config import settings
+from app.models import WeatherData
+from app.services import ObservationBuffer, WeatherService
+from app.services import weather_service
+
+NOW = datetime(2024, 5, 1, 12)
+CONDITIONS = ["Clear", "Clouds", "Rain", "Clouds"]
+
+def reading(i, city="Delhi", step=timedelta(minutes=10)):
+    return {
+        "city": city,
+        "temperature": 20 + (i * 7 % 13) * 0.25,
+        "feels_like": 21.0,
+        "humidity": 40 + i % 5,
+        "wind_speed": None if i % 3 else 2.5,
+        "wind_direction": 90,
+        "pressure": 1012,
+        "weather_condition": CONDITIONS[i % len(CONDITIONS)],
+        "recorded_at": NOW - i * step
+    }
+
+def test_aggregates_match_the_database(db_session):
+    rows = [reading(i) for i in range(300)] + [reading(i, city="Mumbai") for i in range(50)]
+    db_session.add_all(WeatherData(**row) for row in rows)
+    db_session.commit()
+    buffer = ObservationBuffer(capacity=1000, hours=72)
+    assert buffer.warm_start(db_session, now=NOW) == 350
+
+    service = WeatherService(db_session)
+    for hours in (1, 24, 48):
+        since = NOW - timedelta(hours=hours)
+        assert buffer.covers("Delhi", since)
+        expected = service._aggregate_weather("Delhi", since)
+        actual = buffer.aggregate("Delhi", since)
+        assert actual.keys() == expected.keys()
+        for key, value in expected.items():
+            assert actual[key] == (pytest.approx(value) if isinstance(value, float) else value), key
+
+def test_wrapping_limits_coverage():
+    buffer = ObservationBuffer(capacity=6, hours=24)
+    buffer.loaded_since = int((NOW - timedelta(hours=24)).timestamp())
+    buffer.extend([{**reading(i), "recorded_at": (NOW - timedelta(minutes=10 * i)).isoformat()} for i in range(9, -1, -1)])
+
+    # Only the last six readings (the last 50 minutes) are held
+    assert buffer.aggregate("Delhi", NOW - timedelta(hours=24))["readings_count"] == 6
+    assert buffer.covers("Delhi", NOW - timedelta(minutes=50))
+    assert not buffer.covers("Delhi", NOW - timedelta(minutes=60))
+    # Cities without buffered readings may be ingested elsewhere, so the database answers
+    assert not buffer.covers("Pune", NOW - timedelta(hours=1))
+    assert buffer.aggregate("Pune", NOW - timedelta(hours=1)) is None
+
+def test_sharding_without_a_shared_backplane_never_covers(monkeypatch):
+    monkeypatch.setattr(settings, "POLL_SHARDING", True)
+    monkeypatch.setattr(settings, "BROADCAST_BACKPLANE", "memory")
+    buffer = ObservationBuffer(capacity=6, hours=24)
+    buffer.loaded_since = int((NOW - timedelta(hours=24)).timestamp())
+    buffer.extend([{**reading(0), "recorded_at": NOW.isoformat()}])
+
+    # Other workers' readings of Delhi never reach this buffer
+    assert not buffer.covers("Delhi", NOW - timedelta(minutes=10))
+    monkeypatch.setattr(settings, "BROADCAST_BACKPLANE", "postgres")
+    assert ObservationBuffer(capacity=6, hours=24).complete
+
+def test_stale_and_duplicate_readings_are_skipped():
+    buffer = ObservationBuffer(capacity=10, hours=24)
+    buffer.extend([reading(0), reading(1)])
+    buffer.extend([reading(0), reading(2)])
+
+    assert buffer.aggregate("Delhi", NOW - timedelta(hours=1))["readings_count"] == 2
+    assert buffer.latest("Delhi") == NOW
+
+def test_conditions_are_one_byte_codes():
+    buffer = ObservationBuffer(capacity=100, hours=24)
+    buffer.extend([reading(i) for i in range(99, -1, -1)])
+    stats = buffer.stats()
+
+    assert stats["conditions"] == 3
+    assert stats["bytes_per_reading"] == 33.0
+    assert buffer.aggregate("Delhi", NOW - timedelta(hours=24))["dominant_condition"] == "Clouds"
+
+def test_buffered_windows_never_query_the_database(db_session, monkeypatch):
+    db_session.add_all(WeatherData(**reading(i)) for i in range(20))
+    db_session.commit()
+    buffer = ObservationBuffer(capacity=100, hours=24)
+    buffer.warm_start(db_session, now=NOW)
+    monkeypatch.setattr(weather_service, "observation_buffer", buffer)
+    monkeypatch.setattr(weather_service, "datetime", type("frozen", (datetime,), {"utcnow": staticmethod(lambda: NOW)}))
+
+    statements = []
+    event.listen(db_session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    stats = WeatherService(db_session).get_recent_statistics("Delhi", hours=1)
+
+    assert (stats["readings_count"], statements) == (7, [])
+    # Two days reach past the warm-started window, so that one comes from the database
+    assert WeatherService(db_session).get_recent_statistics("Delhi", hours=48)["readings_count"] == 20
+    assert (buffer.hits, buffer.misses) == (1, 1)
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import pytest
+import pytest_asyncio
+from app.services.broadcast import InMemoryBackplane
+from app.services.observation_feed import ObservationFeed
+
+class FakeWebSocket:
+    """Records decoded frames; `gate` holds every send until it is set"""
+
+    def __init__(self, gate=None):
+        self.gate = gate
+        self.frames = []
+
+    async def send_text(self, payload):
+        if self.gate is not None:
+            await self.gate.wait()
+        self.frames.append(json.loads(payload))
+
+    async def send_bytes(self, payload):
+        import msgpack
+        self.frames.append(msgpack.unpackb(payload))
+
+async def settle():
+    await asyncio.sleep(0.01)
+
+def observation(city, temperature, condition="Clear"):
+    return {"name": city, "city": city, "temperature": temperature, "weather_condition": condition}
+
+@pytest_asyncio.fixture
+async def feed():
+    feed = ObservationFeed(InMemoryBackplane(), keyframe_interval=3)
+    await feed.start()
+    yield feed
+    await feed.stop()
+
+@pytest.mark.asyncio
+async def test_deltas_carry_only_changed_fields(feed):
+    await feed.publish([observation("Delhi", 30.0), observation("Mumbai", 28.0)])
+    client = FakeWebSocket()
+    feed.connect(client)
+
+    await feed.publish([observation("Delhi", 31.5), observation("Mumbai", 28.0)])
+    await settle()
+
+    keyframe, delta = client.frames
+    assert keyframe["type"] == "keyframe"
+    assert keyframe["data"]["Mumbai"] == {"temperature": 28.0, "weather_condition": "Clear"}
+    assert delta == {"type": "delta", "seq": 2, "data": {"Delhi": {"temperature": 31.5}}}
+
+@pytest.mark.asyncio
+async def test_clients_only_hear_about_subscribed_cities(feed):
+    delhi, mumbai = FakeWebSocket(), FakeWebSocket()
+    feed.connect(delhi, cities=["Delhi"])
+    feed.connect(mumbai, cities=["Mumbai"])
+
+    await feed.publish([observation("Delhi", 30.0)])
+    await settle()
+
+    assert [frame["data"] for frame in delhi.frames] == [{}, {"Delhi": {"temperature": 30.0, "weather_condition": "Clear"}}]
+    # Nothing changed for Mumbai's subscriber, so it got no frame at all
+    assert mumbai.frames == [{"type": "keyframe", "seq": 0, "data": {}}]
+
+@pytest.mark.asyncio
+async def test_periodic_keyframe_restates_every_field(feed):
+    client = FakeWebSocket()
+    feed.connect(client)
+
+    for i in range(4):
+        await feed.publish([observation("Delhi", 30.0 + i)])
+        await settle()
+
+    assert [frame["type"] for frame in client.frames] == ["keyframe", "delta", "delta", "delta", "keyframe"]
+    assert client.frames[-1]["data"] == {"Delhi": {"temperature": 33.0, "weather_condition": "Clear"}}
+
+@pytest.mark.asyncio
+async def test_client_that_lost_a_frame_is_resynced_with_a_keyframe():
+    feed = ObservationFeed(InMemoryBackplane(), keyframe_interval=100, queue_size=1)
+    await feed.start()
+    gate = asyncio.Event()
+    slow = FakeWebSocket(gate=gate)
+    feed.connect(slow)
+    await settle()
+
+    for i in range(3):
+        await feed.publish([observation("Delhi", 30.0 + i, condition=f"c{i}")])
+        await settle()
+    gate.set()
+    await settle()
+
+    # The delta that changed the condition to c1 was dropped; the keyframe
+    # that followed restores the full state
+    assert slow.frames[-1]["type"] == "keyframe"
+    assert slow.frames[-1]["data"] == {"Delhi": {"temperature": 32.0, "weather_condition": "c2"}}
+    await feed.stop()
+
+@pytest.mark.asyncio
+async def test_subscription_commands(feed):
+    await feed.publish([observation("Delhi", 30.0), observation("Mumbai", 28.0), observation("Pune", 25.0)])
+    client = FakeWebSocket()
+    connection = feed.connect(client, cities=["Delhi"])
+    await settle()
+
+    for command in ({"subscribe": ["Mumbai"]}, {"unsubscribe": ["Delhi"]}, "not json"):
+        feed.handle_command(connection, command if isinstance(command, str) else json.dumps(command))
+        await settle()
+
+    assert [sorted(frame["data"]) for frame in client.frames[:3]] == [["Delhi"], ["Delhi", "Mumbai"], ["Mumbai"]]
+    assert client.frames[3]["type"] == "error"
+
+@pytest.mark.asyncio
+async def test_msgpack_clients_get_binary_frames(feed):
+    pytest.importorskip("msgpack")
+    client = FakeWebSocket()
+    feed.connect(client, encoding="msgpack")
+
+    await feed.publish([observation("Delhi", 30.0)])
+    await settle()
+
+    assert client.frames[-1] == {"type": "delta", "seq": 1, "data": {"Delhi": {"temperature": 30.0, "weather_condition": "Clear"}}}
+
+@pytest.mark.asyncio
+async def test_workers_share_state_through_the_backplane():
+    backplane = InMemoryBackplane()
+    polling, serving = ObservationFeed(backplane), ObservationFeed(backplane)
+    await polling.start()
+    await serving.start()
+    client = FakeWebSocket()
+    serving.connect(client)
+
+    await polling.publish([observation("Delhi", 30.0)])
+    await settle()
+
+    assert client.frames[-1]["data"] == {"Delhi": {"temperature": 30.0, "weather_condition": "Clear"}}
+    assert serving.latest == polling.latest
+    await polling.stop()
+    await serving.stop()
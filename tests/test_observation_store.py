@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from app.services import ObservationStore
+from app.config import settings
+
+def observation(city, temperature=30.0):
+    return {
+        "name": city,
+        "city": city,
+        "temperature": temperature,
+        "feels_like": temperature + 1,
+        "weather_condition": "Clear",
+        "recorded_at": "2024-01-01T00:00:00"
+    }
+
+def test_get_includes_staleness_metadata():
+    store = ObservationStore(max_age=60)
+    store.update([observation("Delhi")])
+
+    cached = store.get("Delhi")
+    assert cached["temperature"] == 30.0
+    assert cached["stale"] is False
+    assert cached["age_seconds"] >= 0
+    assert store.get("Mumbai") is None
+
+def test_get_all_keeps_city_order_and_skips_unseen():
+    store = ObservationStore(max_age=60)
+    store.update([observation("Mumbai"), observation("Delhi")])
+
+    cities = [o["city"] for o in store.get_all(["Delhi", "Chennai", "Mumbai"])]
+    assert cities == ["Delhi", "Mumbai"]
+
+def test_update_replaces_latest():
+    store = ObservationStore(max_age=60)
+    store.update([observation("Delhi", 30.0)])
+    store.update([observation("Delhi", 32.0)])
+
+    assert store.get("Delhi")["temperature"] == 32.0
+
+def test_max_age_marks_stale():
+    store = ObservationStore(max_age=0)
+    store.update([observation("Delhi")])
+
+    assert store.get("Delhi")["stale"] is True
+    assert store.stale_cities(["Delhi"]) == ["Delhi"]
+
+@pytest.mark.asyncio
+async def test_stale_read_triggers_single_refresh():
+    store = ObservationStore(max_age=60)
+    calls = []
+
+    async def refresher(cities):
+        calls.append(cities)
+        await asyncio.sleep(0.01)
+        store.update([observation("Delhi")])
+
+    store.set_refresher(refresher)
+    assert store.refresh_if_stale() is True
+    assert store.refresh_if_stale() is True
+    await store.refresh()
+
+    assert len(calls) == 1
+    assert "Delhi" in calls[0]
+    assert store.stale_cities(["Delhi"]) == []
+
+def test_fresh_store_does_not_refresh():
+    store = ObservationStore(max_age=60)
+    store.set_refresher(lambda cities: asyncio.sleep(0))
+    store.update([observation(city["name"]) for city in settings.CITIES])
+
+    assert store.refresh_if_stale() is False
+    assert ObservationStore(max_age=60).refresh_if_stale() is False
@@ -0,0 +1,79 @@
+import pytest
+from datetime import datetime, timedelta
+from app.models import WeatherData, WeatherAlert, WeatherForecast
+from app.services import ForecastService
+from app.services.persistence import BulkWriter, bulk_insert, bulk_upsert
+from app.config import settings
+
+def weather_row(i):
+    return {
+        "city": "Delhi",
+        "temperature": 20.0 + i % 10,
+        "feels_like": 21.0,
+        "weather_condition": "Clear",
+        "recorded_at": datetime.utcnow() - timedelta(minutes=i)
+    }
+
+def test_bulk_insert_reports_throughput(db_session):
+    result = bulk_insert(db_session, WeatherData, [weather_row(i) for i in range(500)])
+    db_session.commit()
+
+    assert result.table == "weather_data"
+    assert result.rows == 500
+    assert result.rows_per_sec > 0
+    assert db_session.query(WeatherData).count() == 500
+
+def test_bulk_insert_empty_is_noop(db_session):
+    result = bulk_insert(db_session, WeatherData, [])
+    assert result.rows == 0
+    assert result.rows_per_sec == 0.0
+
+def test_writer_flushes_each_table(db_session):
+    writer = BulkWriter(db_session)
+    writer.add_all(WeatherData, [weather_row(i) for i in range(3)])
+    writer.add(WeatherAlert, {"city": "Delhi", "alert_type": "HIGH_TEMPERATURE", "message": "hot"})
+    assert len(writer) == 4
+
+    results = writer.flush()
+
+    assert {r.table: r.rows for r in results} == {"weather_data": 3, "weather_alerts": 1}
+    assert len(writer) == 0
+    assert db_session.query(WeatherData).count() == 3
+    assert db_session.query(WeatherAlert).count() == 1
+
+class StubFetcher:
+    def __init__(self, payload):
+        self.payload = payload
+
+    async def fetch_forecast(self, city):
+        return self.payload
+
+@pytest.mark.asyncio
+async def test_forecast_sweep_is_batched(db_session):
+    payload = {"list": [{
+        "dt": int((datetime.utcnow() + timedelta(hours=3 * i)).timestamp()),
+        "main": {"temp": 25.0, "feels_like": 26.0, "humidity": 60},
+        "wind": {"speed": 3.0},
+        "weather": [{"main": "Clouds"}],
+        "pop": 0.2
+    } for i in range(40)]}
+    service = ForecastService(db_session)
+
+    written = service.store_forecast_runs(await service.fetch_forecast_rows(fetcher=StubFetcher(payload)))
+
+    assert written == 40 * len(settings.CITIES)
+    assert db_session.query(WeatherForecast).count() == written
+
+def test_bulk_upsert_updates_on_conflict(db_session):
+    row = {
+        "city": "Delhi",
+        "forecast_time": datetime(2024, 1, 1, 12),
+        "run_id": 1,
+        "temperature": 20.0
+    }
+    bulk_upsert(db_session, WeatherForecast, [row], ["city", "forecast_time", "run_id"])
+    bulk_upsert(db_session, WeatherForecast, [{**row, "temperature": 22.0}], ["city", "forecast_time", "run_id"])
+    db_session.commit()
+
+    stored = db_session.query(WeatherForecast).one()
+    assert stored.temperature == 22.0
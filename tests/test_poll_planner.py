@@ -0,0 +1,114 @@
+import pytest
+from app.services import PollPlanner
+
+def planner(cities=("Delhi", "Mumbai"), **kwargs):
+    options = dict(
+        min_interval=60,
+        max_interval=600,
+        budget_per_minute=100,
+        threshold=35.0,
+        threshold_band=3.0,
+        volatility_ref=2.0
+    )
+    options.update(kwargs)
+    return PollPlanner(cities, **options)
+
+def test_unpolled_cities_are_due_first():
+    p = planner()
+    p.mark_polled("Delhi", at=0)
+    p.observe("Delhi", 20.0, at=0)
+
+    assert p.due(now=1) == ["Mumbai"]
+
+def test_forced_city_is_due_until_polled():
+    p = planner()
+    for city in ("Delhi", "Mumbai"):
+        p.mark_polled(city, at=0)
+        p.observe(city, 20.0, at=0)
+    p.force(["Delhi", "Unknown"])
+
+    assert p.due(now=1) == ["Delhi"]
+    p.mark_polled("Delhi", at=1)
+    assert p.due(now=2) == []
+
+def test_stable_city_backs_off_to_max_interval():
+    p = planner()
+    p.observe("Delhi", 20.0, at=0)
+    p.observe("Delhi", 20.0, at=600)
+
+    assert p.urgency("Delhi") == 0.0
+    assert p.intervals()["Delhi"] == pytest.approx(600)
+
+def test_near_threshold_city_is_polled_faster():
+    p = planner()
+    p.observe("Delhi", 34.5, at=0)
+    p.observe("Mumbai", 25.0, at=0)
+
+    intervals = p.intervals()
+    assert intervals["Delhi"] < 100
+    assert intervals["Mumbai"] == pytest.approx(600)
+
+def test_volatile_city_is_polled_faster():
+    p = planner()
+    # 1 degC over 30 minutes is exactly the reference volatility
+    p.observe("Delhi", 20.0, at=0)
+    p.observe("Delhi", 21.0, at=1800)
+
+    assert p.urgency("Delhi") == pytest.approx(1.0)
+    p.observe("Delhi", 21.25, at=3600)
+    assert 0 < p.urgency("Delhi") < 1
+    assert 60 < p.intervals()["Delhi"] < 600
+
+def test_budget_scales_all_rates_down_together():
+    cities = [f"city-{i}" for i in range(100)]
+    p = planner(cities, budget_per_minute=10)
+    for i, name in enumerate(cities):
+        p.observe(name, 34.9 if i < 10 else 10.0, at=0)
+
+    intervals = p.intervals()
+    requests_per_minute = sum(60 / interval for interval in intervals.values())
+    assert requests_per_minute == pytest.approx(10)
+    # Hot cities still poll ten times as often as stable ones
+    assert intervals["city-50"] / intervals["city-0"] == pytest.approx(600 / 60, rel=0.05)
+
+def test_due_orders_by_overdue_ratio_and_honours_limit():
+    p = planner(("Delhi", "Mumbai", "Chennai"))
+    for name in p.cities:
+        p.observe(name, 20.0, at=0)
+        p.mark_polled(name, at=0)
+    p.observe("Mumbai", 35.0, at=0)
+
+    assert p.due(now=100) == ["Mumbai"]
+    due = p.due(now=700, limit=2)
+    assert len(due) == 2
+    assert due[0] == "Mumbai"
+
+def test_batch_limit_spreads_budget_across_ticks():
+    p = planner(budget_per_minute=60)
+    assert p.batch_limit(10) == 10
+    assert p.batch_limit(0.5) == 1
+
+def test_forced_polls_spend_the_budget():
+    p = planner(cities=[f"City{i}" for i in range(30)], budget_per_minute=60, tick=10)
+    assert p.allowance(now=0) == 10
+    for city in p.due(now=0, limit=10):
+        p.mark_polled(city, at=0)
+
+    # However many reads force cities, nothing more is polled until tokens refill
+    p.force(list(p.cities), now=0)
+    assert p.allowance(now=0) == 0
+    assert p.due(now=0, limit=p.allowance(now=0)) == []
+    assert p.allowance(now=5) == 5
+    assert p.allowance(now=60) == 10
+
+def test_recently_polled_city_is_not_forced_again():
+    p = planner()
+    p.mark_polled("Delhi", at=100)
+    p.observe("Delhi", 20.0, at=100)
+    p.mark_polled("Mumbai", at=100)
+    p.observe("Mumbai", 20.0, at=100)
+
+    p.force(["Delhi"], now=130)
+    assert p.due(now=130) == []
+    p.force(["Delhi"], now=160)
+    assert p.due(now=160) == ["Delhi"]
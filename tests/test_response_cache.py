@@ -0,0 +1,77 @@
+import pytest
+from datetime import datetime
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app.services.response_cache import ResponseCache, etag_matches
+
+@pytest.fixture
+def served():
+    """An app serving one cached endpoint, with a counter of how often it was built"""
+    cache = ResponseCache(max_entries=10, ttl=60)
+    app = FastAPI()
+    state = {"builds": 0, "alerts": [{"city": "Delhi", "created_at": datetime(2024, 5, 1, 12)}]}
+
+    @app.get("/alerts")
+    def alerts(request: Request):
+        def build():
+            state["builds"] += 1
+            return state["alerts"]
+        return cache.respond(request, ["alerts"], build)
+
+    return TestClient(app), cache, state
+
+def test_repeat_requests_are_served_from_cache(served):
+    client, cache, state = served
+    first = client.get("/alerts")
+    second = client.get("/alerts")
+
+    assert first.json() == [{"city": "Delhi", "created_at": "2024-05-01T12:00:00"}]
+    assert second.content == first.content
+    assert second.headers["etag"] == first.headers["etag"]
+    assert state["builds"] == 1
+
+def test_matching_etag_gets_304_without_a_body(served):
+    client, cache, state = served
+    etag = client.get("/alerts").headers["etag"]
+
+    response = client.get("/alerts", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert client.get("/alerts", headers={"If-None-Match": '"other"'}).status_code == 200
+    assert cache.stats.not_modified == 1
+
+def test_invalidation_rebuilds_with_a_new_etag(served):
+    client, cache, state = served
+    etag = client.get("/alerts").headers["etag"]
+
+    state["alerts"] = []
+    cache.invalidate("summaries")
+    assert client.get("/alerts", headers={"If-None-Match": etag}).status_code == 304
+
+    cache.invalidate("alerts")
+    response = client.get("/alerts", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json() == []
+    assert response.headers["etag"] != etag
+    assert state["builds"] == 2
+
+def test_body_built_across_an_invalidation_is_not_stored():
+    cache = ResponseCache(max_entries=10, ttl=60)
+    generation = cache.generation(["alerts"])
+    cache.invalidate("alerts")
+
+    cache.put("/alerts", ["alerts"], b"[]", generation)
+    assert cache.get("/alerts") is None
+    assert cache.stats.discarded == 1
+
+def test_entries_expire_after_ttl():
+    cache = ResponseCache(max_entries=10, ttl=0)
+    cache.put("/alerts", ["alerts"], b"[]", cache.generation(["alerts"]))
+    assert cache.get("/alerts") is None
+
+def test_etag_matching_follows_if_none_match_rules():
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches('W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches(None, '"b"')
+    assert not etag_matches('"a"', '"b"')
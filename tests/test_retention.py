@@ -0,0 +1,126 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import inspect, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+from app.config import settings
+from app.models import WeatherData, DailySummary, HourlySummary
+from app.services import RollupService, WeatherService
+from app.services.partitioning import PartitionManager, observation_source, partitioned_parent
+from app.services.persistence import BulkWriter
+from app.services.retention import RetentionService, resolution_for
+
+NOW = datetime(2024, 4, 15, 12, 0)
+
+@pytest.fixture(autouse=True)
+def retention(monkeypatch):
+    monkeypatch.setattr(settings, "RAW_RETENTION_DAYS", 30)
+    monkeypatch.setattr(settings, "HOURLY_RETENTION_MONTHS", 12)
+
+def ingest(db, readings):
+    writer = BulkWriter(db)
+    writer.add_all(WeatherData, [{
+        "city": "Delhi",
+        "temperature": temperature,
+        "feels_like": temperature + 1,
+        "humidity": 50.0,
+        "weather_condition": condition,
+        "recorded_at": when
+    } for when, temperature, condition in readings])
+    RollupService(db).ingest(writer.rows(WeatherData))
+    writer.flush()
+
+def observation_count(db):
+    source = observation_source(db)
+    return len(db.execute(select(source.c.id)).all())
+
+def test_ingest_maintains_hourly_rollups(db_session):
+    ingest(db_session, [
+        (datetime(2024, 4, 1, 9, 5), 20.0, "Clear"),
+        (datetime(2024, 4, 1, 9, 55), 22.0, "Rain"),
+        (datetime(2024, 4, 1, 10, 5), 30.0, "Rain")
+    ])
+
+    hours = db_session.query(HourlySummary).order_by(HourlySummary.hour).all()
+    assert [(h.hour, h.readings_count, h.avg_temperature) for h in hours] == [
+        (datetime(2024, 4, 1, 9), 2, 21.0),
+        (datetime(2024, 4, 1, 10), 1, 30.0)
+    ]
+    assert db_session.query(DailySummary).one().readings_count == 3
+
+def test_seal_moves_completed_months_but_reads_still_see_them(engine, db_session):
+    ingest(db_session, [
+        (datetime(2024, 1, 10), 10.0, "Clear"),
+        (datetime(2024, 2, 10), 20.0, "Clear"),
+        (datetime(2024, 4, 10), 40.0, "Clear")
+    ])
+
+    sealed = PartitionManager().seal(db_session, NOW)
+
+    assert sealed == ["weather_data_p2024_01", "weather_data_p2024_02"]
+    assert db_session.query(WeatherData).count() == 1
+    assert observation_count(db_session) == 3
+    assert {i["name"] for i in inspect(engine).get_indexes("weather_data_p2024_01")} == {
+        "ix_weather_data_p2024_01_city_recorded_at"
+    }
+    # Sealing again has nothing left to move
+    assert PartitionManager().seal(db_session, NOW) == []
+
+def test_expired_months_are_downsampled_then_dropped(engine, db_session):
+    ingest(db_session, [
+        (datetime(2024, 1, 10, 8), 10.0, "Clear"),
+        (datetime(2024, 1, 10, 9), 12.0, "Rain"),
+        (datetime(2024, 3, 20), 30.0, "Clear"),
+        (datetime(2024, 4, 10), 40.0, "Clear")
+    ])
+    # Lose January's incremental rollups so the drop has to rebuild them
+    db_session.query(DailySummary).filter(DailySummary.date < datetime(2024, 2, 1)).delete()
+    db_session.commit()
+
+    expired = RetentionService(db_session, PartitionManager()).run(NOW)
+
+    assert expired["observations"] == ["weather_data_p2024_01"]
+    assert "weather_data_p2024_01" not in inspect(engine).get_table_names()
+    assert observation_count(db_session) == 2
+    january = db_session.query(DailySummary).filter(DailySummary.date == datetime(2024, 1, 10)).one()
+    assert january.readings_count == 2
+    assert db_session.query(HourlySummary).filter(HourlySummary.hour < datetime(2024, 2, 1)).count() == 2
+
+def test_hourly_rollups_expire_after_their_retention(db_session):
+    ingest(db_session, [(datetime(2023, 2, 1, 6), 5.0, "Snow"), (datetime(2024, 4, 1, 6), 25.0, "Clear")])
+
+    RetentionService(db_session, PartitionManager()).expire_hourly(NOW)
+
+    assert [h.hour for h in db_session.query(HourlySummary)] == [datetime(2024, 4, 1, 6)]
+    assert db_session.query(DailySummary).count() == 2
+
+def test_resolution_follows_retention():
+    assert resolution_for(NOW - timedelta(days=7), NOW) == "raw"
+    assert resolution_for(NOW - timedelta(days=90), NOW) == "hourly"
+    assert resolution_for(NOW - timedelta(days=800), NOW) == "daily"
+
+def test_old_ranges_are_answered_from_rollups(db_session):
+    now = datetime.utcnow()
+    ingest(db_session, [
+        (now - timedelta(days=60), 10.0, "Rain"),
+        (now - timedelta(days=60, hours=2), 20.0, "Rain"),
+        (now - timedelta(days=1), 30.0, "Clear")
+    ])
+    # Without raw rows the answer can only have come from the rollups
+    db_session.query(WeatherData).delete()
+    db_session.commit()
+
+    stats = WeatherService(db_session).get_statistics("Delhi", days=90)
+
+    assert stats["resolution"] == "hourly"
+    assert stats["readings_count"] == 3
+    assert stats["avg_temperature"] == pytest.approx(20.0)
+    assert stats["min_temperature"] == 10.0
+    assert stats["dominant_condition"] == "Rain"
+
+def test_postgres_parent_is_range_partitioned():
+    ddl = str(CreateTable(partitioned_parent("weather_data")).compile(dialect=postgresql.dialect()))
+
+    assert "PARTITION BY RANGE (recorded_at)" in ddl
+    assert "PRIMARY KEY (id, recorded_at)" in ddl
+    assert "id SERIAL" in ddl
@@ -0,0 +1,106 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, inspect, text
+from app.models import WeatherData, DailySummary
+from app.services import RollupService, WeatherService
+from app.services.persistence import BulkWriter
+from app.migrations import ensure_columns
+
+def observation(temperature, condition="Clear", city="Delhi", when=None, humidity=50.0):
+    return {
+        "city": city,
+        "temperature": temperature,
+        "feels_like": temperature + 1,
+        "humidity": humidity,
+        "wind_speed": 2.0,
+        "weather_condition": condition,
+        "recorded_at": when or datetime.utcnow()
+    }
+
+def ingest(db, observations):
+    writer = BulkWriter(db)
+    writer.add_all(WeatherData, observations)
+    RollupService(db).ingest(writer.rows(WeatherData))
+    writer.flush()
+
+def test_ingest_creates_and_updates_rollup(db_session):
+    ingest(db_session, [observation(25.0), observation(27.0)])
+    ingest(db_session, [observation(23.0, "Rain"), observation(26.0, humidity=None)])
+
+    summary = db_session.query(DailySummary).one()
+    assert summary.city == "Delhi"
+    assert summary.readings_count == 4
+    assert summary.avg_temperature == pytest.approx(25.25)
+    assert summary.max_temperature == 27.0
+    assert summary.min_temperature == 23.0
+    assert summary.avg_humidity == pytest.approx(50.0)
+    assert summary.condition_counts == {"Clear": 3, "Rain": 1}
+    assert summary.dominant_condition == "Clear"
+
+def test_rollups_are_per_city_and_day(db_session):
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    ingest(db_session, [
+        observation(20.0),
+        observation(30.0, city="Mumbai"),
+        observation(10.0, when=yesterday)
+    ])
+
+    assert db_session.query(DailySummary).count() == 3
+    history = WeatherService(db_session).get_summary_history("Delhi", days=2)
+    assert [h["avg_temperature"] for h in history] == [10.0, 20.0]
+
+def test_backfill_matches_incremental(db_session):
+    observations = [observation(20.0 + i, "Rain" if i % 3 else "Clear") for i in range(10)]
+    ingest(db_session, observations)
+    incremental = WeatherService(db_session).get_daily_summary("Delhi")
+
+    today = datetime.utcnow().date()
+    assert RollupService(db_session).backfill(today, today).daily == 1
+    rebuilt = WeatherService(db_session).get_daily_summary("Delhi")
+
+    assert db_session.query(DailySummary).count() == 1
+    assert rebuilt["readings_count"] == incremental["readings_count"] == 10
+    assert rebuilt["dominant_condition"] == incremental["dominant_condition"]
+    for key in ("avg_temperature", "max_temperature", "min_temperature", "avg_humidity"):
+        assert rebuilt[key] == pytest.approx(incremental[key])
+
+def test_backfill_keeps_rollups_without_raw_rows(db_session):
+    now = datetime.utcnow()
+    old = now - timedelta(days=400)
+    ingest(db_session, [observation(20.0, when=old), observation(30.0, city="Mumbai", when=now)])
+    # The old day's raw rows have expired; only its rollups remain
+    db_session.query(WeatherData).filter(WeatherData.recorded_at < now - timedelta(days=1)).delete()
+    db_session.commit()
+
+    result = RollupService(db_session).backfill(old.date(), now.date())
+    assert result.daily == 1
+    assert result.start > old.date()
+    assert RollupService(db_session).backfill(old.date(), old.date()).daily == 0
+    assert RollupService(db_session).backfill(old.date(), old.date(), expiring=True).daily == 0
+
+    summaries = {s.city: s for s in db_session.query(DailySummary)}
+    assert summaries["Delhi"].avg_temperature == 20.0
+    assert summaries["Mumbai"].readings_count == 1
+
+def test_generate_daily_summary_from_raw_rows(db_session):
+    for temperature, condition in [(25.0, "Clear"), (27.0, "Clear"), (23.0, "Rain")]:
+        db_session.add(WeatherData(**observation(temperature, condition)))
+    db_session.commit()
+
+    summary = WeatherService(db_session).generate_daily_summary("Delhi")
+
+    assert summary.avg_temperature == 25.0
+    assert summary.max_temperature == 27.0
+    assert summary.min_temperature == 23.0
+    assert summary.dominant_condition == "Clear"
+
+def test_migration_adds_rollup_columns():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE daily_summaries (id INTEGER PRIMARY KEY, city VARCHAR, date DATETIME)"))
+
+    added = ensure_columns(engine)
+
+    assert "daily_summaries.condition_counts" in added
+    columns = {c["name"] for c in inspect(engine).get_columns("daily_summaries")}
+    assert {"readings_count", "temperature_sum", "condition_counts"} <= columns
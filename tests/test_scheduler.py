@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import pytest
+from app.services import Scheduler
+
+@pytest.mark.asyncio
+async def test_job_runs_on_its_interval():
+    scheduler = Scheduler(max_workers=1)
+    calls = []
+
+    async def tick():
+        calls.append(1)
+
+    scheduler.add_job("tick", tick, interval=0.05)
+    await scheduler.start()
+    await asyncio.sleep(0.18)
+    await scheduler.stop()
+
+    assert 3 <= len(calls) <= 5
+    assert scheduler.jobs["tick"].runs == len(calls)
+
+@pytest.mark.asyncio
+async def test_run_at_start_false_waits_one_interval():
+    scheduler = Scheduler(max_workers=1)
+    calls = []
+
+    async def tick():
+        calls.append(1)
+
+    scheduler.add_job("tick", tick, interval=10, run_at_start=False)
+    await scheduler.start()
+    await asyncio.sleep(0.05)
+    await scheduler.stop()
+
+    assert calls == []
+
+@pytest.mark.asyncio
+async def test_run_now_joins_a_run_in_flight():
+    scheduler = Scheduler(max_workers=1)
+    active = []
+    overlaps = []
+
+    async def slow():
+        overlaps.append(len(active))
+        active.append(1)
+        await asyncio.sleep(0.05)
+        active.pop()
+        return "done"
+
+    scheduler.add_job("slow", slow, interval=10, run_at_start=False)
+    results = await asyncio.gather(*(scheduler.run_now("slow") for _ in range(5)))
+
+    assert results == ["done"] * 5
+    assert overlaps == [0]
+    assert scheduler.jobs["slow"].runs == 1
+
+@pytest.mark.asyncio
+async def test_overrun_coalesces_missed_runs():
+    scheduler = Scheduler(max_workers=1)
+    calls = []
+
+    async def overrunning():
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(0.12)
+
+    scheduler.add_job("overrun", overrunning, interval=0.03)
+    await scheduler.start()
+    await asyncio.sleep(0.14)
+    await scheduler.stop()
+
+    job = scheduler.jobs["overrun"]
+    assert job.missed >= 3
+    # The missed runs collapse into one catch-up run rather than a burst
+    assert len(calls) <= 3
+
+def test_jitter_does_not_accumulate():
+    scheduler = Scheduler(max_workers=1)
+    job = scheduler.add_job("jittered", lambda: None, interval=10, jitter=5)
+    job.scheduled_at = 100.0
+    for i in range(1, 50):
+        scheduler._schedule_next(job, 100.0 + 10 * i - 5)
+        assert job.scheduled_at == 100.0 + 10 * i
+        assert job.scheduled_at <= job.next_run <= job.scheduled_at + 5
+
+@pytest.mark.asyncio
+async def test_failures_are_recorded_and_the_job_keeps_running():
+    scheduler = Scheduler(max_workers=1)
+
+    async def broken():
+        raise RuntimeError("upstream down")
+
+    scheduler.add_job("broken", broken, interval=0.03)
+    await scheduler.start()
+    await asyncio.sleep(0.1)
+    await scheduler.stop()
+
+    job = scheduler.jobs["broken"]
+    assert job.failures >= 2
+    assert job.failures == job.runs
+    assert job.last_error == "upstream down"
+
+@pytest.mark.asyncio
+async def test_run_blocking_uses_the_worker_pool():
+    scheduler = Scheduler(max_workers=2)
+    await scheduler.start()
+    try:
+        name = await scheduler.run_blocking(lambda: threading.current_thread().name)
+    finally:
+        await scheduler.stop()
+
+    assert name.startswith("scheduler")
+
+@pytest.mark.asyncio
+async def test_stop_cancels_a_run_in_progress():
+    scheduler = Scheduler(max_workers=1)
+    cancelled = asyncio.Event()
+
+    async def hang():
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    scheduler.add_job("hang", hang, interval=60)
+    await scheduler.start()
+    await asyncio.sleep(0.01)
+    await scheduler.stop()
+
+    assert cancelled.is_set()
+    assert not scheduler.jobs["hang"].running
+
+def test_duplicate_job_names_are_rejected():
+    scheduler = Scheduler(max_workers=1)
+
+    async def noop():
+        pass
+
+    scheduler.add_job("noop", noop, interval=1)
+    with pytest.raises(ValueError):
+        scheduler.add_job("noop", noop, interval=1)
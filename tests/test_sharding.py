@@ -0,0 +1,116 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.models import Base, PollLease
+from app.services.sharding import HashRing, ShardCoordinator
+
+PARTITIONS = 32
+TTL = 30
+
+@pytest.fixture
+def make_session():
+    """Sessions on one shared in-memory SQLite database, one per simulated worker"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    sessions = []
+
+    def factory():
+        sessions.append(Session())
+        return sessions[-1]
+
+    yield factory
+    for session in sessions:
+        session.close()
+    Base.metadata.drop_all(engine)
+
+def worker(name):
+    return ShardCoordinator(worker_id=name, partitions=PARTITIONS, lease_ttl=TTL)
+
+def test_ring_moves_few_keys_when_a_member_joins():
+    keys = [str(i) for i in range(2000)]
+    before = HashRing(["a", "b", "c"])
+    after = HashRing(["a", "b", "c", "d"])
+
+    moved = [key for key in keys if before.owner(key) != after.owner(key)]
+    assert all(after.owner(key) == "d" for key in moved)
+    assert len(moved) < len(keys) / 2
+
+def test_single_worker_holds_every_partition(make_session):
+    a = worker("a")
+    assert a.heartbeat(make_session()) == set(range(PARTITIONS))
+    assert a.share == 1.0
+
+def test_partitions_rebalance_when_a_worker_joins(make_session):
+    a, b = worker("a"), worker("b")
+    db_a, db_b = make_session(), make_session()
+    now = datetime.utcnow()
+
+    a.heartbeat(db_a, now)
+    # b cannot take anything while a's leases are live
+    assert b.heartbeat(db_b, now) == set()
+    # a sees b, hands back b's share, and b claims it
+    a.heartbeat(db_a, now + timedelta(seconds=1))
+    b.heartbeat(db_b, now + timedelta(seconds=1))
+
+    assert a.owned and b.owned
+    assert a.owned.isdisjoint(b.owned)
+    assert a.owned | b.owned == set(range(PARTITIONS))
+
+def test_dead_worker_partitions_move_after_lease_expiry(make_session):
+    a, b = worker("a"), worker("b")
+    db_a, db_b = make_session(), make_session()
+    now = datetime.utcnow()
+    a.heartbeat(db_a, now)
+    b.heartbeat(db_b, now)
+    a.heartbeat(db_a, now)
+    b.heartbeat(db_b, now)
+
+    # a stops heartbeating; once its leases lapse b takes everything
+    later = now + timedelta(seconds=TTL + 1)
+    assert b.heartbeat(db_b, later) == set(range(PARTITIONS))
+
+def test_release_frees_leases_immediately(make_session):
+    a, b = worker("a"), worker("b")
+    db_a, db_b = make_session(), make_session()
+    now = datetime.utcnow()
+    a.heartbeat(db_a, now)
+    a.release(db_a)
+
+    assert a.owned == set()
+    assert b.heartbeat(db_b, now) == set(range(PARTITIONS))
+    assert db_b.query(PollLease).filter_by(worker_id="a").count() == 0
+
+def test_each_city_belongs_to_exactly_one_worker(make_session):
+    workers = [worker(name) for name in ("a", "b", "c")]
+    sessions = [make_session() for _ in workers]
+    now = datetime.utcnow()
+    for _ in range(2):
+        for w, db in zip(workers, sessions):
+            w.heartbeat(db, now)
+
+    cities = [f"city-{i}" for i in range(500)]
+    owners = [[w.worker_id for w in workers if w.owns(city)] for city in cities]
+    assert all(len(owner) == 1 for owner in owners)
+
+def test_leases_use_the_database_clock(make_session, monkeypatch):
+    import app.services.sharding as sharding
+
+    class SkewedClock(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime.utcnow() + timedelta(hours=1)
+
+    a, b = worker("a"), worker("b")
+    db_a, db_b = make_session(), make_session()
+    a.heartbeat(db_a)
+    # b's host clock runs an hour ahead; a's leases must still look live to it
+    monkeypatch.setattr(sharding, "datetime", SkewedClock)
+    assert b.heartbeat(db_b) == set()
+    assert {lease.worker_id for lease in db_b.query(PollLease)} == {"a"}
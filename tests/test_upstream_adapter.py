@@ -0,0 +1,112 @@
+import pytest
+from app.models import WeatherData
+from app.services import GroupedRequestAdapter, SingleRequestAdapter, WeatherService
+from app.services.upstream_adapter import UpstreamAdapter
+from tests.fake_owm import FakeOpenWeatherMap
+
+def stations(count, lat=50.0, lon=10.0, spacing=0.05, first_id=1000):
+    return [
+        {"id": first_id + i, "name": f"Station {i}", "lat": lat + i * spacing, "lon": lon, "temp": 10.0 + i}
+        for i in range(count)
+    ]
+
+def as_cities(stations, with_ids=True):
+    return [
+        {"name": s["name"], "lat": s["lat"], "lon": s["lon"], "owm_id": s["id"] if with_ids else None}
+        for s in stations
+    ]
+
+@pytest.mark.asyncio
+async def test_cities_with_ids_are_fetched_through_group():
+    upstream = FakeOpenWeatherMap(stations(45))
+    fetcher = upstream.fetcher()
+    try:
+        fetched = await GroupedRequestAdapter(fetcher, group_size=20).fetch_current(as_cities(upstream.stations))
+    finally:
+        await fetcher.aclose()
+
+    assert upstream.calls == {"/group": 3}
+    assert [city["name"] for city, _ in fetched] == [s["name"] for s in upstream.stations]
+    assert all(payload["main"]["temp"] == 10.0 + i for i, (_, payload) in enumerate(fetched))
+
+@pytest.mark.asyncio
+async def test_failed_group_falls_back_to_single_requests():
+    upstream = FakeOpenWeatherMap(stations(5), failing_paths=["/group"])
+    fetcher = upstream.fetcher()
+    try:
+        fetched = await GroupedRequestAdapter(fetcher).fetch_current(as_cities(upstream.stations))
+    finally:
+        await fetcher.aclose()
+
+    assert upstream.calls == {"/group": 1, "/weather": 5}
+    assert len(fetched) == 5
+
+@pytest.mark.asyncio
+async def test_dense_cells_use_box_and_sparse_ones_single_requests():
+    clustered = stations(4, lat=50.1, lon=10.1, spacing=0.1)
+    isolated = stations(1, lat=-33.9, lon=151.2, first_id=2000)
+    upstream = FakeOpenWeatherMap(clustered + isolated)
+    fetcher = upstream.fetcher()
+    adapter = GroupedRequestAdapter(fetcher, use_box=True, min_box_group=3, match_km=5)
+    try:
+        fetched = await adapter.fetch_current(as_cities(clustered + isolated, with_ids=False))
+    finally:
+        await fetcher.aclose()
+
+    assert upstream.calls == {"/box/city": 1, "/weather": 1}
+    temps = {city["name"]: payload["main"]["temp"] for city, payload in fetched}
+    assert temps == {s["name"]: s["temp"] for s in clustered + isolated}
+
+@pytest.mark.asyncio
+async def test_box_cities_without_a_nearby_station_fall_back():
+    upstream = FakeOpenWeatherMap(stations(3, spacing=0.1))
+    cities = as_cities(upstream.stations, with_ids=False)
+    # The fake has no station within match_km of this one
+    cities.append({"name": "Far Field", "lat": 50.45, "lon": 10.3, "owm_id": None})
+    fetcher = upstream.fetcher()
+    adapter = GroupedRequestAdapter(fetcher, use_box=True, min_box_group=3, match_km=5)
+    try:
+        fetched = await adapter.fetch_current(cities)
+    finally:
+        await fetcher.aclose()
+
+    assert upstream.calls == {"/box/city": 1, "/weather": 1}
+    assert len(fetched) == 4
+
+@pytest.mark.asyncio
+async def test_single_adapter_makes_one_request_per_city():
+    upstream = FakeOpenWeatherMap(stations(4))
+    fetcher = upstream.fetcher()
+    try:
+        fetched = await SingleRequestAdapter(fetcher).fetch_current(as_cities(upstream.stations))
+    finally:
+        await fetcher.aclose()
+
+    assert upstream.calls == {"/weather": 4}
+    assert len(fetched) == 4
+
+@pytest.mark.asyncio
+async def test_weather_service_stores_grouped_observations(db_session):
+    upstream = FakeOpenWeatherMap(stations(25))
+    fetcher = upstream.fetcher()
+    try:
+        data = await WeatherService(db_session).fetch_current_weather_all_cities(
+            adapter=GroupedRequestAdapter(fetcher),
+            cities=as_cities(upstream.stations)
+        )
+    finally:
+        await fetcher.aclose()
+
+    assert upstream.calls == {"/group": 2}
+    assert len(data) == 25
+    assert db_session.query(WeatherData).count() == 25
+    stored = db_session.query(WeatherData).filter_by(city="Station 3").one()
+    assert stored.temperature == 13.0
+    assert stored.humidity == 50
+
+def test_adapters_must_implement_fetch_current():
+    class Incomplete(UpstreamAdapter):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,158 @@
+import asyncio
+import httpx
+import pytest
+from app.services import WeatherFetcher
+from app.services.upstream_cache import CacheEntry, UpstreamCache
+from app.config import settings
+
+DELHI = settings.CITIES[0]
+
+class ConditionalUpstream:
+    """Stub upstream that supports ETag revalidation and counts requests"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = []
+        self.etag = '"v1"'
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        await asyncio.sleep(self.latency)
+        if request.headers.get("If-None-Match") == self.etag:
+            return httpx.Response(304)
+        return httpx.Response(200, headers={"ETag": self.etag}, json={
+            "main": {"temp": 30.0, "feels_like": 31.0},
+            "weather": [{"main": "Clear"}],
+            "list": []
+        })
+
+    def fetcher(self, ttl=600) -> WeatherFetcher:
+        fetcher = WeatherFetcher(
+            base_url="http://stub-owm.local/data/2.5",
+            api_key="test",
+            transport=httpx.MockTransport(self.handler)
+        )
+        fetcher.ttls = {"/weather": ttl, "/forecast": ttl}
+        return fetcher
+
+@pytest.mark.asyncio
+async def test_fresh_entry_is_served_from_cache():
+    upstream = ConditionalUpstream()
+    fetcher = upstream.fetcher()
+    try:
+        first = await fetcher.fetch_current(DELHI)
+        second = await fetcher.fetch_current(DELHI)
+    finally:
+        await fetcher.aclose()
+
+    assert first == second
+    assert len(upstream.requests) == 1
+    assert fetcher.cache.stats.hits == 1
+
+@pytest.mark.asyncio
+async def test_endpoints_and_locations_are_cached_separately():
+    upstream = ConditionalUpstream()
+    fetcher = upstream.fetcher()
+    try:
+        await fetcher.fetch_current(DELHI)
+        await fetcher.fetch_forecast(DELHI)
+        await fetcher.fetch_current(settings.CITIES[1])
+    finally:
+        await fetcher.aclose()
+
+    assert len(upstream.requests) == 3
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_share_one_round_trip():
+    upstream = ConditionalUpstream(latency=0.05)
+    fetcher = upstream.fetcher()
+    try:
+        results = await asyncio.gather(*(fetcher.fetch_current(DELHI) for _ in range(20)))
+    finally:
+        await fetcher.aclose()
+
+    assert len(upstream.requests) == 1
+    assert all(result == results[0] for result in results)
+    assert fetcher.cache.stats.coalesced == 19
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_abort_a_shared_load():
+    cache = UpstreamCache()
+    release = asyncio.Event()
+
+    async def load(stale):
+        await release.wait()
+        return CacheEntry(payload="fresh", expires_at=float("inf"))
+
+    first = asyncio.create_task(cache.get("key", load))
+    second = asyncio.create_task(cache.get("key", load))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await second == "fresh"
+    assert first.cancelled()
+    assert cache.stats.coalesced == 1
+    assert cache.peek("key").payload == "fresh"
+
+@pytest.mark.asyncio
+async def test_expired_entry_is_revalidated_with_etag():
+    upstream = ConditionalUpstream()
+    fetcher = upstream.fetcher(ttl=0.01)
+    try:
+        first = await fetcher.fetch_current(DELHI)
+        await asyncio.sleep(0.02)
+        second = await fetcher.fetch_current(DELHI)
+    finally:
+        await fetcher.aclose()
+
+    assert second == first
+    assert len(upstream.requests) == 2
+    assert upstream.requests[1].headers["If-None-Match"] == '"v1"'
+    assert fetcher.cache.stats.revalidated == 1
+
+@pytest.mark.asyncio
+async def test_revalidate_forces_a_conditional_request_for_a_fresh_entry():
+    upstream = ConditionalUpstream()
+    fetcher = upstream.fetcher()
+    try:
+        await fetcher.fetch_current(DELHI)
+        await fetcher.fetch_current(DELHI, revalidate=True)
+    finally:
+        await fetcher.aclose()
+
+    assert len(upstream.requests) == 2
+    assert upstream.requests[1].headers["If-None-Match"] == '"v1"'
+
+@pytest.mark.asyncio
+async def test_failed_load_is_not_cached():
+    cache = UpstreamCache()
+    attempts = []
+
+    async def failing(stale):
+        attempts.append(stale)
+        raise RuntimeError("upstream down")
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await cache.get("key", failing)
+    assert len(attempts) == 2
+    assert cache.peek("key") is None
+
+@pytest.mark.asyncio
+async def test_cache_evicts_least_recently_used():
+    cache = UpstreamCache(max_entries=2)
+
+    def loader(value):
+        async def load(stale):
+            return CacheEntry(payload=value, expires_at=float("inf"))
+        return load
+
+    await cache.get("a", loader(1))
+    await cache.get("b", loader(2))
+    await cache.get("a", loader(1))
+    await cache.get("c", loader(3))
+
+    assert cache.peek("b") is None
+    assert cache.peek("a").payload == 1
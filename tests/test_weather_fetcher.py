@@ -0,0 +1,101 @@
+import asyncio
+import time
+import httpx
+import pytest
+from app.models import WeatherData, WeatherAlert
+from app.services import WeatherService, WeatherFetcher
+from app.config import settings
+
+UPSTREAM_LATENCY = 0.2
+
+class StubUpstream:
+    """Local stand-in for OpenWeatherMap that adds artificial latency"""
+
+    def __init__(self, latency=UPSTREAM_LATENCY, temperature=30.0, fail_lat=None):
+        self.latency = latency
+        self.temperature = temperature
+        self.fail_lat = fail_lat
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.calls = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+
+        if self.fail_lat is not None and float(request.url.params["lat"]) == self.fail_lat:
+            return httpx.Response(500, json={"message": "upstream error"})
+        return httpx.Response(200, json={
+            "main": {"temp": self.temperature, "feels_like": self.temperature + 1},
+            "weather": [{"main": "Clear"}]
+        })
+
+    def fetcher(self, **kwargs) -> WeatherFetcher:
+        return WeatherFetcher(
+            base_url="http://stub-owm.local/data/2.5",
+            api_key="test",
+            transport=httpx.MockTransport(self.handler),
+            **kwargs
+        )
+
+@pytest.mark.asyncio
+async def test_sweep_takes_about_one_round_trip():
+    """All cities are fetched concurrently, not one after another"""
+    stub = StubUpstream()
+    fetcher = stub.fetcher()
+    try:
+        start = time.perf_counter()
+        fetched = await fetcher.fetch_all_current(settings.CITIES)
+        elapsed = time.perf_counter() - start
+    finally:
+        await fetcher.aclose()
+
+    assert len(fetched) == len(settings.CITIES)
+    assert [city["name"] for city, _ in fetched] == [c["name"] for c in settings.CITIES]
+    assert stub.peak_in_flight == len(settings.CITIES)
+    assert elapsed < UPSTREAM_LATENCY * 2
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded():
+    stub = StubUpstream(latency=0.05)
+    fetcher = stub.fetcher(max_concurrency=2)
+    try:
+        fetched = await fetcher.fetch_all_current(settings.CITIES)
+    finally:
+        await fetcher.aclose()
+
+    assert len(fetched) == len(settings.CITIES)
+    assert stub.peak_in_flight == 2
+
+@pytest.mark.asyncio
+async def test_failed_city_is_skipped():
+    failing = settings.CITIES[0]
+    stub = StubUpstream(latency=0, fail_lat=failing["lat"])
+    fetcher = stub.fetcher()
+    try:
+        fetched = await fetcher.fetch_all_current(settings.CITIES)
+    finally:
+        await fetcher.aclose()
+
+    names = [city["name"] for city, _ in fetched]
+    assert failing["name"] not in names
+    assert len(names) == len(settings.CITIES) - 1
+
+@pytest.mark.asyncio
+async def test_service_persists_sweep(db_session):
+    stub = StubUpstream(latency=0, temperature=settings.TEMPERATURE_THRESHOLD + 1)
+    fetcher = stub.fetcher()
+    service = WeatherService(db_session)
+    try:
+        data = await service.fetch_current_weather_all_cities(fetcher)
+    finally:
+        await fetcher.aclose()
+
+    assert len(data) == len(settings.CITIES)
+    assert db_session.query(WeatherData).count() == len(settings.CITIES)
+    assert db_session.query(WeatherAlert).count() == len(settings.CITIES)
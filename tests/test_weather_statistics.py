@@ -0,0 +1,61 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app.models import WeatherData
+from app.services import WeatherService
+
+def add_readings(db, readings, city="Delhi", age=timedelta(0)):
+    now = datetime.utcnow() - age
+    for i, (temperature, condition) in enumerate(readings):
+        db.add(WeatherData(
+            city=city,
+            temperature=temperature,
+            feels_like=temperature + 1,
+            weather_condition=condition,
+            recorded_at=now - timedelta(seconds=i)
+        ))
+    db.commit()
+
+def test_statistics_are_aggregated(db_session):
+    add_readings(db_session, [(25.0, "Clear"), (27.0, "Clear"), (23.0, "Rain")])
+    add_readings(db_session, [(40.0, "Haze")], city="Mumbai")
+    add_readings(db_session, [(10.0, "Snow")], age=timedelta(days=30))
+
+    stats = WeatherService(db_session).get_statistics("Delhi", days=7)
+
+    assert stats["avg_temperature"] == pytest.approx(25.0)
+    assert stats["max_temperature"] == 27.0
+    assert stats["min_temperature"] == 23.0
+    assert stats["readings_count"] == 3
+    assert stats["dominant_condition"] == "Clear"
+    assert stats["period_days"] == 7
+
+def test_statistics_for_unknown_city(db_session):
+    assert WeatherService(db_session).get_statistics("Atlantis") is None
+
+def test_dominant_condition_tie_is_deterministic(db_session):
+    add_readings(db_session, [(20.0, "Rain"), (21.0, "Clouds")])
+
+    stats = WeatherService(db_session).get_statistics("Delhi")
+    assert stats["dominant_condition"] == "Clouds"
+
+def test_statistics_run_as_a_single_query(engine, db_session):
+    add_readings(db_session, [(20.0 + i % 5, "Clear") for i in range(200)])
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    WeatherService(db_session).get_statistics("Delhi")
+
+    assert len(statements) == 1
+    assert "avg(" in statements[0].lower()
+
+def test_daily_summary_uses_todays_readings(db_session):
+    add_readings(db_session, [(30.0, "Clear"), (34.0, "Haze"), (32.0, "Haze")])
+
+    summary = WeatherService(db_session).get_daily_summary("Delhi")
+
+    assert summary["avg_temperature"] == pytest.approx(32.0)
+    assert summary["max_temperature"] == 34.0
+    assert summary["min_temperature"] == 30.0
+    assert summary["dominant_condition"] == "Haze"
+    assert summary["date"] == datetime.utcnow().date().isoformat()